@@ -0,0 +1,364 @@
+"""
+Streaming alert rules over the order flow.
+
+Rules are compiled into one check per rule kind (and per window for delta
+rules). Each check keeps its rules sorted by threshold, so an event costs a
+comparison against the lowest threshold plus a bisect, however many rules
+there are. Level rules (delta, spread, vpin) fire when their level is crossed
+and re-arm once it falls back; every notification then passes a per-rule
+cooldown and a global rate limit before reaching the sinks.
+"""
+
+import bisect
+import json
+import os
+import queue
+import threading
+import time
+import urllib.request
+from collections import deque
+from datetime import timedelta
+
+import numpy as np
+import pandas as pd
+from flask import jsonify, request
+
+import config
+from metrics import REGISTRY, Counter
+from vpin import VPINEngine
+
+ALERTS_SENT = REGISTRY.register(Counter(
+    'orderflow_alerts_sent_total', 'Alerts delivered to the sinks', ['rule']))
+ALERTS_SUPPRESSED = REGISTRY.register(Counter(
+    'orderflow_alerts_suppressed_total', 'Alerts held back by cooldown or rate limit', ['reason']))
+
+
+def _rule_name(rule):
+    if 'name' in rule:
+        return rule['name']
+    params = ','.join(f"{key}={value}" for key, value in sorted(rule.items()) if key != 'type')
+    return f"{rule['type']}({params})"
+
+
+class _LevelCheck:
+    """Rules `level >= threshold`, sorted so the active ones are a prefix"""
+
+    def __init__(self, rules, key):
+        rules = sorted(rules, key=lambda rule: rule[key])
+        self.names = [_rule_name(rule) for rule in rules]
+        self.thresholds = [rule[key] for rule in rules]
+        self.active = 0  # rules [0, active) are currently triggered
+
+    def crossed(self, peak, current):
+        """Rules newly triggered by `peak`; re-arms the ones `current` is back under"""
+        reached = bisect.bisect_right(self.thresholds, peak)
+        fired = self.names[self.active:reached]
+        self.active = bisect.bisect_right(self.thresholds, current)
+        return fired
+
+
+class LargeTradeCheck:
+    def __init__(self, rules):
+        rules = sorted(rules, key=lambda rule: rule['size'])
+        self.names = [_rule_name(rule) for rule in rules]
+        self.thresholds = [rule['size'] for rule in rules]
+
+    def on_trades(self, engine, trades):
+        sizes = trades['size'].values
+        if sizes.max() < self.thresholds[0]:
+            return
+        largest = trades.iloc[int(sizes.argmax())]
+        for name in self.names[:bisect.bisect_right(self.thresholds, largest['size'])]:
+            engine.emit(name, 'large_trade', largest['size'], largest['timestamp'],
+                        f"{largest['side'].upper()} {largest['size']:.3f} BTC @ ${largest['price']:,.2f}")
+
+
+class DeltaCheck:
+    """Net delta over a rolling window, shared by every rule with that window"""
+
+    def __init__(self, seconds, rules):
+        self.window_ns = int(seconds * 1e9)
+        self.seconds = seconds
+        self.levels = _LevelCheck(rules, 'threshold')
+        self.window = deque()  # (time ns, signed size) of the trades within the window
+        self.delta = 0.0  # running sum of the window
+
+    def on_trades(self, engine, trades):
+        times = trades['timestamp'].values.astype('datetime64[ns]').astype('i8').tolist()
+        signed = (np.where(trades['side'].values == 'buy', 1.0, -1.0) * trades['size'].values).tolist()
+        window = self.window
+        span = self.window_ns
+        delta = self.delta
+        peak, peak_index = 0.0, 0
+        # Each trade enters once and leaves once, so a trade costs O(1) whatever the window holds
+        for i, (time_ns, size) in enumerate(zip(times, signed)):
+            window.append((time_ns, size))
+            delta += size
+            while window[0][0] <= time_ns - span:
+                delta -= window.popleft()[1]
+            if len(window) == 1:
+                delta = size  # drop the rounding the running sum picked up
+            if abs(delta) > abs(peak):
+                peak, peak_index = delta, i
+        self.delta = delta
+
+        for name in self.levels.crossed(abs(peak), abs(delta)):
+            direction = 'buying' if peak > 0 else 'selling'
+            engine.emit(name, 'delta', peak, trades['timestamp'].iloc[peak_index],
+                        f"Net {direction} {abs(peak):.2f} BTC in {self.seconds:g}s")
+
+
+class VPINCheck:
+    """VPIN at each closed volume bucket, shared by every vpin rule"""
+
+    def __init__(self, rules, bucket_volume, window_buckets):
+        self.levels = _LevelCheck(rules, 'threshold')
+        # Only the rolling window matters here, not the chart history
+        self.engine = VPINEngine(bucket_volume, window_buckets, max_age=timedelta(minutes=1), capacity=64)
+
+    def on_trades(self, engine, trades):
+        times, values = self.engine.update(trades)
+        if len(values) == 0:
+            return
+        peak = int(values.argmax())
+        for name in self.levels.crossed(values[peak], values[-1]):
+            engine.emit(name, 'vpin', float(values[peak]), pd.Timestamp(int(times[peak]), unit='ms'),
+                        f"Toxic order flow: VPIN {values[peak]:.2f} over {self.engine.window_buckets} "
+                        f"buckets of {self.engine.bucket_volume:g} BTC")
+
+
+class SpreadCheck:
+    def __init__(self, rules):
+        self.levels = _LevelCheck(rules, 'max_spread')
+
+    def on_book(self, engine, orderbook):
+        if not orderbook['bids'] or not orderbook['asks']:
+            return
+        spread = orderbook['asks'][0][0] - orderbook['bids'][0][0]
+        for name in self.levels.crossed(spread, spread):
+            engine.emit(name, 'spread', spread, orderbook['timestamp'], f"Spread widened to ${spread:.2f}")
+
+
+class LiquidityZoneCheck:
+    """Price trading into a book level holding at least `min_size` BTC, for every zone rule.
+
+    The book is scanned once per update for the levels the loosest rule
+    counts; each stricter `min_size` takes a subset of those and one nearest
+    zone lookup per trade, shared by the rules with that size.
+    """
+
+    def __init__(self, rules, default_min_size):
+        rules = sorted(rules, key=lambda rule: rule.get('min_size', default_min_size))
+        self.names = [_rule_name(rule) for rule in rules]
+        self.min_sizes = [rule.get('min_size', default_min_size) for rule in rules]
+        self.widths = [rule.get('width', 10.0) for rule in rules]
+        self.zones = np.empty(0)  # sorted zone prices
+        self.zone_sizes = np.empty(0)
+        self.current = [None] * len(rules)  # zone price the last trade was in, per rule
+
+    def on_book(self, engine, orderbook):
+        levels = [level for level in orderbook['bids'] + orderbook['asks'] if level[1] >= self.min_sizes[0]]
+        levels.sort()
+        self.zones = np.array([price for price, _ in levels])
+        self.zone_sizes = np.array([amount for _, amount in levels])
+
+    def _nearest(self, prices, min_size):
+        """Zones holding `min_size`, their sizes, and every trade's nearest one and distance to it"""
+        keep = self.zone_sizes >= min_size
+        zones, sizes = self.zones[keep], self.zone_sizes[keep]
+        if len(zones) == 0:
+            return zones, sizes, None, None
+        index = np.searchsorted(zones, prices)
+        left = np.clip(index - 1, 0, len(zones) - 1)
+        right = np.clip(index, 0, len(zones) - 1)
+        nearest = np.where(np.abs(prices - zones[left]) <= np.abs(prices - zones[right]), left, right)
+        return zones, sizes, nearest, np.abs(prices - zones[nearest])
+
+    def on_trades(self, engine, trades):
+        prices = trades['price'].values
+        tier = (None, None)
+        for rule, name in enumerate(self.names):
+            if self.min_sizes[rule] != tier[0]:
+                tier = (self.min_sizes[rule], self._nearest(prices, self.min_sizes[rule]))
+            zones, sizes, nearest, distance = tier[1]
+            if len(zones) == 0:
+                self.current[rule] = None
+                continue
+            zone_prices = np.where(distance <= self.widths[rule], zones[nearest], np.nan)
+
+            current = self.current[rule]
+            previous = np.r_[np.nan if current is None else current, zone_prices[:-1]]
+            entries = np.flatnonzero(~np.isnan(zone_prices) & (zone_prices != previous))
+            for i in entries[-1:]:
+                zone = nearest[i]
+                engine.emit(name, 'liquidity_zone', float(zones[zone]), trades['timestamp'].iloc[i],
+                            f"Price ${prices[i]:,.2f} entered liquidity zone ${zones[zone]:,.2f} "
+                            f"({sizes[zone]:.1f} BTC)")
+            self.current[rule] = None if np.isnan(zone_prices[-1]) else zone_prices[-1]
+
+
+class AlertEngine:
+    """Evaluates compiled rules on ingest and dispatches notifications"""
+
+    def __init__(self, rules, sinks, cooldown=60, max_per_minute=20, liquidity_threshold=15.0,
+                 vpin_bucket_volume=10.0, vpin_window_buckets=50):
+        self.sinks = list(sinks)
+        self.cooldown = cooldown
+        self.max_per_minute = max_per_minute
+        self.lock = threading.Lock()
+        self.last_sent = {}  # rule name -> monotonic time
+        self.recent_sends = deque()
+        self.trade_checks, self.book_checks = self._compile(rules, liquidity_threshold,
+                                                            vpin_bucket_volume, vpin_window_buckets)
+
+    def _compile(self, rules, liquidity_threshold, vpin_bucket_volume, vpin_window_buckets):
+        by_type = {}
+        for rule in rules:
+            by_type.setdefault(rule['type'], []).append(rule)
+        unknown = set(by_type) - {'large_trade', 'delta', 'spread', 'liquidity_zone', 'vpin'}
+        if unknown:
+            raise ValueError(f"Unknown alert rule type: {', '.join(sorted(unknown))}")
+
+        trade_checks, book_checks = [], []
+        if 'large_trade' in by_type:
+            trade_checks.append(LargeTradeCheck(by_type['large_trade']))
+        windows = {}
+        for rule in by_type.get('delta', []):
+            windows.setdefault(rule['seconds'], []).append(rule)
+        trade_checks.extend(DeltaCheck(seconds, window_rules) for seconds, window_rules in windows.items())
+        if 'vpin' in by_type:
+            trade_checks.append(VPINCheck(by_type['vpin'], vpin_bucket_volume, vpin_window_buckets))
+        if 'spread' in by_type:
+            book_checks.append(SpreadCheck(by_type['spread']))
+        if 'liquidity_zone' in by_type:
+            check = LiquidityZoneCheck(by_type['liquidity_zone'], liquidity_threshold)
+            trade_checks.append(check)
+            book_checks.append(check)
+        return trade_checks, book_checks
+
+    def on_trades(self, new_trades):
+        """Trade listener"""
+        if len(new_trades) == 0:
+            return
+        for check in self.trade_checks:
+            check.on_trades(self, new_trades)
+
+    def on_book(self, orderbook):
+        """Book listener"""
+        for check in self.book_checks:
+            check.on_book(self, orderbook)
+
+    def emit(self, rule, kind, value, event_time, message):
+        now = time.monotonic()
+        with self.lock:
+            if now - self.last_sent.get(rule, -self.cooldown) < self.cooldown:
+                ALERTS_SUPPRESSED.labels(reason='cooldown').inc()
+                return
+            while self.recent_sends and now - self.recent_sends[0] > 60:
+                self.recent_sends.popleft()
+            if len(self.recent_sends) >= self.max_per_minute:
+                ALERTS_SUPPRESSED.labels(reason='rate_limit').inc()
+                return
+            self.last_sent[rule] = now
+            self.recent_sends.append(now)
+
+        alert = {
+            'rule': rule,
+            'kind': kind,
+            'value': float(value),
+            'time': event_time.isoformat(),
+            'message': message,
+        }
+        ALERTS_SENT.labels(rule=rule).inc()
+        for sink in self.sinks:
+            try:
+                sink.send(alert)
+            except Exception as e:
+                print(f"❌ Alert sink error in {type(sink).__name__}: {e}")
+
+
+class LogSink:
+    """Appends alerts as JSON lines"""
+
+    def __init__(self, path):
+        self.path = path
+        self.lock = threading.Lock()
+
+    def send(self, alert):
+        os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+        with self.lock, open(self.path, 'a') as f:
+            f.write(json.dumps(alert) + '\n')
+        print(f"🚨 {alert['message']}")
+
+
+class WebhookSink:
+    """POSTs alerts as JSON from a background thread so ingest never waits on the network"""
+
+    def __init__(self, url, timeout=5, max_pending=100):
+        self.url = url
+        self.timeout = timeout
+        self.pending = queue.Queue(maxsize=max_pending)
+        self.thread = threading.Thread(target=self._run, name='alert-webhook', daemon=True)
+        self.thread.start()
+
+    def send(self, alert):
+        try:
+            self.pending.put_nowait(alert)
+        except queue.Full:
+            ALERTS_SUPPRESSED.labels(reason='webhook_backlog').inc()
+
+    def _run(self):
+        while True:
+            alert = self.pending.get()
+            body = json.dumps(alert).encode()
+            req = urllib.request.Request(self.url, data=body, headers={'Content-Type': 'application/json'})
+            try:
+                urllib.request.urlopen(req, timeout=self.timeout).close()
+            except Exception as e:
+                print(f"❌ Alert webhook error: {e}")
+
+
+class ToastSink:
+    """Keeps recent alerts for the dashboard to show"""
+
+    def __init__(self, max_alerts=50):
+        self.lock = threading.Lock()
+        self.alerts = deque(maxlen=max_alerts)
+
+    def send(self, alert):
+        with self.lock:
+            self.alerts.append(dict(alert, received=time.time()))
+
+    def recent(self, seconds):
+        cutoff = time.time() - seconds
+        with self.lock:
+            return [alert for alert in self.alerts if alert['received'] >= cutoff]
+
+
+def create_alert_engine(sinks):
+    """Alert engine for the rules in config"""
+    return AlertEngine(config.ALERT_RULES, sinks, config.ALERT_COOLDOWN,
+                       config.ALERT_MAX_PER_MINUTE, config.LIQUIDITY_THRESHOLD,
+                       config.VPIN_BUCKET_VOLUME, config.VPIN_WINDOW_BUCKETS)
+
+
+def delivery_sinks():
+    """Log file sink, plus the webhook sink when ORDER_FLOW_ALERT_WEBHOOK is set"""
+    sinks = [LogSink(config.ALERT_LOG)]
+    if config.ALERT_WEBHOOK_URL:
+        sinks.append(WebhookSink(config.ALERT_WEBHOOK_URL))
+    return sinks
+
+
+def register_alert_routes(server, toasts):
+    """Recent alerts as JSON, plus a local stand-in for a webhook receiver"""
+
+    @server.route('/alerts')
+    def recent_alerts():
+        return jsonify(toasts.recent(request.args.get('seconds', 3600, type=float)))
+
+    @server.route('/alerts/webhook', methods=['POST'])
+    def alert_webhook():
+        alert = request.get_json(silent=True) or {}
+        print(f"📨 Webhook received: {alert.get('message')}")
+        return jsonify({'ok': True})
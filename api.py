@@ -0,0 +1,216 @@
+"""
+Read-only JSON API over the in-memory aggregates.
+
+Responses are cached per data snapshot version and request, and carry an
+ETag derived from both, so a client polling with If-None-Match gets a 304
+without anything being recomputed until new data arrives. Candle requests
+also take a `since` cursor (ms timestamp) to pull only the bars from that
+time on; every candle response returns the cursor to use next.
+"""
+
+import hashlib
+import json
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta
+
+import numpy as np
+from flask import Response, jsonify, request
+
+import config
+from clock import CLOCK
+from chart_builder import create_candlestick_data, calculate_volume_profile
+from profile_store import value_area
+
+TIMEFRAMES = {'1m': 1, '5m': 5, '15m': 15, '1h': 60}
+MAX_WINDOW_MINUTES = config.TRADE_RETENTION_HOURS * 60  # the store keeps this much at most
+
+
+class ResponseCache:
+    """Small LRU of encoded responses keyed by ETag"""
+
+    def __init__(self, max_entries=256):
+        self.max_entries = max_entries
+        self.lock = threading.Lock()
+        self.entries = OrderedDict()
+
+    def get(self, etag):
+        with self.lock:
+            body = self.entries.get(etag)
+            if body is not None:
+                self.entries.move_to_end(etag)
+            return body
+
+    def put(self, etag, body):
+        with self.lock:
+            self.entries[etag] = body
+            self.entries.move_to_end(etag)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+
+    def resize(self, max_entries):
+        """Change the capacity, dropping the least recently used entries over it"""
+        with self.lock:
+            self.max_entries = max_entries
+            while len(self.entries) > max_entries:
+                self.entries.popitem(last=False)
+
+    def nbytes(self):
+        with self.lock:
+            return sum(len(body) for body in self.entries.values())
+
+
+def _etag(snapshot):
+    """Validator for this request against this data version"""
+    params = '&'.join(f"{key}={value}" for key, value in sorted(request.args.items(multi=True)))
+    # Windows are cut against the clock, so let them roll over once a minute
+    key = f"{request.path}?{params}#{snapshot.version}@{int(time.time() // 60)}"
+    return hashlib.sha1(key.encode()).hexdigest()[:20]
+
+
+def _ms(timestamp):
+    return int(np.datetime64(timestamp, 'ms').astype('i8'))
+
+
+def _window_trades(trades, window_minutes):
+    cutoff_time = CLOCK.now() - timedelta(minutes=window_minutes)
+    return trades.iloc[trades['timestamp'].searchsorted(cutoff_time, side='right'):]
+
+
+def _window_arg(default):
+    window = request.args.get('window', default, type=int)
+    if window is None or not 0 < window <= MAX_WINDOW_MINUTES:
+        raise ValueError(f"window must be between 1 and {MAX_WINDOW_MINUTES} minutes")
+    return window
+
+
+def candles_payload(snapshot):
+    timeframe = request.args.get('tf', '1m')
+    if timeframe not in TIMEFRAMES:
+        raise ValueError(f"tf must be one of {', '.join(TIMEFRAMES)}")
+    trades = _window_trades(snapshot.trades, _window_arg(60))
+
+    since = request.args.get('since', type=int)
+    if since is not None:
+        # The bar containing `since` may still be forming, so resend it whole
+        bar_start = np.datetime64(since, 'ms').astype('datetime64[ns]')
+        bar_start = bar_start - (bar_start - np.datetime64(0, 'ns')) % np.timedelta64(TIMEFRAMES[timeframe], 'm')
+        trades = trades.iloc[trades['timestamp'].searchsorted(bar_start):]
+
+    candles = create_candlestick_data(trades, timeframe_minutes=TIMEFRAMES[timeframe])
+    rows = [
+        [_ms(bar_time), row.open, row.high, row.low, row.close, row.volume]
+        for bar_time, row in zip(candles.index, candles.itertuples())
+    ]
+    return {
+        'version': snapshot.version,
+        'tf': timeframe,
+        'columns': ['time', 'open', 'high', 'low', 'close', 'volume'],
+        'candles': rows,
+        'cursor': rows[-1][0] if rows else since,
+    }
+
+
+def metrics_payload(snapshot, data_manager):
+    window = _window_arg(30)
+    metrics = data_manager.calculate_metrics(snapshot.trades, window)
+    return {
+        'version': snapshot.version,
+        'window': window,
+        'metrics': {name: float(value) for name, value in metrics.items()},
+    }
+
+
+def profile_payload(snapshot):
+    window = _window_arg(30)
+    levels = request.args.get('levels', 20, type=int)
+    if levels is None or not 0 < levels <= 200:
+        raise ValueError("levels must be between 1 and 200")
+    profile = calculate_volume_profile(_window_trades(snapshot.trades, window), price_levels=levels)
+    return {
+        'version': snapshot.version,
+        'window': window,
+        'profile': [[float(price), float(volume)] for price, volume in zip(profile.get('price', []), profile.get('volume', []))],
+    }
+
+
+def composite_payload(snapshot, profile_store):
+    sessions = request.args.get('sessions', config.COMPOSITE_DEFAULT_SESSIONS, type=int)
+    if sessions is None or not 0 < sessions <= config.PROFILE_RETENTION_DAYS:
+        raise ValueError(f"sessions must be between 1 and {config.PROFILE_RETENTION_DAYS}")
+    # Completed UTC days only, like the chart's composite levels
+    end = datetime.combine(CLOCK.now().date(), datetime.min.time())
+    start = end - timedelta(days=sessions)
+    prices, volume = profile_store.histogram(start, end)
+    nonzero = volume > 0
+    return {
+        'version': snapshot.version,
+        'tick': profile_store.tick,
+        'sessions': [
+            dict(value_area(session_prices, session_volume, config.VALUE_AREA_SHARE), date=day.isoformat())
+            for day, session_prices, session_volume in profile_store.sessions(start, end)
+            if session_volume.sum() > 0
+        ],
+        'composite': value_area(prices, volume, config.VALUE_AREA_SHARE),
+        'profile': [[float(price), float(size)] for price, size in zip(prices[nonzero], volume[nonzero])],
+    }
+
+
+def depth_payload(snapshot):
+    if not snapshot.orderbooks:
+        return {'version': snapshot.version, 'timestamp': None, 'bids': [], 'asks': []}
+    orderbook = snapshot.orderbooks[-1]
+    return {
+        'version': snapshot.version,
+        'timestamp': _ms(orderbook['timestamp']),
+        'bids': orderbook['bids'],
+        'asks': orderbook['asks'],
+    }
+
+
+def register_api_routes(server, data_manager, cache=None, profile_store=None):
+    """Expose the aggregates under /api/*"""
+    cache = cache or ResponseCache()
+
+    def serve(build):
+        if not config.PUSH_UPDATES:
+            # Otherwise background ingestion keeps the snapshot current
+            data_manager.fetch_new_data()
+        snapshot = data_manager.snapshot()
+        etag = _etag(snapshot)
+        if request.if_none_match.contains(etag):
+            response = Response(status=304)
+        else:
+            body = cache.get(etag)
+            if body is None:
+                try:
+                    body = json.dumps(build(snapshot), default=str)
+                except ValueError as e:
+                    return jsonify({'error': str(e)}), 400
+                cache.put(etag, body)
+            response = Response(body, mimetype='application/json')
+        response.set_etag(etag)
+        response.headers['Cache-Control'] = 'no-cache'
+        return response
+
+    @server.route('/api/candles')
+    def api_candles():
+        return serve(candles_payload)
+
+    @server.route('/api/metrics')
+    def api_metrics():
+        return serve(lambda snapshot: metrics_payload(snapshot, data_manager))
+
+    @server.route('/api/profile')
+    def api_profile():
+        return serve(profile_payload)
+
+    @server.route('/api/depth')
+    def api_depth():
+        return serve(depth_payload)
+
+    if profile_store is not None:
+        @server.route('/api/composite')
+        def api_composite():
+            return serve(lambda snapshot: composite_payload(snapshot, profile_store))
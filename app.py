@@ -1,20 +1,155 @@
+import startup  # first, so boot timing covers every other import
 import dash
-from dash import dcc, html, Input, Output, State
+from dash import dcc, html, Input, Output, State, ClientsideFunction, callback_context
 import plotly.graph_objects as go
+from datetime import timedelta
+import config
 from data_fetcher import OrderFlowData
+from backfill import default_backfill
+from ingest import start_background_ingest
+from push import PushHub, register_stream_route
+from metrics import CALLBACK_SECONDS, register_metrics_route
+from profiling import PROFILER, register_profile_routes
+from clock import CLOCK, FRESHNESS
+from quantiles import TradeSizeStats
+from order_detection import SweepAggregator, IcebergDetector
+from indicators import VWAPEngine
+from microstructure import MicrostructureEngine
+from bars import create_bar_engines
+from vpin import VPINEngine
+from alerts import ToastSink, create_alert_engine, delivery_sinks, register_alert_routes
+from api import ResponseCache, register_api_routes
+from export import default_archive, register_export_route
+from profile_store import default_profile_store
+from precompute import WindowPrecompute
+from memory import default_memory_manager
+from chart_pool import ChartExecutor
+from client_filter import figure_template, large_trades_dataset
 from chart_builder import (
+    bar_vwap_lines,
+    candle_vwap_lines,
     create_candlestick_with_profile,
     create_clean_delta_chart,
     create_large_trades_chart,
-    create_market_depth_chart
+    create_market_depth_chart,
+    create_microstructure_chart,
+    create_vpin_chart
 )
 
+startup.mark('imports')
+
 # Initialize data manager
-data_manager = OrderFlowData()
+if config.DATA_PLANE == 'shared':
+    # Web worker: read the buffers published by the ingestion process
+    from shared_store import SharedOrderFlowData
+    data_manager = SharedOrderFlowData(config.SHARED_DIR)
+else:
+    data_manager = OrderFlowData()
+
+# Streaming trade size sketch behind the percentile / z-score size filters
+size_stats = TradeSizeStats()
+data_manager.add_trade_listener(size_stats.update)
+sweep_aggregator = SweepAggregator(config.SWEEP_MAX_GAP_MS, config.SWEEP_MIN_TRADES)
+data_manager.add_trade_listener(sweep_aggregator.update)
+iceberg_detector = IcebergDetector(config.ICEBERG_DEPLETION, config.ICEBERG_REFILL, config.ICEBERG_MIN_REFILLS)
+data_manager.add_book_listener(iceberg_detector.update)
+microstructure = MicrostructureEngine(config.MICRO_LEVELS, config.MICRO_DEPTH_BPS)
+data_manager.add_book_listener(microstructure.update)
+vwap_engine = VWAPEngine()
+data_manager.add_trade_listener(vwap_engine.update)
+bar_engines = create_bar_engines(config.BAR_THRESHOLDS, timedelta(hours=config.TRADE_RETENTION_HOURS))
+for bar_engine in bar_engines.values():
+    data_manager.add_trade_listener(bar_engine.update)
+vpin_engine = VPINEngine(config.VPIN_BUCKET_VOLUME, config.VPIN_WINDOW_BUCKETS,
+                         timedelta(hours=config.TRADE_RETENTION_HOURS))
+data_manager.add_trade_listener(vpin_engine.update)
+VPIN_THRESHOLDS = sorted(rule['threshold'] for rule in config.ALERT_RULES if rule['type'] == 'vpin')
+
+# Metrics, candles, delta and profiles for every offered window, once per version
+window_precompute = WindowPrecompute(config.TIME_WINDOWS, config.PRECOMPUTE_MAX_AGE)
+
+# Builds the figures of a refresh serially, on threads or on worker processes
+chart_executor = ChartExecutor(config.CHART_EXECUTOR, config.CHART_WORKERS)
+
+# Alert rules run on ingest; in the shared data plane the ingestion process
+# logs and delivers them, web workers only show them as toasts
+alert_toasts = ToastSink()
+alert_sinks = [alert_toasts]
+if config.DATA_PLANE != 'shared':
+    alert_sinks += delivery_sinks()
+alert_engine = create_alert_engine(alert_sinks)
+data_manager.add_trade_listener(alert_engine.on_trades)
+data_manager.add_book_listener(alert_engine.on_book)
+
+# Tick archive for exports, written by whichever process ingests
+tick_archive = default_archive()
+if tick_archive is not None and config.DATA_PLANE != 'shared':
+    data_manager.add_trade_listener(tick_archive.append_trades)
+    data_manager.add_book_listener(tick_archive.append_book)
+
+# Hourly volume profiles for the composite value area; written by whichever
+# process ingests, read from disk by web workers in the shared data plane
+profile_store = default_profile_store()
+if profile_store is not None and config.DATA_PLANE != 'shared':
+    data_manager.add_trade_listener(profile_store.update)
+
+# Cold start: load the last hours of trades from the exchange alongside the live polls
+backfill = default_backfill(data_manager) if config.DATA_PLANE != 'shared' else None
 
 # Initialize Dash app
 app = dash.Dash(__name__, title="BTC Order Flow Analyzer")
 
+register_metrics_route(app.server)
+register_profile_routes(app.server)
+register_alert_routes(app.server, alert_toasts)
+api_cache = ResponseCache()
+register_api_routes(app.server, data_manager, api_cache, profile_store=profile_store)
+register_export_route(app.server, data_manager, tick_archive)
+
+# Keeps the stores of this process within MEMORY_BUDGET_MB; the trade store
+# itself is only trimmed where it is ingested
+memory_manager = default_memory_manager(
+    data_manager, config.DATA_PLANE != 'shared', api_cache, window_precompute, microstructure, profile_store
+)
+memory_manager.add_store('bars', lambda: sum(engine.nbytes() for engine in bar_engines.values()))
+memory_manager.add_store('vpin', vpin_engine.nbytes)
+PROFILER.store_probe = memory_manager.measure
+
+# Push channel: ingestion runs in the background and streams deltas to clients
+push_hub = None
+if config.PUSH_UPDATES:
+    push_hub = PushHub(max_clients=config.PUSH_MAX_CLIENTS)
+    register_stream_route(app.server, push_hub)
+    if backfill is not None:
+        backfill.add_listener(push_hub.publish_backfill)
+
+def window_label(minutes):
+    """Dropdown label for a time window"""
+    if minutes % 60:
+        return f"Last {minutes} minutes"
+    hours = minutes // 60
+    return f"Last {hours} hour{'s' if hours > 1 else ''}"
+
+def bar_label(kind):
+    """Name of an activity bar type with its threshold"""
+    threshold = config.BAR_THRESHOLDS[kind]
+    return {
+        'volume': f"{threshold:g} BTC Volume",
+        'tick': f"{threshold:g} Tick",
+        'range': f"${threshold:g} Range",
+        'delta': f"{threshold:g} BTC Delta",
+    }[kind]
+
+update_frequency_options = [
+    {'label': '10 seconds', 'value': 10000},
+    {'label': '30 seconds', 'value': 30000},
+    {'label': '1 minute', 'value': 60000},
+    {'label': '5 minutes', 'value': 300000},
+]
+if config.PUSH_UPDATES:
+    update_frequency_options.insert(0, {'label': '⚡ Live (push)', 'value': 0})
+LIVE_FALLBACK_INTERVAL = 10000  # ms, polling while a live dashboard has no open stream
+
 app.layout = html.Div([
     # Header
     html.Div([
@@ -22,6 +157,9 @@ app.layout = html.Div([
                 style={'textAlign': 'center', 'color': '#2c3e50', 'marginBottom': '10px'}),
         html.P("Advanced trading analysis with real-time order flow visualization", 
                style={'textAlign': 'center', 'color': '#7f8c8d', 'marginBottom': '20px'}),
+        # Filled in by assets/push.js straight from the event stream
+        html.P(id='live-ticker', style={'textAlign': 'center', 'color': '#2c3e50', 'marginBottom': '10px'}),
+        html.P(id='backfill-status', style={'textAlign': 'center', 'color': '#7f8c8d', 'marginBottom': '10px'}),
     ]),
     
     # Controls Panel
@@ -31,38 +169,68 @@ app.layout = html.Div([
             dcc.Dropdown(
                 id='time-window',
                 options=[
-                    {'label': 'Last 15 minutes', 'value': 15},
-                    {'label': 'Last 30 minutes', 'value': 30},
-                    {'label': 'Last 1 hour', 'value': 60},
-                    {'label': 'Last 2 hours', 'value': 120},
+                    {'label': window_label(minutes), 'value': minutes} for minutes in config.TIME_WINDOWS
                 ],
                 value=30,
                 style={'width': '200px'}
             ),
         ], style={'display': 'inline-block', 'marginRight': '20px'}),
         
+        html.Div([
+            html.Label("🕯 Bars:", style={'fontWeight': 'bold'}),
+            dcc.Dropdown(
+                id='bar-type',
+                options=[{'label': '1 minute', 'value': 'time'}] + [
+                    {'label': bar_label(kind), 'value': kind} for kind in bar_engines
+                ],
+                value='time',
+                clearable=False,
+                style={'width': '200px'}
+            ),
+        ], style={'display': 'inline-block', 'marginRight': '20px'}),
+        
+        html.Div([
+            html.Label("🏛 Composite Value Area:", style={'fontWeight': 'bold'}),
+            dcc.Dropdown(
+                id='composite-sessions',
+                options=[{'label': 'Off', 'value': 0}] + [
+                    {'label': 'Previous session' if sessions == 1 else f'Last {sessions} sessions', 'value': sessions}
+                    for sessions in config.COMPOSITE_SESSIONS
+                ],
+                value=config.COMPOSITE_DEFAULT_SESSIONS if profile_store is not None else 0,
+                disabled=profile_store is None,
+                style={'width': '200px'}
+            ),
+        ], style={'display': 'inline-block', 'marginRight': '20px'}),
+        
         html.Div([
             html.Label("🔄 Update Frequency:", style={'fontWeight': 'bold'}),
             dcc.Dropdown(
                 id='update-frequency',
-                options=[
-                    {'label': '10 seconds', 'value': 10000},
-                    {'label': '30 seconds', 'value': 30000},
-                    {'label': '1 minute', 'value': 60000},
-                    {'label': '5 minutes', 'value': 300000},
-                ],
-                value=30000,
+                options=update_frequency_options,
+                value=0 if config.PUSH_UPDATES else 30000,
                 style={'width': '200px'}
             ),
         ], style={'display': 'inline-block', 'marginRight': '20px'}),
         
         html.Div([
-            html.Label("💰 Min Trade Size (BTC):", style={'fontWeight': 'bold'}),
+            html.Label("💰 Min Trade Size (BTC):", id='trade-size-label', style={'fontWeight': 'bold'}),
+            dcc.RadioItems(
+                id='trade-size-mode',
+                options=[
+                    {'label': 'BTC', 'value': 'btc'},
+                    {'label': 'Top %', 'value': 'percentile'},
+                    {'label': 'Z-score', 'value': 'zscore'},
+                ],
+                value='btc',
+                inline=True,
+                inputStyle={'marginRight': '4px', 'marginLeft': '8px'}
+            ),
             dcc.Slider(
                 id='trade-size-filter',
-                min=0.1,
-                max=5,
-                step=0.1,
+                min=config.TRADE_SIZE_MIN,
+                max=config.TRADE_SIZE_MAX,
+                step=config.TRADE_SIZE_STEP,
                 value=1.0,
                 marks={0.1: '0.1', 1: '1', 2: '2', 3: '3', 4: '4', 5: '5'},
             ),
@@ -73,8 +241,19 @@ app.layout = html.Div([
                           'padding': '10px 20px', 'borderRadius': '5px', 'cursor': 'pointer',
                           'fontWeight': 'bold'}),
         
+        # Clicked by assets/push.js when the server pushes new data, and when
+        # the stream opens or fails (the interval timer covers for it until it opens)
+        html.Button(id='push-refresh', n_clicks=0, style={'display': 'none'}),
+        html.Button(id='push-state', n_clicks=0, style={'display': 'none'}),
+        html.Span(id='push-status', style={'marginLeft': '10px', 'color': '#7f8c8d'}),
+        
     ], style={'backgroundColor': '#f8f9fa', 'padding': '15px', 'borderRadius': '5px', 'marginBottom': '20px'}),
     
+    # Recent alerts
+    html.Div(id='alert-toasts', style={
+        'position': 'fixed', 'top': '20px', 'right': '20px', 'zIndex': 1000, 'maxWidth': '360px'
+    }),
+    
     # Market Statistics
     html.Div(id="market-stats", style={
         'backgroundColor': '#ecf0f1', 
@@ -99,7 +278,12 @@ app.layout = html.Div([
                 id='candlestick-chart', 
                 style={'height': '500px'},
                 config={'displayModeBar': True, 'scrollZoom': True}
-            )
+            ),
+            html.Div([
+                html.Span("Click a candle to anchor a VWAP there", style={'color': '#7f8c8d', 'marginRight': '10px'}),
+                html.Button('Clear anchors', id='clear-vwap-anchors', n_clicks=0),
+            ]),
+            dcc.Store(id='vwap-anchors', data=[]),
         ], style={'width': '100%', 'padding': '10px', 'marginBottom': '20px'}),
         
         # Row 2: Delta Analysis
@@ -108,6 +292,16 @@ app.layout = html.Div([
                 id='delta-chart', 
                 style={'height': '400px'},
                 config={'displayModeBar': True, 'scrollZoom': True}
+            ),
+            dcc.Graph(
+                id='microstructure-chart', 
+                style={'height': '450px'},
+                config={'displayModeBar': True, 'scrollZoom': True}
+            ),
+            dcc.Graph(
+                id='vpin-chart', 
+                style={'height': '400px'},
+                config={'displayModeBar': True, 'scrollZoom': True}
             )
         ], style={'width': '100%', 'padding': '10px', 'marginBottom': '20px'}),
         
@@ -118,7 +312,11 @@ app.layout = html.Div([
                     id='large-trades-chart', 
                     style={'height': '400px'},
                     config={'displayModeBar': True, 'scrollZoom': True}
-                )
+                ),
+                # Client-side filtering: the window's trades, drawn by assets/client_filter.js
+                dcc.Store(id='large-trades-data'),
+                dcc.Store(id='large-trades-cursor'),  # last trade the browser holds, so only newer ones are sent
+                dcc.Store(id='figure-template', data=figure_template() if config.CLIENT_FILTERING else None),
             ], style={'width': '50%', 'display': 'inline-block', 'padding': '10px'}),
             
             html.Div([
@@ -148,45 +346,194 @@ app.layout = html.Div([
     [Output('market-stats', 'children'),
      Output('candlestick-chart', 'figure'),
      Output('delta-chart', 'figure'),
-     Output('large-trades-chart', 'figure'),
+     Output('large-trades-data', 'data') if config.CLIENT_FILTERING else Output('large-trades-chart', 'figure'),
      Output('market-depth-chart', 'figure'),
+     Output('microstructure-chart', 'figure'),
+     Output('vpin-chart', 'figure'),
      Output('data-summary', 'children'),
-     Output('interval-component', 'interval')],
+     Output('interval-component', 'interval'),
+     Output('alert-toasts', 'children')],
     [Input('interval-component', 'n_intervals'),
-     Input('update-button', 'n_clicks')],
+     Input('update-button', 'n_clicks'),
+     Input('push-refresh', 'n_clicks'),
+     Input('vwap-anchors', 'data'),
+     Input('bar-type', 'value')],
     [State('time-window', 'value'),
      State('update-frequency', 'value'),
-     State('trade-size-filter', 'value')]
+     State('trade-size-filter', 'value'),
+     State('trade-size-mode', 'value'),
+     State('composite-sessions', 'value'),
+     State('large-trades-cursor', 'data')]
 )
-def update_dashboard(n_intervals, n_clicks, time_window, update_frequency, min_trade_size):
-    # Fetch new data
-    new_trades_count = data_manager.fetch_new_data()
+@CALLBACK_SECONDS.time()
+@PROFILER.profiled('callback')
+def update_dashboard(n_intervals, n_clicks, n_pushes, vwap_anchors, bar_type, time_window, update_frequency,
+                     trade_size_value, trade_size_mode, composite_sessions=0, large_trades_cursor=None):
+    if not config.PUSH_UPDATES:
+        # Otherwise ingestion runs in the background and we just read what it collected
+        data_manager.fetch_new_data()
+        memory_manager.check()
     
-    trades = data_manager.all_trades
-    orderbooks = data_manager.orderbook_history
+    # Every chart in this refresh reads the same data version
+    snapshot = data_manager.snapshot()
+    trades = snapshot.trades
+    orderbooks = snapshot.orderbooks
     
-    metrics = data_manager.calculate_metrics(trades, time_window)
+    window = window_precompute.window(snapshot, time_window)
+    metrics = window.metrics
+    min_trade_size, size_label = resolve_trade_size_filter(trade_size_mode, trade_size_value)
     
     # Update market stats
-    stats_display = create_market_stats(metrics)
+    stats_display = create_market_stats(metrics, data_manager.staleness(), vpin_engine.latest())
     
-    # Update all charts
-    candlestick_fig = create_candlestick_with_profile(trades, time_window)
-    delta_fig = create_clean_delta_chart(trades, time_window)
-    large_trades_fig = create_large_trades_chart(trades, time_window, min_trade_size)
-    depth_fig = create_market_depth_chart(orderbooks, metrics)
+    # Build and serialize all charts; state that lives in this process
+    # (VWAP totals, sweeps, icebergs, book series) is read here and passed in
+    jobs = {
+        'candlestick': candlestick_job(window, bar_type, vwap_anchors or [], composite_sessions),
+        'delta': (create_clean_delta_chart, (window,)),
+        'large_trades': (create_large_trades_chart,
+                         (window, min_trade_size, size_label, sweep_aggregator.sweeps(min_size=min_trade_size))),
+        'market_depth': (create_market_depth_chart, (orderbooks[-1:], metrics, iceberg_detector.icebergs())),
+        'microstructure': (create_microstructure_chart, (microstructure.series(window.start, window.end), window,
+                                                         config.MICRO_LEVELS, config.MICRO_DEPTH_BPS)),
+        'vpin': (create_vpin_chart, (vpin_engine.series(window.start, window.end), window, VPIN_THRESHOLDS,
+                                     config.VPIN_WINDOW_BUCKETS, config.VPIN_BUCKET_VOLUME)),
+    }
+    if config.CLIENT_FILTERING:
+        # The browser filters and draws the Large Trades chart from the largest window
+        del jobs['large_trades']
+        largest = window_precompute.window(snapshot, max(config.TIME_WINDOWS))
+        large_trades = large_trades_dataset(snapshot, largest, sweep_aggregator.sweeps(since=largest.start),
+                                            size_stats, trade_size_mode, large_trades_cursor)
+    figures = chart_executor.build(jobs, window)
+    if not config.CLIENT_FILTERING:
+        large_trades = figures['large_trades']
+    
+    # Everything new in this refresh has now reached a screen
+    FRESHNESS.record_render(trades)
     
     # Update data summary
-    summary_text = create_data_summary(trades, min_trade_size, new_trades_count)
+    summary_text = create_data_summary(snapshot, min_trade_size, size_label)
     
-    return stats_display, candlestick_fig, delta_fig, large_trades_fig, depth_fig, summary_text, update_frequency
+    # Live mode is driven by the push channel; the timer (disabled by assets/push.js
+    # while the stream is open) is the fallback when it is refused or drops
+    return (stats_display, figures['candlestick'], figures['delta'], large_trades,
+            figures['market_depth'], figures['microstructure'], figures['vpin'], summary_text,
+            update_frequency or LIVE_FALLBACK_INTERVAL, create_alert_toasts())
 
-def create_market_stats(metrics):
+@app.callback(
+    Output('trade-size-label', 'children'),
+    Input('trade-size-mode', 'value')
+)
+def update_trade_size_label(trade_size_mode):
+    return {
+        'percentile': "💰 Largest Trades (top %):",
+        'zscore': "💰 Trade Size Z-score (log size):",
+    }.get(trade_size_mode, "💰 Min Trade Size (BTC):")
+
+@app.callback(
+    Output('vwap-anchors', 'data'),
+    [Input('candlestick-chart', 'clickData'),
+     Input('clear-vwap-anchors', 'n_clicks')],
+    State('vwap-anchors', 'data'),
+    prevent_initial_call=True
+)
+def update_vwap_anchors(click_data, n_clears, anchors):
+    """Add an anchored VWAP at the clicked candle, or clear them all"""
+    if callback_context.triggered[0]['prop_id'].startswith('clear-vwap-anchors'):
+        return []
+    anchors = list(anchors or [])
+    anchor = click_data['points'][0]['x'] if click_data else None
+    # Clicks on the volume profile carry a volume, not a time
+    if not isinstance(anchor, str) or anchor in anchors:
+        return dash.no_update
+    return (anchors + [anchor])[-config.VWAP_MAX_ANCHORS:]
+
+def resolve_trade_size_filter(mode, value):
+    """Turn the size slider setting into (min size in BTC, label)"""
+    if mode == 'percentile':
+        size = size_stats.size_at_top_percent(value)
+        if size is not None:
+            return size, f"top {value:g}%, ≥{size:.2f}BTC"
+    elif mode == 'zscore':
+        size = size_stats.size_at_zscore(value)
+        if size is not None:
+            return size, f"z≥{value:g}, ≥{size:.2f}BTC"
+    # Absolute mode, or the sketch has not seen any trades yet
+    return value, f"≥{value}BTC"
+
+# Open or close the event stream when the update mode changes
+app.clientside_callback(
+    ClientsideFunction(namespace='orderflow', function_name='togglePush'),
+    Output('push-status', 'children'),
+    Input('update-frequency', 'value')
+)
+
+# The interval timer only goes quiet while the event stream is actually open
+app.clientside_callback(
+    ClientsideFunction(namespace='orderflow', function_name='intervalDisabled'),
+    Output('interval-component', 'disabled'),
+    [Input('push-state', 'n_clicks'),
+     Input('update-frequency', 'value')]
+)
+
+# Client-side filtering: slider, size mode and window changes redraw Large Trades in the browser
+if config.CLIENT_FILTERING:
+    app.clientside_callback(
+        ClientsideFunction(namespace='orderflow', function_name='largeTradesFigure'),
+        Output('large-trades-chart', 'figure'),
+        [Input('large-trades-data', 'data'),
+         Input('trade-size-filter', 'value'),
+         Input('trade-size-mode', 'value'),
+         Input('time-window', 'value')],
+        State('figure-template', 'data')
+    )
+    app.clientside_callback(
+        ClientsideFunction(namespace='orderflow', function_name='largeTradesCursor'),
+        Output('large-trades-cursor', 'data'),
+        Input('large-trades-data', 'data')
+    )
+
+def candlestick_job(window, bar_type, vwap_anchors, composite_sessions):
+    """Price chart job: one-minute candles, or the window's slice of an activity bar engine"""
+    if bar_type not in bar_engines:
+        return (create_candlestick_with_profile,
+                (window, candle_vwap_lines(window, vwap_engine, vwap_anchors), composite_levels(composite_sessions)))
+    bars = bar_engines[bar_type].frame(window.start, window.end)
+    return (create_candlestick_with_profile,
+            (window, bar_vwap_lines(bars, vwap_engine, vwap_anchors), composite_levels(composite_sessions),
+             bars, bar_label(bar_type)))
+
+def composite_levels(sessions):
+    """POC/VAH/VAL of the last `sessions` completed sessions, labelled for the chart"""
+    if not sessions or profile_store is None:
+        return None
+    levels = profile_store.composite_levels(sessions, config.VALUE_AREA_SHARE, CLOCK.now().date())
+    if levels is None:
+        return None
+    return dict(levels, label='Prev session' if sessions == 1 else f'{sessions}-session')
+
+def create_alert_toasts():
+    """Alerts from the last minute, newest first"""
+    return [
+        html.Div(f"🚨 {alert['message']}", style={
+            'backgroundColor': '#fdecea', 'color': '#c0392b', 'border': '1px solid #e74c3c',
+            'padding': '8px 12px', 'borderRadius': '5px', 'marginBottom': '8px', 'fontSize': '14px'
+        })
+        for alert in reversed(alert_toasts.recent(60))
+    ]
+
+def create_market_stats(metrics, staleness=None, toxicity=None):
     """Create market statistics display"""
     if not metrics:
         return html.Div("📡 Connecting to exchange...")
     
-    return html.Div([
+    stale_banner = []
+    if staleness is not None:
+        stale_banner = [html.Div(f"⚠️ Exchange not responding, showing data from {staleness:.0f}s ago",
+                                 style={'color': '#c0392b', 'fontWeight': 'bold', 'marginBottom': '10px'})]
+    
+    return html.Div(stale_banner + [
         html.Div([
             html.Span(f"💰 Current Price: ${metrics['current_price']:,.2f} ", 
                      style={'color': '#2c3e50', 'fontSize': '20px', 'fontWeight': 'bold'}),
@@ -202,12 +549,23 @@ def create_market_stats(metrics):
             html.Span(f"🔴 Sell Volume: {metrics['sell_volume']:.1f} BTC", 
                      style={'marginRight': '20px', 'color': 'red'}),
             html.Span(f"Δ Net Delta: {metrics['net_delta']:+.1f} BTC", 
-                     style={'color': 'green' if metrics['net_delta'] >= 0 else 'red', 'fontWeight': 'bold'}),
+                     style={'color': 'green' if metrics['net_delta'] >= 0 else 'red', 'fontWeight': 'bold',
+                            'marginRight': '20px'}),
+            create_toxicity_stat(toxicity),
         ], style={'marginTop': '10px'})
     ])
 
-def create_data_summary(trades, min_trade_size, new_trades_count):
+def create_toxicity_stat(toxicity):
+    """VPIN header stat, red at or above the lowest vpin alert threshold"""
+    if toxicity is None:
+        return html.Span("☣️ VPIN: filling buckets…", style={'color': '#7f8c8d'})
+    toxic = bool(VPIN_THRESHOLDS) and toxicity['vpin'] >= VPIN_THRESHOLDS[0]
+    return html.Span(f"☣️ VPIN: {toxicity['vpin']:.2f} ({toxicity['buckets']}×{config.VPIN_BUCKET_VOLUME:g} BTC)",
+                     style={'color': '#c0392b' if toxic else '#2c3e50', 'fontWeight': 'bold' if toxic else 'normal'})
+
+def create_data_summary(snapshot, min_trade_size, size_label):
     """Create data summary footer"""
+    trades = snapshot.trades
     if len(trades) == 0:
         return "🔄 Collecting initial market data..."
     
@@ -216,10 +574,55 @@ def create_data_summary(trades, min_trade_size, new_trades_count):
     
     return html.Div([
         f"📈 Data Summary: {total_trades:,} total trades | ",
-        f"{large_trades_count:,} large trades (≥{min_trade_size}BTC) | ",
-        f"🔄 {new_trades_count} new trades | ",
-        f"🕒 Last update: {data_manager.last_update.strftime('%H:%M:%S') if data_manager.last_update else 'N/A'}"
+        f"{large_trades_count:,} large trades ({size_label}) | ",
+        f"🔄 {snapshot.new_trades_count} new trades | ",
+        f"🕒 Last update: {snapshot.last_update.strftime('%H:%M:%S') + ' UTC' if snapshot.last_update else 'N/A'} | ",
+        create_freshness_summary(),
+        create_backfill_summary(),
+        html.Br(),
+        create_memory_summary()
     ])
 
+def create_memory_summary():
+    """Store memory against the budget, and any relief in force"""
+    status = memory_manager.status()
+    if not status['stores']:
+        return "🧠 Memory: measuring…"
+    largest = sorted(status['stores'].items(), key=lambda item: -item[1])[:3]
+    text = (f"🧠 Memory {status['total'] / 2**20:.0f}/{status['budget'] / 2**20:.0f}MB ("
+            + ", ".join(f"{name} {size / 2**20:.1f}MB" for name, size in largest) + ")")
+    if status['relief']:
+        text += f" ⚠️ over budget, applied: {', '.join(status['relief'])}"
+    return text
+
+def create_backfill_summary():
+    """Backfill progress while it runs (live dashboards also get it pushed)"""
+    if backfill is None:
+        return ""
+    progress = backfill.progress()
+    if not progress['running']:
+        return ""
+    return f" | ⏳ Backfill {progress['fraction']:.0%} ({progress['trades']:,} trades)"
+
+def create_freshness_summary():
+    """Tick-to-screen latency percentiles and clock skew"""
+    percentiles = FRESHNESS.percentiles()
+    skew = f"clock skew {CLOCK.offset * 1000:+.0f}ms"
+    if not percentiles:
+        return f"⏱ Freshness: collecting… ({skew})"
+    return (f"⏱ Freshness p50 {percentiles[50]:.1f}s / p95 {percentiles[95]:.1f}s / "
+            f"p99 {percentiles[99]:.1f}s ({skew})")
+
 # Required for Render.com - add this at the end
-server = app.server
\ No newline at end of file
+server = app.server
+
+# The page can be served now; the exchange side comes up in the background
+startup.mark('layout')
+if push_hub is not None:
+    # Precompute first, so clients refreshing on a push find it done
+    start_background_ingest(data_manager, [window_precompute, push_hub, memory_manager])
+else:
+    data_manager.start_warm_up()
+if backfill is not None:
+    backfill.start()
+chart_executor.start()
\ No newline at end of file
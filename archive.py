@@ -0,0 +1,84 @@
+"""
+Append-only tick archive in DATA_DIR.
+
+Every ingested trade and order book snapshot is appended to a per-day
+file of fixed-size records (the shared store's TRADE_DTYPE / BOOK_DTYPE).
+Records arrive in time order, so a time range is a binary search on a
+memory-mapped file and can be read back in chunks without loading a day.
+"""
+
+import os
+import threading
+from datetime import datetime, timedelta
+
+import numpy as np
+
+from shared_store import BOOK_DTYPE, TRADE_DTYPE, orderbooks_to_array, trades_to_array
+
+DTYPES = {'trades': TRADE_DTYPE, 'book': BOOK_DTYPE}
+
+
+class TickArchive:
+    def __init__(self, directory, retention_days=30):
+        self.directory = directory
+        self.retention_days = retention_days
+        self.lock = threading.Lock()
+        self.last_pruned = None
+
+    def _path(self, kind, day):
+        return os.path.join(self.directory, f"{kind}-{day:%Y%m%d}.bin")
+
+    def append_trades(self, new_trades):
+        """Trade listener"""
+        if len(new_trades) == 0:
+            return
+        self._append('trades', trades_to_array(new_trades))
+
+    def append_book(self, orderbook):
+        """Book listener"""
+        self._append('book', orderbooks_to_array([orderbook]))
+
+    def _append(self, kind, records):
+        days = records['timestamp'] // 86_400_000
+        bounds = np.flatnonzero(np.r_[True, days[1:] != days[:-1]])
+        with self.lock:
+            os.makedirs(self.directory, exist_ok=True)
+            for start, end in zip(bounds, np.r_[bounds[1:], len(records)]):
+                day = datetime.utcfromtimestamp(int(days[start]) * 86_400)
+                with open(self._path(kind, day), 'ab') as f:
+                    f.write(records[start:end].tobytes())
+            self._prune()
+
+    def _prune(self):
+        today = datetime.utcnow().date()
+        if self.last_pruned == today:
+            return
+        self.last_pruned = today
+        cutoff = f"{today - timedelta(days=self.retention_days):%Y%m%d}"
+        for name in os.listdir(self.directory):
+            stem, _, extension = name.rpartition('.')
+            if extension == 'bin' and stem.rpartition('-')[2] < cutoff:
+                os.remove(os.path.join(self.directory, name))
+
+    def records(self, kind, start, end, chunk_rows=50000):
+        """Yield record array chunks of `kind` with start <= timestamp < end"""
+        dtype = DTYPES[kind]
+        start_ms = int(np.datetime64(start, 'ms').astype('i8'))
+        end_ms = int(np.datetime64(end, 'ms').astype('i8'))
+        day = datetime.utcfromtimestamp(start_ms // 86_400_000 * 86_400)
+        while day < end:
+            path = self._path(kind, day)
+            day += timedelta(days=1)
+            if not os.path.exists(path):
+                continue
+            # Only whole records; a concurrent append may have written part of one
+            count = os.path.getsize(path) // dtype.itemsize
+            if count == 0:
+                continue
+            mapped = np.memmap(path, dtype=dtype, mode='r', shape=(count,))
+            first = np.searchsorted(mapped['timestamp'], start_ms)
+            last = np.searchsorted(mapped['timestamp'], end_ms)
+            for offset in range(first, last, chunk_rows):
+                # Copy out so the chunk does not pin the mapping
+                yield np.array(mapped[offset:min(offset + chunk_rows, last)])
+            del mapped
@@ -0,0 +1,265 @@
+// Large Trades chart built in the browser from the shipped window (see client_filter.py)
+(function () {
+    var ARRAYS = {f8: Float64Array, f4: Float32Array, i1: Int8Array, i4: Int32Array};
+
+    // Rows received so far; refreshes only append the trades after the last one
+    var held = {key: null, minSize: null, trades: null, sweeps: null, trend: null, partial: false};
+
+    function decodeColumn(column) {
+        var bytes = atob(column.data);
+        var buffer = new Uint8Array(bytes.length);
+        for (var i = 0; i < bytes.length; i++) {
+            buffer[i] = bytes.charCodeAt(i);
+        }
+        return new ARRAYS[column.dtype](buffer.buffer);
+    }
+
+    function decodeColumns(columns) {
+        if (!columns) {
+            return null;
+        }
+        var arrays = {};
+        Object.keys(columns).forEach(function (name) {
+            arrays[name] = decodeColumn(columns[name]);
+        });
+        return arrays;
+    }
+
+    function concat(columns, extra) {
+        var joined = {};
+        Object.keys(columns).forEach(function (name) {
+            var values = new columns[name].constructor(columns[name].length + extra[name].length);
+            values.set(columns[name]);
+            values.set(extra[name], columns[name].length);
+            joined[name] = values;
+        });
+        return joined;
+    }
+
+    function slice(columns, begin, end) {
+        var sliced = {};
+        Object.keys(columns).forEach(function (name) {
+            sliced[name] = columns[name].slice(begin, end);
+        });
+        return sliced;
+    }
+
+    // Position after the held trade with key [t, price, size], or -1
+    function after(trades, key) {
+        for (var i = trades.t.length - 1; i >= 0 && trades.t[i] >= key[0]; i--) {
+            if (trades.t[i] === key[0] && trades.price[i] === key[1] && trades.size[i] === key[2]) {
+                return i + 1;
+            }
+        }
+        return -1;
+    }
+
+    function decode(data) {
+        // Each payload is applied once; slider and window changes reuse the held arrays
+        var key = data.version + ':' + JSON.stringify(data.after);
+        if (held.key === key) {
+            return held;
+        }
+        var trades = decodeColumns(data.trades);
+        var partial = false;
+        if (data.append) {
+            // An older cursor only means the rows after it are sent again
+            var position = held.trades && held.minSize === data.min_size ? after(held.trades, data.after) : -1;
+            if (position < 0) {
+                // Shown as it is, but without a cursor the next refresh reloads the window
+                partial = true;
+            } else {
+                trades = concat(slice(held.trades, 0, position), trades);
+            }
+        }
+        var first = 0;
+        while (first < trades.t.length && trades.t[first] <= data.start) {
+            first++;
+        }
+        held = {
+            key: key,
+            minSize: data.min_size,
+            trades: first ? slice(trades, first, trades.t.length) : trades,
+            sweeps: decodeColumns(data.sweeps),
+            trend: decodeColumns(data.trend),
+            partial: partial
+        };
+        return held;
+    }
+
+    // What the server needs to send only newer trades
+    function largeTradesCursor(data) {
+        if (!data || data.loading) {
+            return null;
+        }
+        var trades = decode(data).trades;
+        var count = trades.t.length;
+        if (held.partial || !count) {
+            return null;
+        }
+        return {
+            min_size: held.minSize,
+            first: trades.t[0],
+            last: [trades.t[count - 1], trades.price[count - 1], trades.size[count - 1]],
+            count: count
+        };
+    }
+
+    // Rows for which keep(i) holds, as new typed arrays
+    function pick(columns, keep) {
+        var length = columns.t.length;
+        var index = new Int32Array(length);
+        var count = 0;
+        for (var i = 0; i < length; i++) {
+            if (keep(i)) {
+                index[count++] = i;
+            }
+        }
+        var picked = {};
+        Object.keys(columns).forEach(function (name) {
+            var source = columns[name];
+            var values = new source.constructor(count);
+            for (var j = 0; j < count; j++) {
+                values[j] = source[index[j]];
+            }
+            picked[name] = values;
+        });
+        return picked;
+    }
+
+    function markerSizes(sizes) {
+        var result = new Float32Array(sizes.length);
+        for (var i = 0; i < sizes.length; i++) {
+            result[i] = Math.max(10, Math.min(50, sizes[i] * 3));
+        }
+        return result;
+    }
+
+    function formatValue(value) {
+        return Number.isInteger(value) ? value.toFixed(1) : String(value);
+    }
+
+    // [min size in BTC, label], as resolve_trade_size_filter does on the server
+    function resolveSize(data, mode, value) {
+        var sizes = data.thresholds[mode];
+        if (sizes) {
+            var step = 0;
+            for (var i = 1; i < data.steps.length; i++) {
+                if (Math.abs(data.steps[i] - value) < Math.abs(data.steps[step] - value)) {
+                    step = i;
+                }
+            }
+            var size = sizes[step];
+            var prefix = mode === 'percentile' ? 'top ' + value + '%' : 'z≥' + value;
+            if (size < data.min_size) {
+                return [data.min_size, prefix + ', floored at ≥' + data.min_size.toFixed(2) + 'BTC'];
+            }
+            return [size, prefix + ', ≥' + size.toFixed(2) + 'BTC'];
+        }
+        var label = '≥' + formatValue(value) + 'BTC';
+        if (value < data.min_size) {
+            // Shipped for another size mode; the next refresh ships the smaller trades
+            label += ' (smaller trades on the next refresh)';
+        }
+        return [value, label];
+    }
+
+    function emptyFigure(message, title, template) {
+        return {
+            data: [],
+            layout: {
+                template: template,
+                title: {text: title},
+                annotations: [{
+                    text: message, xref: 'paper', yref: 'paper', x: 0.5, y: 0.5,
+                    xanchor: 'center', yanchor: 'middle', showarrow: false, font: {size: 16}
+                }]
+            }
+        };
+    }
+
+    function largeTradesFigure(data, sliderValue, sizeMode, minutes, template) {
+        if (!data || data.loading) {
+            return emptyFigure('Collecting trade data...', 'Large Trades - Loading...', template);
+        }
+        var columns = decode(data);
+        var resolved = resolveSize(data, sizeMode, sliderValue);
+        var minSize = resolved[0];
+        var label = resolved[1];
+        var start = data.end - minutes * 60000;
+
+        var trades = columns.trades;
+        var buys = pick(trades, function (i) { return trades.t[i] > start && trades.size[i] >= minSize && trades.side[i] > 0; });
+        var sells = pick(trades, function (i) { return trades.t[i] > start && trades.size[i] >= minSize && trades.side[i] < 0; });
+        var sweeps = columns.sweeps;
+        var largeSweeps = sweeps ? pick(sweeps, function (i) { return sweeps.t[i] > start && sweeps.size[i] >= minSize; }) : null;
+
+        if (!buys.t.length && !sells.t.length && !(largeSweeps && largeSweeps.t.length)) {
+            return emptyFigure('No large trades (' + label + ') in last ' + minutes + ' minutes',
+                               'Large Trades (' + label + ')', template);
+        }
+
+        var traces = [];
+        if (buys.t.length) {
+            traces.push({
+                type: 'scatter', mode: 'markers', x: buys.t, y: buys.price, customdata: buys.size,
+                marker: {size: markerSizes(buys.size), color: 'green', symbol: 'triangle-up',
+                         line: {width: 2, color: 'darkgreen'}, opacity: 0.8},
+                name: 'Large Buys (' + buys.t.length + ')',
+                hovertemplate: '<b>LARGE BUY</b><br>Price: $%{y:.2f}<br>Size: %{customdata:.3f} BTC<br>Time: %{x}<extra></extra>'
+            });
+        }
+        if (sells.t.length) {
+            traces.push({
+                type: 'scatter', mode: 'markers', x: sells.t, y: sells.price, customdata: sells.size,
+                marker: {size: markerSizes(sells.size), color: 'red', symbol: 'triangle-down',
+                         line: {width: 2, color: 'darkred'}, opacity: 0.8},
+                name: 'Large Sells (' + sells.t.length + ')',
+                hovertemplate: '<b>LARGE SELL</b><br>Price: $%{y:.2f}<br>Size: %{customdata:.3f} BTC<br>Time: %{x}<extra></extra>'
+            });
+        }
+        if (largeSweeps && largeSweeps.t.length) {
+            var colors = [];
+            var text = [];
+            for (var i = 0; i < largeSweeps.t.length; i++) {
+                colors.push(largeSweeps.side[i] > 0 ? 'green' : 'red');
+                text.push('Size: ' + largeSweeps.size[i].toFixed(3) + ' BTC<br>' + largeSweeps.trades[i] + ' prints over ' +
+                          largeSweeps.levels[i] + ' levels<br>$' + largeSweeps.first_price[i].toFixed(2) + ' → $' +
+                          largeSweeps.last_price[i].toFixed(2));
+            }
+            traces.push({
+                type: 'scatter', mode: 'markers', x: largeSweeps.t, y: largeSweeps.vwap, text: text,
+                marker: {size: markerSizes(largeSweeps.size), color: colors, symbol: 'diamond-open', line: {width: 3}},
+                name: 'Sweeps (' + largeSweeps.t.length + ')',
+                hovertemplate: '<b>SWEEP</b><br>VWAP: $%{y:.2f}<br>%{text}<br>Time: %{x}<extra></extra>'
+            });
+        }
+        var trend = pick(columns.trend, function (i) { return columns.trend.t[i] >= start; });
+        if (trend.t.length > 1) {
+            traces.push({
+                type: 'scatter', mode: 'lines', x: trend.t, y: trend.price,
+                line: {color: 'blue', width: 1, dash: 'dot'}, name: 'Price Trend', opacity: 0.5
+            });
+        }
+
+        return {
+            data: traces,
+            layout: {
+                template: template,
+                title: {text: 'Large Trades Only (' + label + ') - Last ' + minutes + ' Minutes'},
+                xaxis: {type: 'date', title: {text: 'Time (UTC)'}},
+                yaxis: {title: {text: 'Price (USD)'}},
+                hovermode: 'closest',
+                showlegend: true,
+                height: 400
+            }
+        };
+    }
+
+    window.dash_clientside = Object.assign({}, window.dash_clientside, {
+        orderflow: Object.assign({}, (window.dash_clientside || {}).orderflow, {
+            largeTradesFigure: largeTradesFigure,
+            largeTradesCursor: largeTradesCursor
+        })
+    });
+})();
@@ -0,0 +1,144 @@
+// Live updates over server-sent events (see push.py)
+(function () {
+    var MIN_REFRESH_GAP_MS = 1000;  // coalesce bursts into at most one refresh per second
+    var RECONNECT_MS = 30000;  // retry after the server refused the stream (e.g. at capacity)
+
+    var source = null;
+    var wanted = false;  // live mode is selected
+    var streamOpen = false;
+    var reconnectTimer = null;
+    var lastRefresh = 0;
+    var refreshTimer = null;
+    var refreshedVersion = null;
+
+    function click(id) {
+        var button = document.getElementById(id);
+        if (button) {
+            button.click();
+        }
+    }
+
+    // Tells intervalDisabled to re-run, so polling stops or resumes
+    function setStreamOpen(open) {
+        if (streamOpen !== open) {
+            streamOpen = open;
+            click('push-state');
+        }
+    }
+
+    function requestRefresh() {
+        if (refreshTimer) {
+            return;  // a refresh is already scheduled, it will pick up this data too
+        }
+        var wait = Math.max(0, lastRefresh + MIN_REFRESH_GAP_MS - Date.now());
+        refreshTimer = setTimeout(function () {
+            refreshTimer = null;
+            lastRefresh = Date.now();
+            click('push-refresh');
+        }, wait);
+    }
+
+    // Only data the charts have not drawn yet is worth a server round trip;
+    // progress-only messages update the page here
+    function needsRefresh(message) {
+        if (message.backfill && message.backfill.done) {
+            return true;  // the charts can show the backfilled history now
+        }
+        if (!message.trades.length && !message.bar) {
+            return false;
+        }
+        if (message.version === refreshedVersion) {
+            return false;
+        }
+        refreshedVersion = message.version;
+        return true;
+    }
+
+    function updateTicker(message) {
+        var ticker = document.getElementById('live-ticker');
+        if (!ticker || !message.trades.length) {
+            return;
+        }
+        var last = message.trades[message.trades.length - 1];
+        var time = new Date(last[0]).toLocaleTimeString();
+        var side = last[3] > 0 ? '🟢' : '🔴';
+        ticker.textContent = side + ' $' + last[1].toLocaleString(undefined, {minimumFractionDigits: 2, maximumFractionDigits: 2}) +
+            ' × ' + last[2].toFixed(4) + ' BTC @ ' + time;
+    }
+
+    function updateBackfill(progress) {
+        var status = document.getElementById('backfill-status');
+        if (!status || !progress) {
+            return;
+        }
+        if (progress.done) {
+            status.textContent = '';
+            return;
+        }
+        status.textContent = '⏳ Loading the last ' + progress.hours + 'h of trades: ' +
+            Math.round(progress.fraction * 100) + '% (' + progress.trades.toLocaleString() + ' trades)';
+    }
+
+    function connect() {
+        reconnectTimer = null;
+        if (source || !wanted || !window.EventSource) {
+            return;
+        }
+        source = new EventSource('/stream');
+        source.onopen = function () {
+            setStreamOpen(true);
+        };
+        source.onerror = function () {
+            // Refused (503 at capacity) or dropped: the interval timer takes over
+            setStreamOpen(false);
+            if (source && source.readyState === EventSource.CLOSED) {
+                // The browser only retries dropped streams by itself
+                source = null;
+                if (wanted && !reconnectTimer) {
+                    reconnectTimer = setTimeout(connect, RECONNECT_MS);
+                }
+            }
+        };
+        source.addEventListener('update', function (event) {
+            var message = JSON.parse(event.data);
+            updateTicker(message);
+            updateBackfill(message.backfill);
+            if (needsRefresh(message)) {
+                requestRefresh();
+            }
+        });
+    }
+
+    function disconnect() {
+        if (reconnectTimer) {
+            clearTimeout(reconnectTimer);
+            reconnectTimer = null;
+        }
+        if (source) {
+            source.close();
+            source = null;
+        }
+        setStreamOpen(false);
+        var ticker = document.getElementById('live-ticker');
+        if (ticker) {
+            ticker.textContent = '';
+        }
+    }
+
+    window.dash_clientside = Object.assign({}, window.dash_clientside, {
+        orderflow: Object.assign({}, (window.dash_clientside || {}).orderflow, {
+            togglePush: function (updateFrequency) {
+                wanted = updateFrequency === 0;
+                if (wanted) {
+                    connect();
+                    return window.EventSource ? '⚡ live' : '⚠️ live updates unsupported';
+                }
+                disconnect();
+                return '';
+            },
+            intervalDisabled: function (nClicks, updateFrequency) {
+                return updateFrequency === 0 && streamOpen;
+            }
+        })
+    });
+})();
@@ -0,0 +1,221 @@
+"""
+Cold start backfill of the trade store.
+
+A fresh process only has the latest page of trades, so the longer time
+windows would take hours of uptime to fill. At startup the last
+BACKFILL_HOURS are split into BACKFILL_SLICES time slices, fetched side
+by side by BACKFILL_WORKERS threads that page forward with
+fetch_trades(since=...). Every page is paid for from the exchange's
+shared weight budget, but only up to BACKFILL_BUDGET_SHARE of it, so the
+live polls are never starved. Each finished slice is merged into the
+store in one vectorized sort and deduplication, and progress goes to
+listeners (the push channel) as the pages come in.
+
+Try it without touching the exchange:
+
+    python backfill.py --fake --hours 2
+"""
+
+import argparse
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+import numpy as np
+import pandas as pd
+
+import config
+import metrics
+from clock import CLOCK
+from resilience import backoff_delay, call_with_deadline
+from scheduler import BudgetTimeout
+
+HOUR_MS = 3_600_000
+
+
+def page_to_frame(page, received_at):
+    """Trade store rows for one fetch_trades page"""
+    return pd.DataFrame({
+        'timestamp': np.array([trade['timestamp'] for trade in page], dtype='i8').astype('datetime64[ms]').astype('datetime64[ns]'),
+        'price': np.array([trade['price'] for trade in page], dtype=float),
+        'size': np.array([trade['amount'] for trade in page], dtype=float),
+        'side': np.array([trade['side'] for trade in page], dtype=object),
+        'received_at': np.full(len(page), np.datetime64(received_at, 'ns')),
+    })
+
+
+class Backfill:
+    def __init__(self, data_manager, hours=2, slices=8, workers=4, page_size=1000, budget_share=0.5):
+        self.data_manager = data_manager
+        self.hours = hours
+        self.slices = slices
+        self.workers = workers
+        self.page_size = page_size
+        self.budget_share = budget_share
+        self.listeners = []
+        self.lock = threading.Lock()
+        self.covered = {}  # slice index -> ms of the slice fetched so far
+        self.total_ms = 0
+        self.pages = 0
+        self.trades = 0
+        self.failed_slices = 0
+        self.running = False
+        self.done = False
+        self.started = None
+        self.finished = None
+
+    def add_listener(self, listener):
+        """Call listener(progress) as the backfill advances"""
+        self.listeners.append(listener)
+
+    def progress(self):
+        with self.lock:
+            return {
+                'hours': self.hours,
+                'fraction': 1.0 if self.done else sum(self.covered.values()) / self.total_ms if self.total_ms else 0.0,
+                'pages': self.pages,
+                'trades': self.trades,
+                'failed_slices': self.failed_slices,
+                'running': self.running,
+                'done': self.done,
+                'seconds': ((self.finished or time.monotonic()) - self.started) if self.started else 0.0,
+            }
+
+    def _notify(self):
+        progress = self.progress()
+        for listener in self.listeners:
+            try:
+                listener(progress)
+            except Exception as e:
+                print(f"❌ Backfill listener error: {e}")
+
+    def start(self):
+        """Run on a daemon thread"""
+        thread = threading.Thread(target=self.run, name='trade-backfill', daemon=True)
+        thread.start()
+        return thread
+
+    def run(self):
+        """Fetch the last `hours` of trades into the store, slice by slice"""
+        end_ms = int(np.datetime64(CLOCK.now(), 'ms').astype('i8'))
+        start_ms = end_ms - int(self.hours * HOUR_MS)
+        bounds = np.linspace(start_ms, end_ms, self.slices + 1).astype('i8')
+        with self.lock:
+            self.total_ms = end_ms - start_ms
+            self.covered = dict.fromkeys(range(self.slices), 0)
+            self.running = True
+            self.started = time.monotonic()
+        self._notify()
+        print(f"⏳ Backfilling the last {self.hours:g}h of trades in {self.slices} slices")
+
+        with ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='backfill') as pool:
+            futures = {
+                pool.submit(self._fetch_slice, index, int(bounds[index]), int(bounds[index + 1])): index
+                for index in range(self.slices)
+            }
+            for future in as_completed(futures):
+                history = future.result()
+                if history is not None and len(history):
+                    added = self.data_manager.merge_history(history)
+                    with self.lock:
+                        self.trades += max(0, added)
+                self._notify()
+
+        with self.lock:
+            self.running = False
+            self.done = True
+            self.finished = time.monotonic()
+        progress = self.progress()
+        self._notify()
+        print(f"✅ Backfilled {progress['trades']:,} trades in {progress['pages']} pages, {progress['seconds']:.1f}s"
+              + (f" ({progress['failed_slices']} slices failed)" if progress['failed_slices'] else ""))
+
+    def _fetch_slice(self, index, start_ms, end_ms):
+        """Trades in [start_ms, end_ms), or what was fetched before the slice gave up"""
+        frames = []
+        since = start_ms
+        while since < end_ms:
+            page = self._fetch_page(since)
+            if page is None:
+                with self.lock:
+                    self.failed_slices += 1
+                break
+            if not page:
+                break
+            received_at = CLOCK.now()
+            frames.append(page_to_frame(page, received_at))
+            last_ms = int(page[-1]['timestamp'])
+            # `since` is inclusive, so the next page starts at the last timestamp
+            # and repeats its prints, which the merge drops; a page all on one
+            # millisecond has to move past it
+            since = last_ms if last_ms > since else since + 1
+            with self.lock:
+                self.pages += 1
+                self.covered[index] = min(since, end_ms) - start_ms
+            self._notify()
+
+        if not frames:
+            return None
+        history = pd.concat(frames, ignore_index=True)
+        times = history['timestamp'].values.astype('datetime64[ms]').astype('i8')
+        return history[(times >= start_ms) & (times < end_ms)]
+
+    def _fetch_page(self, since):
+        """One page from `since` on, retried with backoff; None once retries are used up"""
+        scheduler = self.data_manager.scheduler
+        weight = scheduler.weights.get('trades', 1)
+        for attempt in range(1, config.BACKFILL_RETRIES + 1):
+            try:
+                # Wait as long as it takes for our share of the budget
+                if not scheduler.budget.acquire(weight, timeout=config.BACKOFF_MAX, share=self.budget_share):
+                    raise BudgetTimeout("backfill: request weight budget exhausted")
+                exchange = self.data_manager.exchange
+                symbol = self.data_manager.symbol
+                with metrics.FETCH_SECONDS.time(endpoint='backfill'):
+                    return call_with_deadline(
+                        lambda: exchange.fetch_trades(symbol, since=since, limit=self.page_size), config.FETCH_TIMEOUT
+                    )
+            except Exception as e:
+                self.data_manager._handle_fetch_error('backfill', e)
+                if attempt < config.BACKFILL_RETRIES:
+                    time.sleep(backoff_delay(attempt, config.BACKOFF_BASE, config.BACKOFF_MAX))
+        return None
+
+
+def default_backfill(data_manager):
+    if config.BACKFILL_HOURS <= 0:
+        return None
+    return Backfill(
+        data_manager, config.BACKFILL_HOURS, config.BACKFILL_SLICES, config.BACKFILL_WORKERS,
+        config.BACKFILL_PAGE_SIZE, config.BACKFILL_BUDGET_SHARE
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Backfill recent trades into a fresh store and report throughput")
+    parser.add_argument('--hours', type=float, default=config.BACKFILL_HOURS or 2)
+    parser.add_argument('--slices', type=int, default=config.BACKFILL_SLICES)
+    parser.add_argument('--workers', type=int, default=config.BACKFILL_WORKERS)
+    parser.add_argument('--fake', action='store_true', help="use loadtest.FakeExchange instead of the exchange")
+    parser.add_argument('--trade-rate', type=float, default=20.0, help="fake exchange trades per second")
+    parser.add_argument('--latency', type=float, default=0.05, help="fake exchange mean seconds per call")
+    args = parser.parse_args()
+
+    import data_fetcher
+    if args.fake:
+        from loadtest import FakeExchange
+        data_fetcher.load_exchange_class = lambda exchange_id: (
+            lambda settings=None: FakeExchange(settings, args.trade_rate, latency=args.latency)
+        )
+    data_manager = data_fetcher.OrderFlowData()
+    backfill = Backfill(data_manager, args.hours, args.slices, args.workers,
+                        config.BACKFILL_PAGE_SIZE, config.BACKFILL_BUDGET_SHARE)
+    backfill.run()
+    trades = data_manager.snapshot().trades
+    if len(trades):
+        print(f"📊 Store: {len(trades):,} trades from {trades['timestamp'].iloc[0]} to {trades['timestamp'].iloc[-1]}, "
+              f"budget used {data_manager.scheduler.budget.usage():.0%}")
+
+
+if __name__ == '__main__':
+    main()
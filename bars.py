@@ -0,0 +1,125 @@
+"""
+Activity bars: volume, tick, range and delta bars.
+
+A BarEngine folds every ingested trade into its forming bar and closes the
+bar once its threshold is reached:
+
+    volume  BTC traded in the bar
+    tick    trades in the bar
+    range   the bar's high minus low, in USD
+    delta   |buy - sell| aggressor volume in the bar, in BTC
+
+Trades are never split, the trade that reaches the threshold closes the
+bar. Each trade costs a few comparisons whatever the history length, and
+closed bars are kept as long as the trade store, so the candlestick chart
+switches bar type by slicing bars by time instead of re-aggregating the
+window's trades.
+"""
+
+import threading
+from datetime import timedelta
+
+import numpy as np
+import pandas as pd
+
+BAR_KINDS = ('volume', 'tick', 'range', 'delta')
+BAR_COLUMNS = ('start', 'end', 'open', 'high', 'low', 'close', 'volume', 'delta', 'trades')
+START, END, OPEN, HIGH, LOW, CLOSE, VOLUME, DELTA, TRADES = range(len(BAR_COLUMNS))
+
+
+class BarEngine:
+    def __init__(self, kind, threshold, max_age=timedelta(hours=4), capacity=1024):
+        if kind not in BAR_KINDS:
+            raise ValueError(f"bar kind must be one of {', '.join(BAR_KINDS)}")
+        self.kind = kind
+        self.threshold = threshold
+        self.max_age_ms = int(max_age.total_seconds() * 1000)
+        self.lock = threading.Lock()
+        self.count = 0
+        self.bars = np.empty((capacity, len(BAR_COLUMNS)))  # closed bars, times in ms
+        self.forming = None  # list in BAR_COLUMNS order
+
+    def update(self, new_trades):
+        """Trade listener"""
+        if len(new_trades) == 0:
+            return
+        times = new_trades['timestamp'].values.astype('datetime64[ms]').astype('i8').tolist()
+        prices = new_trades['price'].values.astype(float).tolist()
+        sizes = new_trades['size'].values.astype(float).tolist()
+        signs = np.where(new_trades['side'].values == 'buy', 1.0, -1.0).tolist()
+        kind = self.kind
+        threshold = self.threshold
+
+        with self.lock:
+            bar = self.forming
+            closed = []
+            for time_ms, price, size, sign in zip(times, prices, sizes, signs):
+                if bar is None:
+                    bar = [time_ms, time_ms, price, price, price, price, 0.0, 0.0, 0]
+                bar[END] = time_ms
+                if price > bar[HIGH]:
+                    bar[HIGH] = price
+                if price < bar[LOW]:
+                    bar[LOW] = price
+                bar[CLOSE] = price
+                bar[VOLUME] += size
+                bar[DELTA] += sign * size
+                bar[TRADES] += 1
+                if kind == 'volume':
+                    done = bar[VOLUME] >= threshold
+                elif kind == 'tick':
+                    done = bar[TRADES] >= threshold
+                elif kind == 'range':
+                    done = bar[HIGH] - bar[LOW] >= threshold
+                else:
+                    done = abs(bar[DELTA]) >= threshold
+                if done:
+                    closed.append(bar)
+                    bar = None
+            self.forming = bar
+            if closed:
+                self._append(np.array(closed, dtype=float))
+
+    def _append(self, rows):
+        needed = self.count + len(rows)
+        if needed > len(self.bars):
+            self._trim(rows[-1, END])
+            needed = self.count + len(rows)
+            if needed > len(self.bars):
+                self.bars = np.resize(self.bars, (max(needed, 2 * len(self.bars)), len(BAR_COLUMNS)))
+        self.bars[self.count:needed] = rows
+        self.count = needed
+
+    def _trim(self, latest):
+        start = np.searchsorted(self.bars[:self.count, END], latest - self.max_age_ms)
+        if start:
+            kept = self.count - start
+            self.bars[:kept] = self.bars[start:self.count]
+            self.count = kept
+
+    def nbytes(self):
+        return self.bars.nbytes
+
+    def frame(self, start, end=None):
+        """Bars ending after `start` (and starting by `end`), the forming one last"""
+        start_ms = int(np.datetime64(start, 'ms').astype('i8'))
+        end_ms = None if end is None else int(np.datetime64(end, 'ms').astype('i8'))
+        with self.lock:
+            first = np.searchsorted(self.bars[:self.count, END], start_ms, side='right')
+            # Copied under the lock: _append and _trim rewrite these rows in place
+            rows = self.bars[first:self.count].copy()
+            if self.forming is not None:
+                rows = np.vstack([rows, np.array([self.forming], dtype=float)])
+        if end_ms is not None:
+            rows = rows[rows[:, START] <= end_ms]
+
+        frame = pd.DataFrame(rows[:, OPEN:], columns=BAR_COLUMNS[OPEN:])
+        frame['trades'] = frame['trades'].astype(int)
+        frame.insert(0, 'end', rows[:, END].astype('i8').astype('datetime64[ms]').astype('datetime64[ns]'))
+        frame.insert(0, 'start', rows[:, START].astype('i8').astype('datetime64[ms]').astype('datetime64[ns]'))
+        return frame
+
+
+def create_bar_engines(thresholds, max_age=timedelta(hours=4)):
+    """{kind: BarEngine} for every kind with a threshold"""
+    return {kind: BarEngine(kind, thresholds[kind], max_age) for kind in BAR_KINDS if kind in thresholds}
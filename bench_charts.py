@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+"""
+Chart construction benchmark: builds the four dashboard figures from
+synthetic trades with each CHART_EXECUTOR mode and compares the wall time
+of a refresh with the sum of the single charts and with the slowest one.
+
+    python bench_charts.py [trades] [runs]
+"""
+
+import os
+import statistics
+import sys
+import time
+from datetime import timedelta
+
+import numpy as np
+import pandas as pd
+
+import config
+from chart_builder import (
+    candle_vwap_lines,
+    create_candlestick_with_profile,
+    create_clean_delta_chart,
+    create_large_trades_chart,
+    create_market_depth_chart
+)
+from chart_pool import MODES, ChartExecutor, _run_job
+from clock import CLOCK
+from indicators import VWAPEngine
+from order_detection import SweepAggregator
+from precompute import compute_windows
+
+WINDOW = max(config.TIME_WINDOWS)
+
+
+def synthetic_trades(count, now):
+    """`count` trades spread over the largest window, random walk prices"""
+    rng = np.random.default_rng(7)
+    offsets = np.sort(rng.integers(0, WINDOW * 60_000, count))
+    timestamps = np.datetime64(now - timedelta(minutes=WINDOW), 'ms') + offsets.astype('timedelta64[ms]')
+    return pd.DataFrame({
+        'timestamp': timestamps.astype('datetime64[ns]'),
+        'price': 60000 + np.cumsum(rng.normal(0, 1, count)),
+        'size': rng.lognormal(-2.5, 1.2, count),
+        'side': np.where(rng.random(count) < 0.5, 'buy', 'sell'),
+        'received_at': timestamps.astype('datetime64[ns]'),
+    })
+
+
+def make_jobs(trades, now):
+    window = compute_windows(trades, (WINDOW,), now)[WINDOW]
+    vwap_engine = VWAPEngine()
+    vwap_engine.update(trades)
+    sweeps = SweepAggregator(config.SWEEP_MAX_GAP_MS, config.SWEEP_MIN_TRADES)
+    sweeps.update(trades)
+    price = float(trades['price'].iloc[-1])
+    orderbook = {
+        'timestamp': now,
+        'bids': [(price - 0.5 * (i + 1), 1.0 + i % 3) for i in range(20)],
+        'asks': [(price + 0.5 * (i + 1), 1.0 + i % 3) for i in range(20)],
+    }
+    jobs = {
+        'candlestick': (create_candlestick_with_profile, (window, candle_vwap_lines(window, vwap_engine))),
+        'delta': (create_clean_delta_chart, (window,)),
+        'large_trades': (create_large_trades_chart, (window, 1.0, None, sweeps.sweeps(min_size=1.0))),
+        'market_depth': (create_market_depth_chart, ((orderbook,), window.metrics, [])),
+    }
+    return jobs, window
+
+
+def timed(fn, runs):
+    samples = []
+    for _ in range(runs):
+        started = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - started)
+    return statistics.median(samples)
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 200_000
+    runs = int(sys.argv[2]) if len(sys.argv) > 2 else 5
+    now = CLOCK.now()
+    jobs, window = make_jobs(synthetic_trades(count, now), now)
+
+    print(f"{count:,} trades in a {WINDOW} minute window, {os.cpu_count()} CPUs, "
+          f"{config.CHART_WORKERS} workers, median of {runs} runs")
+    singles = {name: timed(lambda: _run_job(builder, args), runs) for name, (builder, args) in jobs.items()}
+    for name, seconds in singles.items():
+        print(f"  {name:<13} {seconds * 1000:8.1f}ms")
+    print(f"  {'sum':<13} {sum(singles.values()) * 1000:8.1f}ms")
+    print(f"  {'slowest':<13} {max(singles.values()) * 1000:8.1f}ms")
+
+    serial = None
+    for mode in MODES:
+        executor = ChartExecutor(mode, config.CHART_WORKERS)
+        executor.build(jobs, window)  # start workers, warm caches
+        seconds = timed(lambda: executor.build(jobs, window), runs)
+        serial = serial or seconds
+        print(f"{mode:<8} refresh {seconds * 1000:8.1f}ms  speedup {serial / seconds:4.2f}x")
+        if executor.pool is not None:
+            executor.pool.shutdown()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,61 @@
+#!/usr/bin/env python3
+"""
+Startup benchmark: cold-imports the app in fresh interpreters and reports
+import time and boot phases. That ccxt stays off the import path is
+checked by tests/test_startup.py.
+
+    python bench_startup.py [runs]
+"""
+
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+PROBE = """
+import json, sys, time
+started = time.perf_counter()
+import app
+import startup
+print(json.dumps({
+    'import_seconds': time.perf_counter() - started,
+    'phases': startup.PHASES,
+    'modules': len(sys.modules),
+}))
+"""
+
+CCXT_PROBE = """
+import json, time
+started = time.perf_counter()
+import ccxt
+print(json.dumps({'import_seconds': time.perf_counter() - started}))
+"""
+
+
+def run(probe, env):
+    output = subprocess.run(
+        [sys.executable, '-c', probe], capture_output=True, text=True, env=env,
+        cwd=os.path.dirname(os.path.abspath(__file__)), timeout=120
+    ).stdout
+    # Boot marks and background threads print too, the probe's JSON is its own line
+    return json.loads([line for line in output.splitlines() if line.startswith('{')][-1])
+
+
+def main():
+    runs = int(sys.argv[1]) if len(sys.argv) > 1 else 5
+    env = dict(os.environ, ORDER_FLOW_PUSH='0', ORDER_FLOW_BACKFILL_HOURS='0')
+
+    results = [run(PROBE, env) for _ in range(runs)]
+    ccxt_seconds = [run(CCXT_PROBE, env)['import_seconds'] for _ in range(runs)]
+
+    print(f"import app      median {statistics.median(r['import_seconds'] for r in results):.3f}s "
+          f"(min {min(r['import_seconds'] for r in results):.3f}s, {results[-1]['modules']} modules)")
+    for phase in results[-1]['phases']:
+        values = [r['phases'][phase] for r in results if phase in r['phases']]
+        print(f"  {phase:<13} median {statistics.median(values):.3f}s")
+    print(f"import ccxt     median {statistics.median(ccxt_seconds):.3f}s (deferred off the startup path)")
+
+
+if __name__ == '__main__':
+    main()
@@ -2,8 +2,11 @@ import plotly.graph_objects as go
 from plotly.subplots import make_subplots
 import pandas as pd
 import numpy as np
-from datetime import datetime, timedelta
+from datetime import timedelta
 
+from metrics import CHART_BUILD_SECONDS
+
+@CHART_BUILD_SECONDS.time(chart='create_candlestick_data')
 def create_candlestick_data(trades, timeframe_minutes=1):
     """Convert trades to candlestick data"""
     if len(trades) == 0:
@@ -23,56 +26,68 @@ def create_candlestick_data(trades, timeframe_minutes=1):
     
     return candlestick_data
 
+@CHART_BUILD_SECONDS.time(chart='calculate_volume_profile')
 def calculate_volume_profile(trades, price_levels=20):
     """Calculate volume profile for current data"""
     if len(trades) == 0:
         return pd.DataFrame()
     
     # Create price levels
-    min_price = trades['price'].min()
-    max_price = trades['price'].max()
+    prices = trades['price'].values.astype(float)
+    min_price = prices.min()
+    max_price = prices.max()
     price_range = max_price - min_price
     bin_size = price_range / price_levels
-    
-    # Calculate volume at each price level
-    volume_profile = []
-    for i in range(price_levels):
-        price_level = min_price + (i * bin_size)
-        next_price_level = price_level + bin_size
-        
-        # Volume in this price range
-        volume_in_range = trades[
-            (trades['price'] >= price_level) & 
-            (trades['price'] < next_price_level)
-        ]['size'].sum()
-        
-        volume_profile.append({
-            'price': (price_level + next_price_level) / 2,
-            'volume': volume_in_range
-        })
-    
-    return pd.DataFrame(volume_profile)
+    level_prices = min_price + np.arange(price_levels) * bin_size
+    
+    # Volume at each price level, in one bincount; the top price sits on the
+    # upper edge of the last level and is left out, as are all trades when
+    # the range is empty
+    volume = np.zeros(price_levels)
+    if bin_size > 0:
+        levels = np.floor((prices - min_price) / bin_size).astype(int)
+        inside = levels < price_levels
+        volume = np.bincount(levels[inside], weights=trades['size'].values[inside], minlength=price_levels)
+    
+    return pd.DataFrame({'price': level_prices + bin_size / 2, 'volume': volume})
 
-def create_candlestick_with_profile(trades, time_window_minutes):
-    """Create candlestick chart with volume profile"""
-    if len(trades) == 0:
+def candle_vwap_lines(window, vwap_engine, vwap_anchors=()):
+    """VWAP overlay lines for a window's candles, evaluated at each candle's close"""
+    bar = timedelta(minutes=1)
+    lines = vwap_engine.vwap_lines(window.candles.index + bar, vwap_anchors)
+    for line in lines:
+        line['x'] = line['x'] - bar
+    return lines
+
+def bar_vwap_lines(bars, vwap_engine, vwap_anchors=()):
+    """VWAP overlay lines for activity bars, evaluated at each bar's close and placed by bar number"""
+    lines = vwap_engine.vwap_lines(pd.DatetimeIndex(bars['end']), vwap_anchors)
+    for line in lines:
+        # Anchored lines cover the bars from their anchor on, a suffix
+        line['x'] = np.arange(len(bars))[len(bars) - len(line['x']):]
+    return lines
+
+@CHART_BUILD_SECONDS.time(chart='create_candlestick_with_profile')
+def create_candlestick_with_profile(window, vwap_lines=(), composite=None, bars=None, bar_label=None):
+    """Create candlestick chart with volume profile and VWAP overlays from a window's aggregates.
+
+    With `bars` (a BarEngine frame) those are drawn instead of the one-minute
+    candles, one per slot, since they do not close at regular times.
+    """
+    time_window_minutes = window.minutes
+    if window.store_trades == 0:
         return _create_empty_chart("Collecting trade data...", "Price Chart - Loading...")
     
-    # Filter by time window
-    cutoff_time = datetime.now() - timedelta(minutes=time_window_minutes)
-    window_trades = trades[trades['timestamp'] > cutoff_time]
-    
-    if len(window_trades) == 0:
+    if len(window.trades) == 0:
         return _create_empty_chart(f"No trades in last {time_window_minutes} minutes", "Price Chart")
     
-    # Create candlestick data
-    candlestick_data = create_candlestick_data(window_trades, timeframe_minutes=1)
+    # One-minute candles and the volume profile, precomputed per data version
+    candlestick_data = window.candles if bars is None else bars
     
     if len(candlestick_data) == 0:
         return _create_empty_chart("Not enough data for candlesticks", "Price Chart")
     
-    # Create volume profile
-    volume_profile = calculate_volume_profile(window_trades)
+    volume_profile = window.profile
     
     # Create subplot figure
     fig = make_subplots(
@@ -84,17 +99,71 @@ def create_candlestick_with_profile(trades, time_window_minutes):
     )
     
     # Add candlesticks
-    fig.add_trace(
-        go.Candlestick(
-            x=candlestick_data.index,
-            open=candlestick_data['open'],
-            high=candlestick_data['high'],
-            low=candlestick_data['low'],
-            close=candlestick_data['close'],
-            name='BTC/USDT'
-        ),
-        row=1, col=1
-    )
+    if bars is None:
+        fig.add_trace(
+            go.Candlestick(
+                x=candlestick_data.index,
+                open=candlestick_data['open'],
+                high=candlestick_data['high'],
+                low=candlestick_data['low'],
+                close=candlestick_data['close'],
+                name='BTC/USDT'
+            ),
+            row=1, col=1
+        )
+    else:
+        fig.add_trace(
+            go.Candlestick(
+                x=np.arange(len(bars)),
+                open=bars['open'],
+                high=bars['high'],
+                low=bars['low'],
+                close=bars['close'],
+                text=[
+                    f"{start:%H:%M:%S}–{end:%H:%M:%S}<br>{trades} trades, {volume:.2f} BTC, Δ {delta:+.2f}"
+                    for start, end, trades, volume, delta
+                    in zip(bars['start'], bars['end'], bars['trades'], bars['volume'], bars['delta'])
+                ],
+                name=bar_label or 'Bars'
+            ),
+            row=1, col=1
+        )
+        # Label about eight of the bars with their start time
+        ticks = np.arange(0, len(bars), max(1, len(bars) // 8))
+        fig.update_xaxes(tickvals=ticks, ticktext=[f"{bars['start'].iloc[i]:%H:%M}" for i in ticks], row=1, col=1)
+    
+    # Add VWAP overlays (see candle_vwap_lines)
+    if vwap_lines:
+        styles = {
+            'vwap': dict(color='orange', width=2),
+            'band': dict(color='orange', width=1, dash='dot'),
+            'anchored': dict(color='purple', width=1.5, dash='dash'),
+        }
+        for line in vwap_lines:
+            fig.add_trace(
+                go.Scatter(
+                    x=line['x'],
+                    y=line['y'],
+                    mode='lines',
+                    line=styles[line['kind']],
+                    name=line['name'],
+                    hovertemplate=f"{line['name']}: $%{{y:.2f}}<extra></extra>"
+                ),
+                row=1, col=1
+            )
+    
+    # Composite value area levels near the visible prices (far ones would squash the candles)
+    if composite:
+        low = candlestick_data['low'].min()
+        high = candlestick_data['high'].max()
+        margin = max(high - low, 1.0) / 2
+        for key, dash in (('poc', 'solid'), ('vah', 'dash'), ('val', 'dash')):
+            if low - margin <= composite[key] <= high + margin:
+                fig.add_hline(
+                    y=composite[key], line_dash=dash, line_width=1, line_color='teal',
+                    annotation_text=f"{composite['label']} {key.upper()}", annotation_position="top left",
+                    row=1, col=1
+                )
     
     # Add volume profile
     if len(volume_profile) > 0:
@@ -110,40 +179,34 @@ def create_candlestick_with_profile(trades, time_window_minutes):
         )
     
     # Update layout
+    kind = 'Price' if bars is None else f'{bar_label or "Activity"} Bars'
     fig.update_layout(
-        title=f'BTC/USDT Price & Volume Profile - Last {time_window_minutes} Minutes',
+        title=f'BTC/USDT {kind} & Volume Profile - Last {time_window_minutes} Minutes',
         height=500,
         showlegend=False,
         xaxis_rangeslider_visible=False
     )
     
     # Update axes
-    fig.update_xaxes(title_text="Time", row=1, col=1)
+    fig.update_xaxes(title_text="Time (UTC)" if bars is None else "Bar start (UTC)", row=1, col=1)
     fig.update_xaxes(title_text="Volume (BTC)", row=1, col=2)
     fig.update_yaxes(title_text="Price (USD)", row=1, col=1)
     
     return fig
 
-def create_clean_delta_chart(trades, time_window_minutes):
-    """Create clean delta visualization"""
-    if len(trades) == 0:
+@CHART_BUILD_SECONDS.time(chart='create_clean_delta_chart')
+def create_clean_delta_chart(window):
+    """Create clean delta visualization from a window's aggregates"""
+    time_window_minutes = window.minutes
+    if window.store_trades == 0:
         return _create_empty_chart("Collecting delta data...", "Delta Analysis - Loading...")
 
-    # Filter by time window
-    cutoff_time = datetime.now() - timedelta(minutes=time_window_minutes)
-    window_trades = trades[trades['timestamp'] > cutoff_time]
-
-    if len(window_trades) == 0:
+    if len(window.trades) == 0:
         return _create_empty_chart(f"No data in last {time_window_minutes} minutes", "Delta Analysis")
 
-    window_trades = window_trades.set_index('timestamp')
-    window_trades['delta'] = np.where(window_trades['side'] == 'buy', window_trades['size'], -window_trades['size'])
-
-    # Calculate cumulative delta
-    cumulative_delta = window_trades['delta'].cumsum()
-    
-    # Calculate 1-minute delta
-    delta_1min = window_trades['delta'].resample('1min').sum()
+    # Cumulative delta since the window start and 1-minute delta
+    cumulative_delta = window.cumulative_delta
+    delta_1min = window.delta_1min
     
     fig = go.Figure()
     
@@ -173,29 +236,164 @@ def create_clean_delta_chart(trades, time_window_minutes):
 
     fig.update_layout(
         title=f'Delta Analysis - Last {time_window_minutes} Minutes',
-        xaxis_title='Time',
+        xaxis_title='Time (UTC)',
         yaxis_title='Delta (BTC)',
         height=400,
         showlegend=True,
         bargap=0
     )
+    # Same time axis as the microstructure chart below it
+    fig.update_xaxes(range=[window.start, window.end])
     
     return fig
 
-def create_large_trades_chart(trades, time_window_minutes, min_trade_size):
-    """Create chart showing only large trades"""
-    if len(trades) == 0:
+@CHART_BUILD_SECONDS.time(chart='create_microstructure_chart')
+def create_microstructure_chart(series, window, levels=10, depth_bps=10):
+    """Create book imbalance, near-mid depth, spread and microprice series over the window"""
+    if len(series) == 0:
+        return _create_empty_chart("Collecting order book snapshots...", "Book Microstructure - Loading...")
+    
+    fig = make_subplots(
+        rows=3, cols=1,
+        shared_xaxes=True,
+        vertical_spacing=0.05,
+        row_heights=[0.4, 0.3, 0.3]
+    )
+    
+    # Top-N imbalance: +1 all size on the bid, -1 all on the ask
+    fig.add_trace(go.Scatter(
+        x=series['timestamp'],
+        y=series['imbalance'],
+        mode='lines',
+        fill='tozeroy',
+        line=dict(color='purple', width=1),
+        name=f'Imbalance (top {levels})',
+        hovertemplate='Time: %{x}<br>Imbalance: %{y:+.2f}<extra></extra>'
+    ), row=1, col=1)
+    
+    # Size resting near the mid, asks drawn below zero
+    fig.add_trace(go.Scatter(
+        x=series['timestamp'],
+        y=series['bid_depth'],
+        mode='lines',
+        fill='tozeroy',
+        line=dict(color='green', width=1),
+        name=f'Bids within {depth_bps:g}bps',
+        hovertemplate='Time: %{x}<br>Bid depth: %{y:.2f} BTC<extra></extra>'
+    ), row=2, col=1)
+    fig.add_trace(go.Scatter(
+        x=series['timestamp'],
+        y=-series['ask_depth'],
+        mode='lines',
+        fill='tozeroy',
+        line=dict(color='red', width=1),
+        name=f'Asks within {depth_bps:g}bps',
+        customdata=series['ask_depth'],
+        hovertemplate='Time: %{x}<br>Ask depth: %{customdata:.2f} BTC<extra></extra>'
+    ), row=2, col=1)
+    
+    # Spread and where the microprice sits relative to the mid
+    fig.add_trace(go.Scatter(
+        x=series['timestamp'],
+        y=series['spread'],
+        mode='lines',
+        line=dict(color='black', width=1),
+        name='Spread ($)',
+        hovertemplate='Time: %{x}<br>Spread: $%{y:.2f}<extra></extra>'
+    ), row=3, col=1)
+    fig.add_trace(go.Scatter(
+        x=series['timestamp'],
+        y=series['microprice'] - series['mid'],
+        mode='lines',
+        line=dict(color='orange', width=1),
+        name='Microprice - mid ($)',
+        hovertemplate='Time: %{x}<br>Microprice - mid: $%{y:+.2f}<extra></extra>'
+    ), row=3, col=1)
+    
+    fig.update_layout(
+        title=f'Book Microstructure - Last {window.minutes} Minutes',
+        height=450,
+        showlegend=True,
+        hovermode='x unified'
+    )
+    fig.update_yaxes(title_text="Imbalance", range=[-1, 1], row=1, col=1)
+    fig.update_yaxes(title_text="Depth (BTC)", row=2, col=1)
+    fig.update_yaxes(title_text="USD", row=3, col=1)
+    fig.update_xaxes(range=[window.start, window.end])
+    fig.update_xaxes(title_text="Time (UTC)", row=3, col=1)
+    
+    return fig
+
+@CHART_BUILD_SECONDS.time(chart='create_vpin_chart')
+def create_vpin_chart(series, window, thresholds=(), window_buckets=50, bucket_volume=10.0):
+    """Create VPIN and per-bucket order imbalance over the window, with the alert thresholds"""
+    if len(series) == 0:
+        return _create_empty_chart(f"Filling {bucket_volume:g} BTC volume buckets...", "Order Flow Toxicity - Loading...")
+    
+    fig = make_subplots(
+        rows=2, cols=1,
+        shared_xaxes=True,
+        vertical_spacing=0.05,
+        row_heights=[0.6, 0.4]
+    )
+    
+    fig.add_trace(go.Scatter(
+        x=series['timestamp'],
+        y=series['vpin'],
+        mode='lines',
+        line=dict(color='darkorange', width=2),
+        name=f'VPIN ({window_buckets} buckets)',
+        hovertemplate='Bucket closed: %{x}<br>VPIN: %{y:.3f}<extra></extra>'
+    ), row=1, col=1)
+    for threshold in thresholds:
+        fig.add_hline(y=threshold, line_dash="dash", line_color="red", opacity=0.6,
+                      annotation_text=f"Alert {threshold:g}", annotation_position="top left", row=1, col=1)
+    
+    # Signed imbalance of each bucket: +1 all buying, -1 all selling
+    fig.add_trace(go.Bar(
+        x=series['timestamp'],
+        y=series['imbalance'],
+        marker_color=['green' if value >= 0 else 'red' for value in series['imbalance']],
+        name='Bucket imbalance',
+        hovertemplate='Bucket closed: %{x}<br>(Buy - sell) / volume: %{y:+.2f}<extra></extra>'
+    ), row=2, col=1)
+    
+    fig.update_layout(
+        title=f'Order Flow Toxicity (VPIN, {bucket_volume:g} BTC buckets) - Last {window.minutes} Minutes',
+        height=400,
+        showlegend=True,
+        hovermode='x unified'
+    )
+    fig.update_yaxes(title_text="VPIN", range=[0, 1], row=1, col=1)
+    fig.update_yaxes(title_text="Imbalance", range=[-1, 1], row=2, col=1)
+    fig.update_xaxes(range=[window.start, window.end])
+    fig.update_xaxes(title_text="Time (UTC)", row=2, col=1)
+    
+    return fig
+
+@CHART_BUILD_SECONDS.time(chart='create_large_trades_chart')
+def create_large_trades_chart(window, min_trade_size, size_label=None, sweeps=None):
+    """Create chart showing only large trades, plus sweeps whose combined size is large"""
+    size_label = size_label or f"≥{min_trade_size}BTC"
+    time_window_minutes = window.minutes
+    
+    if window.store_trades == 0:
         return _create_empty_chart("Collecting trade data...", "Large Trades - Loading...")
     
-    # Filter by time window and minimum size
-    cutoff_time = datetime.now() - timedelta(minutes=time_window_minutes)
-    window_trades = trades[trades['timestamp'] > cutoff_time]
+    # The size filter is per client, the window slice is shared
+    window_trades = window.trades
+    cutoff_time = window.start
     large_trades = window_trades[window_trades['size'] >= min_trade_size]
     
-    if len(large_trades) == 0:
+    # Parent orders split into prints that are individually below the threshold
+    large_sweeps = []
+    if sweeps is not None and len(sweeps) > 0:
+        large_sweeps = sweeps[(sweeps['end'] > cutoff_time) & (sweeps['size'] >= min_trade_size) & (sweeps['levels'] >= 2)]
+    
+    if len(large_trades) == 0 and len(large_sweeps) == 0:
         return _create_empty_chart(
-            f"No large trades (≥{min_trade_size}BTC) in last {time_window_minutes} minutes", 
-            f"Large Trades (≥{min_trade_size}BTC)"
+            f"No large trades ({size_label}) in last {time_window_minutes} minutes", 
+            f"Large Trades ({size_label})"
         )
     
     # Separate buys and sells
@@ -244,11 +442,30 @@ def create_large_trades_chart(trades, time_window_minutes, min_trade_size):
             text=[f'{size:.3f}' for size in sells['size']]
         ))
     
+    # Add sweeps at their VWAP, colored by aggressor side
+    if len(large_sweeps) > 0:
+        fig.add_trace(go.Scatter(
+            x=large_sweeps['end'],
+            y=large_sweeps['vwap'],
+            mode='markers',
+            marker=dict(
+                size=[max(10, min(50, size * 3)) for size in large_sweeps['size']],
+                color=['green' if side == 'buy' else 'red' for side in large_sweeps['side']],
+                symbol='diamond-open',
+                line=dict(width=3),
+            ),
+            name=f'Sweeps ({len(large_sweeps)})',
+            hovertemplate='<b>SWEEP</b><br>VWAP: $%{y:.2f}<br>%{text}<br>Time: %{x}<extra></extra>',
+            text=[
+                f'Size: {row.size:.3f} BTC<br>{row.trades} prints over {row.levels} levels<br>'
+                f'${row.first_price:.2f} → ${row.last_price:.2f}'
+                for row in large_sweeps.itertuples()
+            ]
+        ))
+    
     # Add price trend for context
     if len(window_trades) > 1:
-        window_trades = window_trades.set_index('timestamp')
-        price_trend = window_trades['price'].resample('1min').mean()
-        price_trend = price_trend.dropna()
+        price_trend = window.price_trend
         
         if len(price_trend) > 1:
             fig.add_trace(go.Scatter(
@@ -261,8 +478,8 @@ def create_large_trades_chart(trades, time_window_minutes, min_trade_size):
             ))
     
     fig.update_layout(
-        title=f'Large Trades Only (≥{min_trade_size}BTC) - Last {time_window_minutes} Minutes',
-        xaxis_title='Time',
+        title=f'Large Trades Only ({size_label}) - Last {time_window_minutes} Minutes',
+        xaxis_title='Time (UTC)',
         yaxis_title='Price (USD)',
         hovermode='closest',
         showlegend=True,
@@ -271,7 +488,8 @@ def create_large_trades_chart(trades, time_window_minutes, min_trade_size):
     
     return fig
 
-def create_market_depth_chart(orderbooks, metrics):
+@CHART_BUILD_SECONDS.time(chart='create_market_depth_chart')
+def create_market_depth_chart(orderbooks, metrics, icebergs=None):
     """Create market depth visualization"""
     if not orderbooks:
         return _create_empty_chart("Loading market depth...", "Market Depth - Loading...")
@@ -323,6 +541,14 @@ def create_market_depth_chart(orderbooks, metrics):
     current_price = metrics.get('current_price', (bid_prices[0] + ask_prices[0]) / 2) if metrics else (bid_prices[0] + ask_prices[0]) / 2
     fig.add_hline(y=current_price, line_dash="dash", line_color="blue")
     
+    # Mark levels that keep refilling after being hit
+    for iceberg in icebergs or []:
+        fig.add_hline(
+            y=iceberg['price'], line_dash="dot", line_width=1,
+            line_color='darkgreen' if iceberg['side'] == 'bid' else 'darkred',
+            annotation_text=f"🧊 x{iceberg['refills']}", annotation_position="right"
+        )
+    
     # Calculate spread
     spread = ask_prices[0] - bid_prices[0]
     
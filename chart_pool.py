@@ -0,0 +1,142 @@
+"""
+Concurrent figure construction for the refresh callback.
+
+The dashboard figures are independent, so CHART_EXECUTOR can build
+them side by side instead of one after another:
+
+    serial   one after another on the callback thread (default)
+    thread   a thread pool; helps as far as NumPy/pandas release the GIL,
+             Plotly's validation is pure Python and holds it
+    process  a pool of worker processes; a window's per-trade arrays are
+             handed over in one shared-memory block instead of being pickled
+
+Each job builds its figure and converts it to the plain dict Dash
+JSON-encodes for the response, so the conversion runs in parallel too
+(the encoding itself happens afterwards, on the callback thread). In
+process mode the chart builder histograms are recorded in the workers and
+do not show on /metrics; the conversion and callback histograms still do.
+"""
+
+import multiprocessing
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from multiprocessing.shared_memory import SharedMemory
+
+import numpy as np
+import pandas as pd
+
+from metrics import FIGURE_CONVERT_SECONDS
+from precompute import WindowAggregates
+from shared_store import TRADE_DTYPE, array_to_trades, trades_to_array
+
+MODES = ('serial', 'thread', 'process')
+
+
+class SharedWindow:
+    """A window whose per-trade arrays live in a shared-memory block.
+
+    Only the block's name and the window's small aggregates are pickled to
+    the worker, which copies the trades and cumulative delta back out.
+    """
+
+    def __init__(self, window):
+        records = trades_to_array(window.trades)
+        self.count = len(records)
+        self.block = SharedMemory(create=True, size=max(1, self.count * (TRADE_DTYPE.itemsize + 8)))
+        self.name = self.block.name
+        np.ndarray(self.count, TRADE_DTYPE, buffer=self.block.buf)[:] = records
+        self._delta_view(self.block)[:] = window.cumulative_delta.values
+        self.window = WindowAggregates(
+            window.minutes, window.store_trades, None, window.metrics, window.candles, None,
+            window.delta_1min, window.price_trend, window.profile, window.start, window.end
+        )
+
+    def __getstate__(self):
+        return {'name': self.name, 'count': self.count, 'window': self.window}
+
+    def _delta_view(self, block):
+        return np.ndarray(self.count, 'f8', buffer=block.buf, offset=self.count * TRADE_DTYPE.itemsize)
+
+    def attach(self):
+        """Worker side: the full window, copied out of the block"""
+        block = SharedMemory(name=self.name)
+        try:
+            records = np.array(np.ndarray(self.count, TRADE_DTYPE, buffer=block.buf))
+            cumulative_delta = np.array(self._delta_view(block))
+        finally:
+            block.close()
+        trades = array_to_trades(records)
+        window = self.window
+        return WindowAggregates(
+            window.minutes, window.store_trades, trades, window.metrics, window.candles,
+            pd.Series(cumulative_delta, index=pd.DatetimeIndex(trades['timestamp'])),
+            window.delta_1min, window.price_trend, window.profile, window.start, window.end
+        )
+
+    def release(self):
+        """Parent side, once every job that uses the block is done"""
+        self.block.close()
+        self.block.unlink()
+
+
+def _run_job(builder, args):
+    """Build one figure and convert it, returning (figure dict, conversion seconds)"""
+    args = [arg.attach() if isinstance(arg, SharedWindow) else arg for arg in args]
+    fig = builder(*args)
+    started = time.perf_counter()
+    return fig.to_plotly_json(), time.perf_counter() - started
+
+
+def _warm_up():
+    # Pay for importing Plotly and the chart code before the first refresh
+    import chart_builder  # noqa: F401
+
+
+class ChartExecutor:
+    """Runs figure jobs serially, on threads or on worker processes"""
+
+    def __init__(self, mode='serial', workers=4):
+        if mode not in MODES:
+            raise ValueError(f"chart executor must be one of {', '.join(MODES)}")
+        self.mode = mode
+        self.workers = workers
+        self.pool = None
+        if mode == 'thread':
+            self.pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='chart-build')
+        elif mode == 'process':
+            # Spawned, not forked: the web process runs ingest and push threads
+            self.pool = ProcessPoolExecutor(
+                max_workers=workers, mp_context=multiprocessing.get_context('spawn'), initializer=_warm_up
+            )
+
+    def start(self):
+        """Bring the worker processes up in the background"""
+        if self.mode == 'process':
+            for _ in range(self.workers):
+                self.pool.submit(_warm_up)
+
+    def build(self, jobs, window=None):
+        """Run {name: (builder, args)} jobs, returning {name: figure dict}.
+
+        In process mode `window`, wherever it appears in args, goes to the
+        workers through shared memory.
+        """
+        if self.mode == 'serial':
+            results = {name: _run_job(builder, args) for name, (builder, args) in jobs.items()}
+        else:
+            shared = SharedWindow(window) if self.mode == 'process' and window is not None else None
+            try:
+                futures = {
+                    name: self.pool.submit(_run_job, builder, [shared if shared and arg is window else arg for arg in args])
+                    for name, (builder, args) in jobs.items()
+                }
+                results = {name: future.result() for name, future in futures.items()}
+            finally:
+                if shared is not None:
+                    shared.release()
+
+        figures = {}
+        for name, (figure, seconds) in results.items():
+            FIGURE_CONVERT_SECONDS.labels(chart=name).observe(seconds)
+            figures[name] = figure
+        return figures
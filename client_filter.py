@@ -0,0 +1,160 @@
+"""
+Browser-side filtering of the Large Trades chart (CLIENT_FILTERING).
+
+Instead of a finished figure, the browser gets the largest time window's
+trades that some slider setting in the current size mode could show (in
+top % mode, down to the largest CLIENT_FILTER_TOP_PERCENT of trades), as
+compact typed columns (base64 of little-endian arrays) in a dcc.Store, together with the size each slider
+step stands for in the top % and z-score modes. The window is shipped
+once: assets/client_filter.js keeps the rows it has decoded and reports a
+cursor back, and later refreshes only ship the trades after it. It
+applies the size filter, the window slice and the marker sizing in the
+browser, so moving the slider or picking another window redraws at once
+and costs the server nothing.
+"""
+
+import base64
+import math
+
+import numpy as np
+import plotly.graph_objects as go
+
+import config
+
+
+def encode_column(values, dtype):
+    """{'dtype', 'data'} for a typed array column; dtype is one of f8, f4, i1, i4"""
+    data = np.ascontiguousarray(values, dtype='<' + dtype).tobytes()
+    return {'dtype': dtype, 'data': base64.b64encode(data).decode('ascii')}
+
+
+def _ms(values):
+    return np.asarray(values, dtype='datetime64[ms]').astype('f8')
+
+
+def slider_steps():
+    count = int(round((config.TRADE_SIZE_MAX - config.TRADE_SIZE_MIN) / config.TRADE_SIZE_STEP)) + 1
+    return np.round(config.TRADE_SIZE_MIN + np.arange(count) * config.TRADE_SIZE_STEP, 6)
+
+
+def size_thresholds(size_stats, steps):
+    """{mode: BTC size per slider step}, None for a mode the sketch cannot answer yet"""
+    thresholds = {}
+    for mode, lookup in (('percentile', size_stats.size_at_top_percent), ('zscore', size_stats.size_at_zscore)):
+        sizes = [lookup(step) for step in steps]
+        thresholds[mode] = None if any(size is None for size in sizes) else sizes
+    return thresholds
+
+
+def figure_template():
+    """Plotly template the server side figures use, so the browser's look the same"""
+    return go.Figure().to_plotly_json()['layout']['template']
+
+
+def shipped_min_size(thresholds, size_stats, mode):
+    """Smallest trade size shipped to the browser for the size `mode`.
+
+    In BTC mode (or before the sketch can answer) the slider value is the
+    size, so every trade the slider can reach is shipped. Otherwise it is
+    the mode's loosest step, in top % mode no looser than the largest
+    CLIENT_FILTER_TOP_PERCENT of trades, snapped down to quarter powers of
+    two so that the streaming sketch's drift does not change it (and force
+    a full reload) on every refresh.
+    """
+    sizes = thresholds.get(mode)
+    if not sizes:
+        return float(config.TRADE_SIZE_MIN)
+    size = min(sizes)
+    if mode == 'percentile':
+        size = max(size, size_stats.size_at_top_percent(config.CLIENT_FILTER_TOP_PERCENT) or 0.0)
+    if size <= 0:
+        return 0.0
+    return float(2 ** (math.floor(math.log2(size) * 4) / 4))
+
+
+def _resume_position(trades, min_size, cursor):
+    """Store position after the last trade the browser holds, or None if it has to reload.
+
+    The browser's cursor names its last trade and how many it holds from
+    `first` on; a different count means history was merged in between.
+    """
+    if not cursor or cursor.get('min_size') != min_size or not cursor.get('count'):
+        return None
+    last_time, last_price, last_size = cursor['last']
+    timestamps = trades['timestamp'].values
+    last_ms = np.datetime64(int(last_time), 'ms')
+    low = timestamps.searchsorted(last_ms)
+    high = timestamps.searchsorted(last_ms + np.timedelta64(1, 'ms'))
+    prices = trades['price'].values[low:high]
+    sizes = trades['size'].values[low:high]
+    matches = np.flatnonzero((prices == last_price) & (sizes == last_size))
+    if len(matches) == 0:
+        return None
+    position = low + int(matches[-1]) + 1
+    first = timestamps.searchsorted(np.datetime64(int(cursor['first']), 'ms'))
+    held = int((trades['size'].values[first:position] >= min_size).sum())
+    return position if held == cursor['count'] else None
+
+
+def _trade_columns(trades):
+    return {
+        't': encode_column(_ms(trades['timestamp'].values), 'f8'),
+        'price': encode_column(trades['price'].values, 'f8'),
+        # f8 like the thresholds it is compared with, so no size rounds below its own threshold
+        'size': encode_column(trades['size'].values, 'f8'),
+        'side': encode_column(np.where(trades['side'].values == 'buy', 1, -1), 'i1'),
+    }
+
+
+def large_trades_dataset(snapshot, window, sweeps, size_stats, mode='btc', cursor=None):
+    """Store payload for the browser's Large Trades chart, from the largest window.
+
+    `mode` is the size mode the trades are shipped for. With the browser's
+    `cursor` (see client_filter.js) only the trades after the ones it
+    already holds are shipped, and `append` is set.
+    """
+    if window.store_trades == 0:
+        return {'version': snapshot.version, 'loading': True}
+
+    steps = slider_steps()
+    thresholds = size_thresholds(size_stats, steps)
+    min_size = shipped_min_size(thresholds, size_stats, mode)
+
+    position = _resume_position(snapshot.trades, min_size, cursor)
+    if position is None:
+        trades = window.trades
+    else:
+        trades = snapshot.trades.iloc[position:]
+        trades = trades[trades['timestamp'].values > np.datetime64(window.start)]
+    large = trades[trades['size'].values >= min_size]
+    if sweeps is not None and len(sweeps) > 0:
+        sweeps = sweeps[(sweeps['end'] > window.start) & (sweeps['size'] >= min_size) & (sweeps['levels'] >= 2)]
+    else:
+        sweeps = None
+
+    return {
+        'version': snapshot.version,
+        'append': position is not None,
+        'after': cursor['last'] if position is not None else None,
+        'mode': mode,
+        'min_size': min_size,
+        'start': float(_ms(window.start)),
+        'end': float(_ms(window.end)),
+        'steps': steps.tolist(),
+        'thresholds': thresholds,
+        'trades': _trade_columns(large),
+        'sweeps': None if sweeps is None or len(sweeps) == 0 else {
+            't': encode_column(_ms(sweeps['end'].values), 'f8'),
+            'vwap': encode_column(sweeps['vwap'].values, 'f8'),
+            'size': encode_column(sweeps['size'].values, 'f8'),
+            'side': encode_column(np.where(sweeps['side'].values == 'buy', 1, -1), 'i1'),
+            'trades': encode_column(sweeps['trades'].values, 'i4'),
+            'levels': encode_column(sweeps['levels'].values, 'i4'),
+            'first_price': encode_column(sweeps['first_price'].values, 'f8'),
+            'last_price': encode_column(sweeps['last_price'].values, 'f8'),
+        },
+        'trend': {
+            't': encode_column(_ms(window.price_trend.index.values), 'f8'),
+            'price': encode_column(window.price_trend.values, 'f8'),
+        },
+    }
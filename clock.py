@@ -0,0 +1,123 @@
+"""
+Exchange clock reconciliation and data freshness tracking.
+
+All timestamps in the stores are naive UTC on the exchange's clock. The
+local clock is mapped onto it with an NTP-style offset estimate from the
+exchange's server time endpoint, so time windows are cut against the same
+clock the trades were stamped with.
+"""
+
+import threading
+import time
+from collections import deque
+from datetime import datetime, timedelta, timezone
+
+import numpy as np
+
+from metrics import REGISTRY, Gauge, Histogram
+
+FRESHNESS_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2, 5, 10, 30, 60, 120)
+
+CLOCK_OFFSET = REGISTRY.register(Gauge(
+    'orderflow_clock_offset_seconds', 'Estimated exchange clock minus local clock'))
+CLOCK_RTT = REGISTRY.register(Gauge(
+    'orderflow_clock_rtt_seconds', 'Round trip of the sample the clock offset is based on'))
+EXCHANGE_TO_RECEIVE = REGISTRY.register(Histogram(
+    'orderflow_exchange_to_receive_seconds', 'Trade exchange time to local receipt', buckets=FRESHNESS_BUCKETS))
+TICK_TO_RENDER = REGISTRY.register(Histogram(
+    'orderflow_tick_to_render_seconds', 'Trade exchange time to first dashboard render', buckets=FRESHNESS_BUCKETS))
+
+
+def utc_from_ms(timestamp_ms):
+    """Naive UTC datetime from an exchange millisecond timestamp"""
+    return datetime.fromtimestamp(timestamp_ms / 1000, tz=timezone.utc).replace(tzinfo=None)
+
+
+class ExchangeClock:
+    """Local clock corrected by the estimated offset to the exchange clock"""
+
+    def __init__(self, max_samples=8):
+        self.lock = threading.Lock()
+        self.samples = deque(maxlen=max_samples)  # (rtt, offset) in seconds
+        self.offset = 0.0
+        self.rtt = None
+        self.last_sync = None
+
+    def now(self):
+        """Current time on the exchange clock (naive UTC)"""
+        return datetime.now(timezone.utc).replace(tzinfo=None) + timedelta(seconds=self.offset)
+
+    def sync(self, fetch_server_time_ms):
+        """Take one offset sample using the exchange's server time"""
+        sent = time.time()
+        server_ms = fetch_server_time_ms()
+        received = time.time()
+        rtt = received - sent
+        # Assume the server stamped the response halfway through the round trip
+        self.add_sample(rtt, server_ms / 1000 - (sent + received) / 2)
+
+    def add_sample(self, rtt, offset):
+        with self.lock:
+            self.samples.append((rtt, offset))
+            # The fastest round trip has the least asymmetric delay in it
+            self.rtt, self.offset = min(self.samples)
+            self.last_sync = time.monotonic()
+        CLOCK_OFFSET.set(self.offset)
+        CLOCK_RTT.set(self.rtt)
+
+    def adopt(self, offset):
+        """Use an offset estimated by another process (shared data plane)"""
+        self.offset = offset
+        CLOCK_OFFSET.set(offset)
+
+    def sync_due(self, interval):
+        return self.last_sync is None or time.monotonic() - self.last_sync >= interval
+
+
+class FreshnessTracker:
+    """Rolling tick-to-render latencies for percentile reporting"""
+
+    def __init__(self, clock, max_samples=5000):
+        self.clock = clock
+        self.lock = threading.Lock()
+        self.latencies = deque(maxlen=max_samples)
+        self.rendered_until = None
+
+    def record_receive(self, trades):
+        """Observe exchange-to-receive latency of freshly ingested trades"""
+        if len(trades) == 0:
+            return
+        delays = (trades['received_at'] - trades['timestamp']).dt.total_seconds().values
+        for delay in delays:
+            EXCHANGE_TO_RECEIVE.observe(delay)
+
+    def record_render(self, trades):
+        """Observe tick-to-render latency of trades shown for the first time"""
+        if len(trades) == 0:
+            return
+        render_time = self.clock.now()
+        with self.lock:
+            if self.rendered_until is None:
+                # Trades already in the store at startup were never "live"
+                self.rendered_until = trades['timestamp'].iloc[-1]
+                return
+            start = trades['timestamp'].searchsorted(self.rendered_until, side='right')
+            fresh = trades['timestamp'].iloc[start:]
+            if len(fresh) == 0:
+                return
+            self.rendered_until = fresh.iloc[-1]
+            delays = (render_time - fresh).dt.total_seconds().values
+            self.latencies.extend(delays)
+        for delay in delays:
+            TICK_TO_RENDER.observe(delay)
+
+    def percentiles(self, quantiles=(50, 95, 99)):
+        with self.lock:
+            if not self.latencies:
+                return {}
+            values = np.percentile(np.fromiter(self.latencies, dtype=float), quantiles)
+        return dict(zip(quantiles, values))
+
+
+CLOCK = ExchangeClock()
+FRESHNESS = FreshnessTracker(CLOCK)
@@ -1,6 +1,140 @@
+import os
+
 # Configuration settings
 SYMBOL = "BTC/USDT"
 EXCHANGES = ['Binance', 'Kraken', 'OKX', 'Bitfinex', 'Huobi']
-UPDATE_INTERVAL = 5  # seconds
+UPDATE_INTERVAL = 5  # seconds, initial trade poll interval before it adapts
 LIQUIDITY_THRESHOLD = 15.0  # BTC amount to consider a zone significant
-DATA_DIR = "./liquidity_data"
\ No newline at end of file
+DATA_DIR = "./liquidity_data"
+
+# Data plane: 'local' keeps everything in the web process, 'shared' reads the
+# buffers published by the ingestion process (see ingest.py)
+DATA_PLANE = os.environ.get("ORDER_FLOW_DATA_PLANE", "local")
+SHARED_DIR = os.environ.get(
+    "ORDER_FLOW_SHARED_DIR",
+    "/dev/shm/order_flow" if os.path.isdir("/dev/shm") else os.path.join(DATA_DIR, "shared")
+)
+
+# Push live updates to dashboards over server-sent events; ingestion then runs
+# on a background thread instead of inside every client's refresh callback
+PUSH_UPDATES = os.environ.get("ORDER_FLOW_PUSH", "1") == "1"
+PUSH_MAX_CLIENTS = int(os.environ.get("ORDER_FLOW_PUSH_MAX_CLIENTS", 100))  # per web process
+
+# Time windows offered on the dashboard; aggregates for all of them are
+# precomputed once per data version (see precompute.py)
+TIME_WINDOWS = [15, 30, 60, 120]  # minutes
+TRADE_RETENTION_HOURS = 4  # trades kept in memory
+
+# Memory budget for the data stores, not the whole process (see memory.py)
+MEMORY_BUDGET_MB = float(os.environ.get("ORDER_FLOW_MEMORY_BUDGET_MB", 256))
+MEMORY_LOW_WATER = 0.7  # share of the budget below which relief is rolled back
+MEMORY_CHECK_INTERVAL = 5  # seconds
+MEMORY_RETENTION_STEPS = [3, 2]  # hours of trades to fall back to in turn, >= the largest window
+PRECOMPUTE_MAX_AGE = 5  # seconds before an unchanged version's windows are cut again
+
+# How the refresh callback builds its figures: 'serial', 'thread' or 'process'
+# (see chart_pool.py)
+CHART_EXECUTOR = os.environ.get("ORDER_FLOW_CHART_EXECUTOR", "serial")
+CHART_WORKERS = int(os.environ.get("ORDER_FLOW_CHART_WORKERS", min(4, os.cpu_count() or 1)))
+
+# Min Trade Size slider (BTC, top % or z-score depending on the mode)
+TRADE_SIZE_MIN = 0.1
+TRADE_SIZE_MAX = 5
+TRADE_SIZE_STEP = 0.1
+
+# Ship the largest window's trades to the browser and filter the Large Trades
+# chart there, so slider and window changes redraw without a request (see client_filter.py)
+CLIENT_FILTERING = os.environ.get("ORDER_FLOW_CLIENT_FILTERING", "0") == "1"
+CLIENT_FILTER_TOP_PERCENT = 5.0  # in top % mode, ship at most the largest 5% of trades; looser settings are floored
+
+# Fetch scheduling (see scheduler.py)
+TRADE_POLL_MIN_INTERVAL = 1  # seconds
+TRADE_POLL_MAX_INTERVAL = 30  # seconds
+BOOK_POLL_INTERVAL = 5  # seconds
+CLOCK_SYNC_INTERVAL = 60  # seconds between exchange server time samples
+DEFAULT_WEIGHT_LIMIT = 1200  # request weight per minute
+EXCHANGE_WEIGHT_LIMITS = {'binance': 6000}
+REQUEST_WEIGHTS = {  # request weight per call, by ccxt exchange id
+    'binance': {'trades': 2, 'orderbook': 5, 'time': 1, 'markets': 20},
+}
+FETCH_TIMEOUT = 5  # seconds an exchange call (including waiting for weight) may take
+BREAKER_FAILURES = 3  # consecutive failures that open an endpoint's circuit breaker
+BACKOFF_BASE = 1  # seconds, doubled per consecutive failure (with full jitter)
+BACKOFF_MAX = 60  # seconds
+STALE_AFTER = 90  # seconds without a successful fetch before the dashboard flags stale data (> TRADE_POLL_MAX_INTERVAL)
+HEDGE_REQUESTS = os.environ.get("ORDER_FLOW_HEDGE", "0") == "1"  # race slow calls against a backup host
+HEDGE_MIN_DELAY = 0.25  # seconds; hedge after max(this, the endpoint's p95 latency)
+HEDGE_HOSTS = {  # (primary host, backup host), by ccxt exchange id
+    'binance': ('api.binance.com', 'api1.binance.com'),
+}
+EXCHANGE_OPTIONS = {  # ccxt options, by exchange id
+    'binance': {'fetchMarkets': ['spot']},  # only spot symbols are used, skip loading derivatives markets
+}
+
+# Cold start backfill of recent trades (see backfill.py)
+BACKFILL_HOURS = float(os.environ.get("ORDER_FLOW_BACKFILL_HOURS", max(TIME_WINDOWS) / 60))  # 0 turns it off
+BACKFILL_SLICES = 8  # time slices fetched concurrently
+BACKFILL_WORKERS = 4
+BACKFILL_PAGE_SIZE = 1000  # trades per request
+BACKFILL_BUDGET_SHARE = 0.5  # of the weight budget, the rest is left to the live polls
+BACKFILL_RETRIES = 3  # attempts per page before a slice gives up
+
+# Profiling (see profiling.py)
+PROFILE_INVOCATIONS = int(os.environ.get("ORDER_FLOW_PROFILE", 0))  # arm at startup for N invocations
+PROFILE_SAMPLE_INTERVAL = 0.005  # seconds between stack samples
+ADMIN_TOKEN = os.environ.get("ORDER_FLOW_ADMIN_TOKEN")  # enables /admin/* routes
+
+# Parent order detection (see order_detection.py)
+SWEEP_MAX_GAP_MS = 50  # same-side prints closer than this belong to one sweep
+SWEEP_MIN_TRADES = 2
+ICEBERG_DEPLETION = 0.5  # level counts as hit below this share of its displayed size
+ICEBERG_REFILL = 0.8  # and as refilled when back above this share
+ICEBERG_MIN_REFILLS = 3
+
+# Activity bars offered besides one-minute candles (see bars.py)
+BAR_THRESHOLDS = {
+    'volume': 10.0,  # BTC per bar
+    'tick': 500,  # trades per bar
+    'range': 20.0,  # USD high-low per bar
+    'delta': 5.0,  # BTC of net aggressor volume per bar
+}
+
+# Order flow toxicity (see vpin.py)
+VPIN_BUCKET_VOLUME = 10.0  # BTC per equal-volume bucket
+VPIN_WINDOW_BUCKETS = 50  # buckets in the rolling VPIN
+
+# Book microstructure series (see microstructure.py)
+MICRO_LEVELS = 10  # levels per side in the imbalance
+MICRO_DEPTH_BPS = 10  # band around the mid for resting depth, within the levels fetched
+
+# VWAP overlays (see indicators.py)
+VWAP_MAX_ANCHORS = 5  # anchored VWAPs kept per dashboard
+
+# Alerts (see alerts.py); rule types: large_trade, delta, spread, liquidity_zone
+ALERT_RULES = [
+    {'type': 'large_trade', 'size': 10.0},  # BTC
+    {'type': 'delta', 'threshold': 50.0, 'seconds': 60},  # net BTC within the window
+    {'type': 'liquidity_zone', 'width': 10.0},  # USD around levels holding LIQUIDITY_THRESHOLD BTC
+    {'type': 'spread', 'max_spread': 5.0},  # USD
+    {'type': 'vpin', 'threshold': 0.6},  # VPIN over VPIN_WINDOW_BUCKETS buckets
+]
+ALERT_COOLDOWN = 60  # seconds before the same rule notifies again
+ALERT_MAX_PER_MINUTE = 20  # across all rules
+ALERT_LOG = os.path.join(DATA_DIR, "alerts.log")
+ALERT_WEBHOOK_URL = os.environ.get("ORDER_FLOW_ALERT_WEBHOOK")  # e.g. http://127.0.0.1:8050/alerts/webhook
+
+# Tick archive and export (see archive.py, export.py)
+ARCHIVE_ENABLED = os.environ.get("ORDER_FLOW_ARCHIVE", "1") == "1"
+ARCHIVE_DIR = os.path.join(DATA_DIR, "archive")
+ARCHIVE_RETENTION_DAYS = 30
+EXPORT_CHUNK_ROWS = 50000  # rows encoded at a time
+
+# Hourly fixed-tick volume profiles behind the composite value area (see profile_store.py)
+PROFILES_ENABLED = os.environ.get("ORDER_FLOW_PROFILES", "1") == "1"
+PROFILE_DIR = os.path.join(DATA_DIR, "volume_profiles")
+PROFILE_TICK = 10.0  # USD per bin
+PROFILE_FLUSH_INTERVAL = 60  # seconds between saves of the current hour
+PROFILE_RETENTION_DAYS = 90
+VALUE_AREA_SHARE = 0.7
+COMPOSITE_SESSIONS = [1, 5, 20]  # completed UTC days offered for the composite levels
+COMPOSITE_DEFAULT_SESSIONS = 5
@@ -1,72 +1,433 @@
-import ccxt
+import sys
+import threading
+import time
 import pandas as pd
 import numpy as np
-from datetime import datetime, timedelta
+from datetime import timedelta
+
+import config
+import metrics
+import startup
+from clock import CLOCK, FRESHNESS, utc_from_ms
+from memory import frame_bytes
+from scheduler import BudgetTimeout, FetchScheduler
+from resilience import CircuitBreaker, LatencyTracker, call_with_deadline, hedged_call, time_left
+
+EXCHANGE_ID = 'binance'
+TRADE_PAGE_SIZE = 200
+ORDERBOOK_HISTORY_SIZE = 50
+
+EMPTY_TRADES = pd.DataFrame(columns=['timestamp', 'price', 'size', 'side', 'received_at'])
+
+class DataSnapshot:
+    """One immutable, consistent version of the data stores.
+
+    Ingestion never modifies a published snapshot, it publishes a new one,
+    so readers can hold on to a snapshot for a whole refresh without locks.
+    Treat `trades` as read-only.
+    
+    `new_trades_count` is what this version added; consumers that may skip
+    versions (a backfill merge can publish right after a fetch) should diff
+    `ingested_total`, the live trades ingested since startup, instead.
+    `merges` counts history merged in anywhere but the end, after which
+    the trades are no longer the previous ones plus appended rows.
+    """
+    __slots__ = ('version', 'trades', 'orderbooks', 'last_update', 'new_trades_count', 'ingested_total', 'merges')
+    
+    def __init__(self, version, trades, orderbooks, last_update, new_trades_count, ingested_total=0, merges=0):
+        self.version = version
+        self.trades = trades
+        self.orderbooks = orderbooks  # tuple of order book dicts, oldest first
+        self.last_update = last_update
+        self.new_trades_count = new_trades_count
+        self.ingested_total = ingested_total
+        self.merges = merges
+
+def _replace_host(urls, old, new):
+    """Copy of a ccxt urls tree with one host swapped for another"""
+    if isinstance(urls, dict):
+        return {key: _replace_host(value, old, new) for key, value in urls.items()}
+    if isinstance(urls, str):
+        return urls.replace(f"//{old}", f"//{new}")
+    return urls
+
+def load_exchange_class(exchange_id):
+    """Import ccxt on first use and return one exchange class"""
+    # ccxt pulls in hundreds of modules, keep it off the web app's import path
+    import ccxt
+    return getattr(ccxt, exchange_id)
 
 class OrderFlowData:
     def __init__(self):
-        self.exchange = ccxt.binance()
+        self.exchange_id = EXCHANGE_ID
+        self._exchange = None
+        self._exchange_lock = threading.Lock()
         self.symbol = 'BTC/USDT'
-        self.all_trades = pd.DataFrame(columns=['timestamp', 'price', 'size', 'side'])
-        self.orderbook_history = []
         self.data_start_time = None
-        self.last_update = None
+        self.scheduler = FetchScheduler(self.exchange_id, TRADE_PAGE_SIZE)
+        self._backup_exchange = None
+        self.breakers = {
+            endpoint: CircuitBreaker(endpoint, config.BREAKER_FAILURES, config.BACKOFF_BASE, config.BACKOFF_MAX)
+            for endpoint in ('trades', 'orderbook')
+        }
+        self.latency = {endpoint: LatencyTracker() for endpoint in self.breakers}
+        self.retention = timedelta(hours=config.TRADE_RETENTION_HOURS)  # shortened under memory pressure
+        # Single writer; readers only ever dereference self._snapshot
+        self._write_lock = threading.Lock()
+        self._snapshot = DataSnapshot(0, EMPTY_TRADES, (), None, 0)
+        self.trade_listeners = []
+        self.book_listeners = []
+    
+    @property
+    def exchange(self):
+        """The ccxt exchange, created on first use"""
+        if self._exchange is None:
+            with self._exchange_lock:
+                if self._exchange is None:
+                    self._exchange = self._create_exchange()
+                    startup.mark('exchange_ready')
+        return self._exchange
+    
+    @property
+    def backup_exchange(self):
+        """Second client pointed at the backup host, used for hedged requests"""
+        hosts = config.HEDGE_HOSTS.get(self.exchange_id)
+        if self._backup_exchange is None and hosts:
+            with self._exchange_lock:
+                if self._backup_exchange is None:
+                    primary, backup = hosts
+                    urls = _replace_host(self.exchange.urls['api'], primary, backup)
+                    self._backup_exchange = self._create_exchange({'urls': {'api': urls}})
+        return self._backup_exchange
+    
+    def _create_exchange(self, overrides=None):
+        exchange_class = load_exchange_class(self.exchange_id)
+        settings = {
+            'options': config.EXCHANGE_OPTIONS.get(self.exchange_id, {}),
+            # Let the HTTP client give up too, so abandoned calls free their worker
+            'timeout': int(config.FETCH_TIMEOUT * 1000),
+        }
+        settings.update(overrides or {})
+        return exchange_class(settings)
+    
+    def warm_up(self):
+        """Create the exchange and load its markets ahead of the first fetch"""
+        try:
+            self.scheduler.call('markets', self.exchange.load_markets)
+            startup.mark('markets_loaded')
+        except Exception as e:
+            # The first fetch will load them instead
+            self._handle_fetch_error('markets', e)
+    
+    def start_warm_up(self):
+        """Warm up on a background thread"""
+        threading.Thread(target=self.warm_up, name='exchange-warm-up', daemon=True).start()
+    
+    def add_trade_listener(self, listener):
+        """Call listener(new_trades) with every batch of newly ingested trades.
+
+        Listeners run on the ingest path, so they should do O(1) work per trade.
+        """
+        self.trade_listeners.append(listener)
+    
+    def _notify_trade_listeners(self, new_trades):
+        for listener in self.trade_listeners:
+            try:
+                listener(new_trades)
+            except Exception as e:
+                print(f"❌ Trade listener error: {e}")
+    
+    def add_book_listener(self, listener):
+        """Call listener(orderbook) with every newly fetched order book snapshot"""
+        self.book_listeners.append(listener)
+    
+    def _notify_book_listeners(self, orderbook):
+        for listener in self.book_listeners:
+            try:
+                listener(orderbook)
+            except Exception as e:
+                print(f"❌ Book listener error: {e}")
+    
+    def snapshot(self):
+        """The latest published snapshot"""
+        return self._snapshot
+    
+    @property
+    def all_trades(self):
+        return self._snapshot.trades
+    
+    @property
+    def orderbook_history(self):
+        return self._snapshot.orderbooks
+    
+    @property
+    def last_update(self):
+        return self._snapshot.last_update
+    
+    @property
+    def last_new_trades_count(self):
+        return self._snapshot.new_trades_count
+    
+    def publish(self, trades, orderbooks, last_update, new_trades_count, merged=False, ingested_total=None):
+        """Atomically replace the current snapshot"""
+        current = self._snapshot
+        if ingested_total is None:
+            ingested_total = current.ingested_total + new_trades_count
+        self._snapshot = DataSnapshot(
+            current.version + 1, trades, tuple(orderbooks), last_update, new_trades_count,
+            ingested_total, current.merges + merged
+        )
+        startup.mark('first_data')
+        
+    def fetch_new_data(self, force=False):
+        """Fetch new trades and order book data, whichever is due"""
+        if not self._write_lock.acquire(blocking=False):
+            # Another thread is already fetching, keep serving the current snapshot
+            return 0
         
-    def fetch_new_data(self):
-        """Fetch new trades and order book data"""
         try:
-            # Fetch recent trades
-            trades = self.exchange.fetch_trades(self.symbol, limit=200)
-            new_trades = []
+            if CLOCK.sync_due(config.CLOCK_SYNC_INTERVAL):
+                self._sync_clock()
+            
+            current = self._snapshot
+            trades, orderbooks, last_update = current.trades, current.orderbooks, current.last_update
+            new_trades_count = 0
+            
+            # Endpoints backing off after errors keep their last-known data
+            if (force or self.scheduler.trades_due_in() <= 0) and self.breakers['trades'].allow():
+                fetched = self._fetch_trades(trades)
+                if fetched is not None:
+                    trades, new_trades_count, last_update = fetched
+            
+            if (force or self.scheduler.book_due_in() <= 0) and self.breakers['orderbook'].allow():
+                orderbook_data = self._fetch_orderbook()
+                if orderbook_data is not None:
+                    self._notify_book_listeners(orderbook_data)
+                    orderbooks = (orderbooks + (orderbook_data,))[-ORDERBOOK_HISTORY_SIZE:]
+                    last_update = orderbook_data['timestamp']
+            
+            if trades is not current.trades or orderbooks is not current.orderbooks:
+                self.publish(trades, orderbooks, last_update, new_trades_count)
+            
+            return new_trades_count
+        finally:
+            self._write_lock.release()
+    
+    def next_fetch_delay(self):
+        """Seconds until the next endpoint is due"""
+        return min(
+            max(self.scheduler.trades_due_in(), self.breakers['trades'].retry_in()),
+            max(self.scheduler.book_due_in(), self.breakers['orderbook'].retry_in()),
+        )
+    
+    def staleness(self):
+        """Seconds since the data was last refreshed if it is stale, otherwise None"""
+        successes = [breaker.last_success for breaker in self.breakers.values()]
+        if None in successes:
+            # Still starting up unless an endpoint has already given up
+            return 0.0 if any(breaker.is_open for breaker in self.breakers.values()) else None
+        age = time.monotonic() - min(successes)
+        if age > config.STALE_AFTER or any(breaker.is_open for breaker in self.breakers.values()):
+            return age
+        return None
+    
+    def _fetch_trades(self, all_trades):
+        """Fetch recent trades, returning (merged trades, new count, receive time)"""
+        try:
+            # One deadline for waiting on the budget and the request together
+            deadline = time.monotonic() + config.FETCH_TIMEOUT
+            trades, leader = self.scheduler.call('trades', lambda: self._request_trades(deadline), time_left(deadline))
+            if not leader:
+                # A concurrent caller fetched this page and is ingesting it
+                return None
+            self.breakers['trades'].record_success()
+            received_at = CLOCK.now()
+            self._sync_budget()
+            
+            with metrics.INGEST_SECONDS.time():
+                merged_trades, new_trades_count = self._ingest_trades(all_trades, trades, received_at)
             
-            for trade in trades:
-                trade_time = datetime.fromtimestamp(trade['timestamp'] / 1000)
-                
-                # Only add new trades
-                if len(self.all_trades) == 0 or trade_time > self.all_trades['timestamp'].max():
-                    new_trades.append({
-                        'timestamp': trade_time,
-                        'price': float(trade['price']),
-                        'size': float(trade['amount']),
-                        'side': trade['side'],
-                    })
+            self.scheduler.trades.record(len(trades), new_trades_count)
+            
+            return merged_trades, new_trades_count, received_at
+            
+        except Exception as e:
+            self._handle_fetch_error('trades', e)
+            self.scheduler.trades.record(0, 0)  # back off instead of retrying immediately
+            return None
+    
+    def _ingest_trades(self, all_trades, trades, received_at):
+        """Merge the trades from a fetched page that we have not seen yet"""
+        last_timestamp = all_trades['timestamp'].max() if len(all_trades) else None
+        new_trades = []
+        
+        for trade in trades:
+            trade_time = utc_from_ms(trade['timestamp'])
+            
+            # Only add new trades
+            if last_timestamp is None or trade_time > last_timestamp:
+                new_trades.append({
+                    'timestamp': trade_time,
+                    'price': float(trade['price']),
+                    'size': float(trade['amount']),
+                    'side': trade['side'],
+                    'received_at': received_at,
+                })
+        
+        metrics.DUPLICATES_DROPPED.inc(len(trades) - len(new_trades))
+        
+        # Update data stores
+        if new_trades:
+            all_trades = self._merge_trades(all_trades, new_trades)
+        
+        return all_trades, len(new_trades)
+    
+    def _fetch_orderbook(self):
+        """Fetch an order book snapshot"""
+        try:
+            deadline = time.monotonic() + config.FETCH_TIMEOUT
+            orderbook, leader = self.scheduler.call(
+                'orderbook', lambda: self._request_orderbook(deadline), time_left(deadline)
+            )
+            if not leader:
+                return None
+            self.breakers['orderbook'].record_success()
+            self._sync_budget()
             
-            # Fetch order book
-            orderbook = self.exchange.fetch_order_book(self.symbol, limit=50)
             orderbook_data = {
-                'timestamp': datetime.now(),
+                'timestamp': CLOCK.now(),
                 'bids': [(float(price), float(amount)) for price, amount in orderbook['bids'][:20]],
                 'asks': [(float(price), float(amount)) for price, amount in orderbook['asks'][:20]]
             }
             
-            # Update data stores
-            if new_trades:
-                self._update_trades_data(new_trades)
-            
-            self.orderbook_history.append(orderbook_data)
-            self.orderbook_history = self.orderbook_history[-50:]  # Keep last 50 snapshots
-            
-            self.last_update = datetime.now()
-            
-            return len(new_trades)
+            self.scheduler.record_book_poll()
+            return orderbook_data
             
         except Exception as e:
-            print(f"❌ Data fetch error: {e}")
-            return 0
+            self._handle_fetch_error('orderbook', e)
+            self.scheduler.record_book_poll()
+            return None
     
-    def _update_trades_data(self, new_trades):
-        """Update trades data with new trades"""
+    def _sync_clock(self):
+        """Sample the offset between the local and the exchange clock"""
+        try:
+            deadline = time.monotonic() + config.FETCH_TIMEOUT
+            self.scheduler.call(
+                'time', lambda: CLOCK.sync(lambda: call_with_deadline(self.exchange.fetch_time, time_left(deadline))),
+                time_left(deadline)
+            )
+        except Exception as e:
+            # Keep the previous estimate and try again next interval
+            CLOCK.last_sync = time.monotonic()
+            self._handle_fetch_error('time', e)
+    
+    def _request_trades(self, deadline):
+        return self._request('trades', lambda exchange: exchange.fetch_trades(self.symbol, limit=TRADE_PAGE_SIZE),
+                             deadline)
+    
+    def _request_orderbook(self, deadline):
+        return self._request('orderbook', lambda exchange: exchange.fetch_order_book(self.symbol, limit=50), deadline)
+    
+    def _request(self, endpoint, request, deadline):
+        """Call the exchange with whatever is left until `deadline`, hedging slow calls when enabled"""
+        exchange = self.exchange
+        hedge_after = self.latency[endpoint].p95() if config.HEDGE_REQUESTS else None
+        backup = self.backup_exchange if hedge_after is not None else None
+        
+        timeout = time_left(deadline)
+        started = time.perf_counter()
+        with metrics.FETCH_SECONDS.time(endpoint=endpoint):
+            if backup is None:
+                result = call_with_deadline(lambda: request(exchange), timeout)
+            else:
+                def request_backup():
+                    # The hedge costs weight like any other request
+                    self.scheduler.budget.spend(self.scheduler.weights.get(endpoint, 1))
+                    return request(backup)
+                result = hedged_call(
+                    endpoint, lambda: request(exchange), request_backup,
+                    max(hedge_after, config.HEDGE_MIN_DELAY), timeout
+                )
+        self.latency[endpoint].observe(time.perf_counter() - started)
+        return result
+    
+    def _sync_budget(self):
+        """Align the weight budget with what the exchange says we have used"""
+        headers = getattr(self.exchange, 'last_response_headers', None) or {}
+        used_weight = headers.get('x-mbx-used-weight-1m') or headers.get('X-MBX-USED-WEIGHT-1M')
+        if used_weight:
+            self.scheduler.budget.sync(float(used_weight))
+    
+    def _handle_fetch_error(self, endpoint, e):
+        metrics.FETCH_ERRORS.labels(endpoint=endpoint, error=type(e).__name__).inc()
+        if endpoint in self.breakers and not isinstance(e, BudgetTimeout):
+            self.breakers[endpoint].record_failure()
+        ccxt = sys.modules.get('ccxt')
+        if ccxt is not None and isinstance(e, (ccxt.RateLimitExceeded, ccxt.DDoSProtection)):
+            # 429/418: stop spending weight until the exchange's window resets
+            self.scheduler.budget.penalize(60)
+        print(f"❌ Data fetch error: {e}")
+    
+    def store_sizes(self):
+        """Approximate bytes held by each data store"""
+        snapshot = self._snapshot
+        book_levels = sum(len(ob['bids']) + len(ob['asks']) for ob in snapshot.orderbooks)
+        return {
+            'trades': frame_bytes(snapshot.trades),
+            # tuple of two floats per level plus the list slot
+            'orderbook_history': book_levels * (sys.getsizeof((0.0, 0.0)) + 2 * sys.getsizeof(0.0) + 8),
+        }
+    
+    def _merge_trades(self, all_trades, new_trades):
+        """Return a new trades frame with new trades added (inputs are left untouched)"""
         new_trades_df = pd.DataFrame(new_trades)
+        FRESHNESS.record_receive(new_trades_df)
+        self._notify_trade_listeners(new_trades_df)
         
-        if not self.all_trades.empty:
-            self.all_trades = pd.concat([self.all_trades, new_trades_df], ignore_index=True)
+        if not all_trades.empty:
+            all_trades = pd.concat([all_trades, new_trades_df], ignore_index=True)
         else:
-            self.all_trades = new_trades_df
+            all_trades = new_trades_df
         
         # Remove duplicates and keep recent data
-        self.all_trades = self.all_trades.drop_duplicates(subset=['timestamp', 'price', 'size'])
-        cutoff_time = datetime.now() - timedelta(hours=4)
-        self.all_trades = self.all_trades[self.all_trades['timestamp'] > cutoff_time]
+        merged_count = len(all_trades)
+        all_trades = all_trades.drop_duplicates(subset=['timestamp', 'price', 'size'])
+        duplicates_count = merged_count - len(all_trades)
+        metrics.DUPLICATES_DROPPED.inc(duplicates_count)
+        metrics.TRADES_INGESTED.inc(len(new_trades) - duplicates_count)
+        cutoff_time = CLOCK.now() - self.retention
+        return all_trades[all_trades['timestamp'] > cutoff_time]
+    
+    def merge_history(self, history):
+        """Merge a frame of older trades (e.g. from a backfill) into the store.
+
+        Trade listeners are not called: they follow the live tape only. The
+        live trades of the version it replaces stay counted in `ingested_total`.
+        """
+        with self._write_lock:
+            current = self._snapshot
+            trades = pd.concat([history, current.trades], ignore_index=True) if len(current.trades) else history
+            # Stable, so the same trade from both sides keeps one place
+            trades = trades.iloc[np.argsort(trades['timestamp'].values, kind='stable')]
+            merged_count = len(trades)
+            trades = trades.drop_duplicates(subset=['timestamp', 'price', 'size'])
+            metrics.DUPLICATES_DROPPED.inc(merged_count - len(trades))
+            cutoff_time = CLOCK.now() - self.retention
+            trades = trades[trades['timestamp'] > cutoff_time].reset_index(drop=True)
+            self.publish(trades, current.orderbooks, current.last_update, 0, merged=True)
+            return len(trades) - len(current.trades)
+    
+    def set_retention(self, retention):
+        """Keep `retention` of trades from now on, trimming the store right away if it shrank"""
+        with self._write_lock:
+            shrinking = retention < self.retention
+            self.retention = retention
+            current = self._snapshot
+            if shrinking and len(current.trades):
+                cutoff_time = CLOCK.now() - retention
+                start = current.trades['timestamp'].searchsorted(cutoff_time, side='right')
+                if start:
+                    self.publish(current.trades.iloc[start:], current.orderbooks, current.last_update, 0)
     
     def calculate_metrics(self, trades, time_window_minutes):
         """Calculate market metrics for the given time window"""
@@ -74,7 +435,7 @@ class OrderFlowData:
             return {}
         
         df = trades.copy()
-        cutoff_time = datetime.now() - timedelta(minutes=time_window_minutes)
+        cutoff_time = CLOCK.now() - timedelta(minutes=time_window_minutes)
         window_trades = df[df['timestamp'] > cutoff_time]
         
         if len(window_trades) == 0:
@@ -0,0 +1,208 @@
+"""
+Streaming export of trades and order book history.
+
+Rows are read chunk by chunk from the tick archive (or, with archiving
+off, from the in-memory store) and encoded as they go, so an export of
+any size holds one chunk in memory at a time. CSV needs nothing extra;
+Arrow IPC and Parquet are only offered when pyarrow is installed.
+
+    python run.py export trades --start 2024-01-01T00:00 --end 2024-01-02T00:00 --format parquet -o trades.parquet
+"""
+
+import argparse
+import contextlib
+import sys
+from datetime import datetime, timedelta, timezone
+
+import numpy as np
+import pandas as pd
+from flask import Response, jsonify, request, stream_with_context
+
+import config
+from archive import TickArchive
+from clock import CLOCK
+from shared_store import array_to_trades, orderbooks_to_array
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = pq = None
+
+KINDS = ('trades', 'book')
+FORMATS = {
+    'csv': ('text/csv', 'csv'),
+}
+if pa is not None:
+    FORMATS.update({
+        'arrow': ('application/vnd.apache.arrow.stream', 'arrows'),
+        'parquet': ('application/vnd.apache.parquet', 'parquet'),
+    })
+
+
+def book_frame(records):
+    """One row per side and level for a chunk of BOOK_DTYPE records"""
+    frames = []
+    for side in ('bids', 'asks'):
+        levels = records[side]  # (snapshots, levels, 2)
+        count, depth = levels.shape[:2]
+        frame = pd.DataFrame({
+            'timestamp': np.repeat(records['timestamp'], depth).astype('datetime64[ms]').astype('datetime64[ns]'),
+            'side': side[:-1],
+            'level': np.tile(np.arange(depth), count),
+            'price': levels[:, :, 0].ravel(),
+            'amount': levels[:, :, 1].ravel(),
+        })
+        frames.append(frame[~np.isnan(frame['price'].values)])
+    return pd.concat(frames).sort_values(['timestamp', 'side', 'level'], kind='stable', ignore_index=True)
+
+
+def export_chunks(kind, start, end, archive=None, data_manager=None, chunk_rows=50000):
+    """Yield DataFrame chunks of `kind` with start <= timestamp < end"""
+    if archive is not None:
+        for records in archive.records(kind, start, end, chunk_rows):
+            yield array_to_trades(records) if kind == 'trades' else book_frame(records)
+        return
+
+    # No archive: whatever the store still holds
+    snapshot = data_manager.snapshot()
+    if kind == 'book':
+        orderbooks = [ob for ob in snapshot.orderbooks if start <= ob['timestamp'] < end]
+        if orderbooks:
+            yield book_frame(orderbooks_to_array(orderbooks))
+        return
+    trades = snapshot.trades
+    first = trades['timestamp'].searchsorted(start)
+    last = trades['timestamp'].searchsorted(end)
+    for offset in range(first, last, chunk_rows):
+        yield trades.iloc[offset:min(offset + chunk_rows, last)]
+
+
+def encode(chunks, fmt):
+    """Encode DataFrame chunks into a stream of bytes"""
+    if fmt == 'csv':
+        return _encode_csv(chunks)
+    if fmt not in FORMATS:
+        raise ValueError(f"{fmt} export needs pyarrow (pip install pyarrow)")
+    return _encode_arrow(chunks, fmt)
+
+
+def _encode_csv(chunks):
+    header = True
+    for chunk in chunks:
+        yield chunk.to_csv(index=False, header=header, date_format='%Y-%m-%dT%H:%M:%S.%f').encode()
+        header = False
+
+
+class _Drain:
+    """Write-only file that hands written bytes back to the generator"""
+
+    def __init__(self):
+        self.parts = []
+        self.position = 0
+        self.closed = False
+
+    def write(self, data):
+        data = bytes(data)
+        self.parts.append(data)
+        self.position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self.position
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+    def take(self):
+        data, self.parts = b''.join(self.parts), []
+        return data
+
+
+def _encode_arrow(chunks, fmt):
+    sink = _Drain()
+    writer = None
+    for chunk in chunks:
+        table = pa.Table.from_pandas(chunk, preserve_index=False)
+        if writer is None:
+            if fmt == 'parquet':
+                writer = pq.ParquetWriter(sink, table.schema)
+            else:
+                writer = pa.ipc.new_stream(sink, table.schema)
+        writer.write_table(table)
+        yield sink.take()
+    if writer is not None:
+        writer.close()
+        yield sink.take()
+
+
+def parse_time(text):
+    """Naive UTC datetime from an ISO string; one with an offset (or Z) is converted to UTC"""
+    parsed = datetime.fromisoformat(text)
+    if parsed.tzinfo is not None:
+        parsed = parsed.astimezone(timezone.utc).replace(tzinfo=None)
+    return parsed
+
+
+def parse_range(start, end, default=timedelta(hours=1)):
+    """Naive UTC (start, end) from ISO strings; end defaults to now"""
+    end = parse_time(end) if end else CLOCK.now()
+    start = parse_time(start) if start else end - default
+    if start >= end:
+        raise ValueError("start must be before end")
+    return start, end
+
+
+def default_archive():
+    return TickArchive(config.ARCHIVE_DIR, config.ARCHIVE_RETENTION_DAYS) if config.ARCHIVE_ENABLED else None
+
+
+def register_export_route(server, data_manager, archive=None):
+    """Stream exports from /api/export?kind=trades|book&format=csv|arrow|parquet&start=&end="""
+
+    @server.route('/api/export')
+    def api_export():
+        kind = request.args.get('kind', 'trades')
+        fmt = request.args.get('format', 'csv')
+        try:
+            if kind not in KINDS:
+                raise ValueError(f"kind must be one of {', '.join(KINDS)}")
+            if fmt not in FORMATS:
+                raise ValueError(f"format must be one of {', '.join(FORMATS)}")
+            start, end = parse_range(request.args.get('start'), request.args.get('end'))
+            body = encode(export_chunks(kind, start, end, archive, data_manager, config.EXPORT_CHUNK_ROWS), fmt)
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+
+        mimetype, extension = FORMATS[fmt]
+        filename = f"{kind}-{start:%Y%m%dT%H%M}-{end:%Y%m%dT%H%M}.{extension}"
+        return Response(
+            stream_with_context(body),
+            mimetype=mimetype,
+            headers={'Content-Disposition': f'attachment; filename="{filename}"'}
+        )
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='run.py export', description="Export archived ticks")
+    parser.add_argument('kind', choices=KINDS)
+    parser.add_argument('--start', help="ISO time, UTC unless it has an offset (default: one hour before --end)")
+    parser.add_argument('--end', help="ISO time, UTC unless it has an offset (default: now)")
+    parser.add_argument('--format', choices=FORMATS, default='csv')
+    parser.add_argument('-o', '--output', help="file to write (default: stdout)")
+    args = parser.parse_args(argv)
+
+    try:
+        start, end = parse_range(args.start, args.end)
+        archive = TickArchive(config.ARCHIVE_DIR)
+        body = encode(export_chunks(args.kind, start, end, archive, chunk_rows=config.EXPORT_CHUNK_ROWS), args.format)
+        # Close the file we opened, never the process's stdout
+        output = open(args.output, 'wb') if args.output else contextlib.nullcontext(sys.stdout.buffer)
+        with output as output:
+            for data in body:
+                output.write(data)
+    except ValueError as e:
+        parser.error(str(e))
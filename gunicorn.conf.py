@@ -0,0 +1,40 @@
+"""
+Gunicorn settings for multi-worker serving.
+
+The master spawns a single ingestion process before forking the web
+workers; the workers only read the buffers it publishes.
+
+    gunicorn -c gunicorn.conf.py app:server
+"""
+
+import multiprocessing
+import os
+
+os.environ.setdefault("ORDER_FLOW_DATA_PLANE", "shared")
+
+bind = f"0.0.0.0:{os.environ.get('PORT', 8050)}"
+workers = int(os.environ.get("WEB_CONCURRENCY", multiprocessing.cpu_count()))
+# Each open /stream (server-sent events) connection holds a thread for as
+# long as it is open, so streams may only take the threads callbacks don't need
+threads = int(os.environ.get("WEB_THREADS", 32))
+callback_threads = int(os.environ.get("WEB_CALLBACK_THREADS", 8))
+os.environ["ORDER_FLOW_PUSH_MAX_CLIENTS"] = str(min(
+    int(os.environ.get("ORDER_FLOW_PUSH_MAX_CLIENTS", threads)), max(0, threads - callback_threads)
+))
+timeout = 60
+
+_ingest_process = None
+
+
+def on_starting(server):
+    global _ingest_process
+    import ingest
+
+    _ingest_process = multiprocessing.Process(target=ingest.main, name="order-flow-ingest", daemon=True)
+    _ingest_process.start()
+
+
+def on_exit(server):
+    if _ingest_process is not None and _ingest_process.is_alive():
+        _ingest_process.terminate()
+        _ingest_process.join(timeout=5)
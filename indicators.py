@@ -0,0 +1,131 @@
+"""
+Incremental VWAP engine.
+
+Trades are folded into per-second buckets holding running totals of size,
+price×size and price²×size. Any VWAP is then a difference of two running
+totals: the VWAP from an anchor to time t, and its volume-weighted
+standard deviation for the bands, cost O(1) per plotted point, so moving
+the anchor or the window never rescans trades.
+"""
+
+import threading
+from datetime import datetime, timedelta
+
+import numpy as np
+import pandas as pd
+
+
+class VWAPEngine:
+    def __init__(self, max_age=timedelta(hours=25), capacity=4096):
+        self.max_age_s = int(max_age.total_seconds())
+        self.lock = threading.Lock()
+        self.reference = None  # prices are stored relative to this to keep the moments well conditioned
+        self.count = 0
+        self.seconds = np.empty(capacity, dtype='i8')
+        # Running totals up to and including each bucket: size, dp*size, dp²*size
+        self.totals = np.empty((capacity, 3))
+
+    def update(self, new_trades):
+        """Trade listener: add a batch of trades to the running totals"""
+        if len(new_trades) == 0:
+            return
+
+        seconds = new_trades['timestamp'].values.astype('datetime64[s]').astype('i8')
+        price = new_trades['price'].values.astype(float)
+        size = new_trades['size'].values.astype(float)
+
+        with self.lock:
+            if self.reference is None:
+                self.reference = float(price[0])
+            if self.count:
+                # Stragglers are booked into the latest bucket
+                seconds = np.maximum(seconds, self.seconds[self.count - 1])
+
+            diff = price - self.reference
+            bounds = np.flatnonzero(np.r_[True, seconds[1:] != seconds[:-1]])
+            sums = np.column_stack([
+                np.add.reduceat(size, bounds),
+                np.add.reduceat(diff * size, bounds),
+                np.add.reduceat(diff * diff * size, bounds),
+            ])
+            totals = np.cumsum(sums, axis=0)
+            bucket_seconds = seconds[bounds]
+
+            if self.count:
+                totals += self.totals[self.count - 1]
+                if bucket_seconds[0] == self.seconds[self.count - 1]:
+                    # First bucket continues the latest one
+                    self.totals[self.count - 1] = totals[0]
+                    totals, bucket_seconds = totals[1:], bucket_seconds[1:]
+
+            self._append(bucket_seconds, totals)
+
+    def _append(self, seconds, totals):
+        needed = self.count + len(seconds)
+        if needed > len(self.seconds):
+            self._trim(seconds[-1] if len(seconds) else self.seconds[self.count - 1])
+            needed = self.count + len(seconds)
+            if needed > len(self.seconds):
+                capacity = max(needed, 2 * len(self.seconds))
+                self.seconds = np.resize(self.seconds, capacity)
+                self.totals = np.resize(self.totals, (capacity, 3))
+        self.seconds[self.count:needed] = seconds
+        self.totals[self.count:needed] = totals
+        self.count = needed
+
+    def _trim(self, latest):
+        start = np.searchsorted(self.seconds[:self.count], latest - self.max_age_s)
+        if start:
+            kept = self.count - start
+            self.seconds[:kept] = self.seconds[start:self.count]
+            self.totals[:kept] = self.totals[start:self.count]
+            self.count = kept
+
+    def _totals_at(self, seconds, before=False):
+        """Running totals at the end of the given seconds (or just before them)"""
+        index = np.searchsorted(self.seconds[:self.count], seconds, side='left' if before else 'right') - 1
+        totals = np.where((index >= 0)[:, None], self.totals[np.maximum(index, 0)], 0.0)
+        return totals
+
+    def vwap(self, anchor, times):
+        """VWAP and standard deviation from `anchor` up to each of `times`.
+
+        Returns (vwap, std) arrays, NaN where nothing traded since the anchor.
+        """
+        times = pd.DatetimeIndex(times)
+        with self.lock:
+            if self.count == 0:
+                empty = np.full(len(times), np.nan)
+                return empty, empty.copy()
+            reference = self.reference
+            end = self._totals_at(times.values.astype('datetime64[s]').astype('i8'))
+            start = self._totals_at(np.array([np.datetime64(anchor, 's').astype('i8')]), before=True)
+
+        volume, weighted, squared = (end - start).T
+        with np.errstate(invalid='ignore', divide='ignore'):
+            volume = np.where(volume > 0, volume, np.nan)
+            mean = weighted / volume
+            variance = np.maximum(squared / volume - mean * mean, 0.0)
+        return reference + mean, np.sqrt(variance)
+
+    def vwap_lines(self, times, anchors=(), bands=(1, 2)):
+        """Session VWAP with deviation bands plus one line per anchor"""
+        times = pd.DatetimeIndex(times)
+        if len(times) == 0:
+            return []
+        session_start = datetime.combine(times[-1].date(), datetime.min.time())
+
+        vwap, std = self.vwap(session_start, times)
+        lines = [{'name': 'Session VWAP', 'x': times, 'y': vwap, 'kind': 'vwap'}]
+        for k in bands:
+            lines.append({'name': f'+{k}σ', 'x': times, 'y': vwap + k * std, 'kind': 'band'})
+            lines.append({'name': f'-{k}σ', 'x': times, 'y': vwap - k * std, 'kind': 'band'})
+
+        for anchor in anchors:
+            anchor = pd.Timestamp(anchor)
+            visible = times >= anchor
+            if not visible.any():
+                continue
+            anchored, _ = self.vwap(anchor, times[visible])
+            lines.append({'name': f'AVWAP {anchor:%H:%M}', 'x': times[visible], 'y': anchored, 'kind': 'anchored'})
+        return lines
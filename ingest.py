@@ -0,0 +1,88 @@
+"""
+Ingestion loop.
+
+Runs either as its own process for the shared data plane (publishing the
+trade and order book buffers for the web workers, see shared_store.py) or
+as a background thread inside the web process feeding the push channel.
+"""
+
+import threading
+
+import config
+from data_fetcher import OrderFlowData
+from backfill import default_backfill
+from shared_store import SharedStorePublisher
+from alerts import create_alert_engine, delivery_sinks
+from export import default_archive
+from profile_store import default_profile_store
+from memory import default_memory_manager
+from profiling import PROFILER
+
+MIN_LOOP_DELAY = 0.05  # seconds
+
+
+def run_ingest_loop(data_manager, publishers, stop_event=None):
+    """Fetch and hand the result to every publisher until stop_event is set"""
+    stop_event = stop_event or threading.Event()
+    data_manager.warm_up()
+
+    published_version = None
+    while not stop_event.is_set():
+        published_version = ingest_cycle(data_manager, publishers, published_version)
+        # The data manager's scheduler knows when the next endpoint is due
+        stop_event.wait(max(MIN_LOOP_DELAY, data_manager.next_fetch_delay()))
+
+
+@PROFILER.profiled('ingest')
+def ingest_cycle(data_manager, publishers, published_version=None):
+    """Fetch whatever is due and hand any new snapshot to every publisher"""
+    data_manager.fetch_new_data()
+    snapshot = data_manager.snapshot()
+    if snapshot.version == published_version:
+        return published_version
+
+    for publisher in publishers:
+        try:
+            publisher.publish(snapshot)
+        except Exception as e:
+            print(f"❌ Publish error in {type(publisher).__name__}: {e}")
+    return snapshot.version
+
+
+def start_background_ingest(data_manager, publishers):
+    """Run the ingest loop on a daemon thread, returning its stop event"""
+    stop_event = threading.Event()
+    thread = threading.Thread(
+        target=run_ingest_loop,
+        args=(data_manager, publishers, stop_event),
+        name='order-flow-ingest',
+        daemon=True
+    )
+    thread.start()
+    return stop_event
+
+
+def main():
+    print(f"📡 Ingestion process publishing to {config.SHARED_DIR}")
+    data_manager = OrderFlowData()
+    # Alerts are logged and delivered once, here, rather than by every web worker
+    alert_engine = create_alert_engine(delivery_sinks())
+    data_manager.add_trade_listener(alert_engine.on_trades)
+    data_manager.add_book_listener(alert_engine.on_book)
+    archive = default_archive()
+    if archive is not None:
+        data_manager.add_trade_listener(archive.append_trades)
+        data_manager.add_book_listener(archive.append_book)
+    profile_store = default_profile_store()
+    if profile_store is not None:
+        data_manager.add_trade_listener(profile_store.update)
+    memory_manager = default_memory_manager(data_manager, profile_store=profile_store)
+    PROFILER.store_probe = memory_manager.measure
+    backfill = default_backfill(data_manager)
+    if backfill is not None:
+        backfill.start()
+    run_ingest_loop(data_manager, [SharedStorePublisher(config.SHARED_DIR), memory_manager])
+
+
+if __name__ == '__main__':
+    main()
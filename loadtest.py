@@ -0,0 +1,428 @@
+#!/usr/bin/env python3
+"""
+Load test: runs the app against a local fake exchange and drives the
+dashboard refresh callback with simulated clients.
+
+    python loadtest.py --clients 1,10,50 --trade-rates 5,50 --duration 30
+    python loadtest.py --gunicorn --clients 10,100 --latency 0.2
+
+The app runs in a child process (the dev server like `python run.py`, or
+gunicorn with gunicorn.conf.py) with the ccxt exchange swapped for
+FakeExchange, which prints trades at a set rate and answers after an
+injected latency. For each trade rate the server is started fresh, then
+for each client count that many clients POST to /_dash-update-component
+at mixed time windows, update frequencies and size filters. Every step
+reports callback latency percentiles, error rate, and the CPU and memory
+of the server's process tree (read from /proc, so Linux only).
+"""
+
+import argparse
+import http.client
+import json
+import os
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+import numpy as np
+
+TIME_WINDOWS = (15, 30, 60, 120)
+SIZE_FILTERS = (('btc', 1.0), ('btc', 0.5), ('percentile', 1.0), ('zscore', 2.0))
+COMPOSITE_SESSIONS = (0, 5)
+BAR_TYPES = ('time', 'time', 'volume', 'tick', 'range', 'delta')  # mostly one-minute candles
+
+
+class FakeExchange:
+    """Stands in for ccxt.binance: synthetic trades and book, configurable latency"""
+
+    id = 'binance'
+
+    def __init__(self, config=None, trade_rate=20.0, book_depth=50, latency=0.05, page_size=1000):
+        self.trade_rate = trade_rate  # trades per second
+        self.book_depth = book_depth
+        self.latency = latency  # mean seconds per call
+        self.urls = {'api': {}}
+        self.lock = threading.Lock()
+        self.rng = np.random.default_rng()
+        self.price = 60000.0
+        self.last_ms = int(time.time() * 1000) - 60_000
+        self.history_end_ms = self.last_ms  # before this, trades come from _history
+        # Recent prints, so consecutive pages overlap like the real /trades endpoint
+        self.tape = np.empty(0, dtype=[('timestamp', 'i8'), ('price', 'f8'), ('amount', 'f8'), ('buy', '?')])
+        self.page_size = page_size
+
+    def _wait(self):
+        if self.latency > 0:
+            time.sleep(random.uniform(0.5, 1.5) * self.latency)
+
+    def _print_trades(self):
+        now_ms = int(time.time() * 1000)
+        count = self.rng.poisson(self.trade_rate * (now_ms - self.last_ms) / 1000)
+        if count:
+            trades = np.empty(count, dtype=self.tape.dtype)
+            trades['timestamp'] = np.sort(self.rng.integers(self.last_ms + 1, now_ms + 1, count))
+            trades['price'] = self.price + np.cumsum(self.rng.normal(0, 2, count))
+            trades['amount'] = self.rng.lognormal(-2.5, 1.2, count)
+            trades['buy'] = self.rng.random(count) < 0.5
+            self.price = float(trades['price'][-1])
+            self.tape = np.concatenate([self.tape, trades])[-self.page_size:]
+        self.last_ms = now_ms
+
+    def _history(self, since, limit):
+        """Up to `limit` trades from `since` on, out of a synthetic past that is
+        the same on every call, so overlapping backfill pages agree"""
+        pages = []
+        count = 0
+        second = since // 1000
+        while count < limit and second * 1000 < self.history_end_ms:
+            rng = np.random.default_rng(second)
+            trades = np.empty(rng.poisson(self.trade_rate), dtype=self.tape.dtype)
+            trades['timestamp'] = second * 1000 + np.sort(rng.integers(0, 1000, len(trades)))
+            trades['price'] = 60000 + 200 * np.sin(second / 600) + rng.normal(0, 2, len(trades))
+            trades['amount'] = rng.lognormal(-2.5, 1.2, len(trades))
+            trades['buy'] = rng.random(len(trades)) < 0.5
+            trades = trades[(trades['timestamp'] >= since) & (trades['timestamp'] <= self.history_end_ms)]
+            pages.append(trades)
+            count += len(trades)
+            second += 1
+        return np.concatenate(pages)[:limit] if pages else self.tape[:0]
+
+    def load_markets(self, *args, **kwargs):
+        self._wait()
+        return {}
+
+    def fetch_time(self, params=None):
+        self._wait()
+        return int(time.time() * 1000)
+
+    def fetch_trades(self, symbol, since=None, limit=None, params=None):
+        self._wait()
+        limit = min(limit or self.page_size, self.page_size)
+        with self.lock:
+            self._print_trades()
+            if since is None:
+                page = self.tape[-limit:]
+            elif since <= self.history_end_ms:
+                page = self._history(since, limit)
+            else:
+                page = self.tape[self.tape['timestamp'] >= since][:limit]
+        return [
+            {'id': str(timestamp), 'timestamp': int(timestamp), 'symbol': symbol, 'price': float(price),
+             'amount': float(amount), 'side': 'buy' if buy else 'sell'}
+            for timestamp, price, amount, buy in page
+        ]
+
+    def fetch_order_book(self, symbol, limit=None, params=None):
+        self._wait()
+        with self.lock:
+            mid = self.price
+        depth = min(limit or self.book_depth, self.book_depth)
+        offsets = np.arange(1, depth + 1) * 0.5
+        sizes = self.rng.lognormal(0, 1, (2, depth))
+        return {
+            'symbol': symbol,
+            'bids': [[mid - offset, size] for offset, size in zip(offsets, sizes[0])],
+            'asks': [[mid + offset, size] for offset, size in zip(offsets, sizes[1])],
+        }
+
+
+def serve(args):
+    """Child process: the app with its exchange replaced by FakeExchange"""
+    import data_fetcher
+
+    def fake_exchange(config=None):
+        return FakeExchange(config, args.trade_rate, args.book_depth, args.latency)
+    data_fetcher.load_exchange_class = lambda exchange_id: fake_exchange
+
+    if args.gunicorn:
+        # Workers and the ingestion process are forked from here, so they keep the patch
+        from gunicorn.app.wsgiapp import run
+        sys.argv = ['gunicorn', '-c', 'gunicorn.conf.py', '--bind', f'127.0.0.1:{args.port}', 'app:server']
+        run()
+    else:
+        from app import app
+        app.run(host='127.0.0.1', port=args.port, debug=False)
+
+
+class Server:
+    """The app under test in its own process"""
+
+    def __init__(self, args, trade_rate):
+        self.port = _free_port()
+        self.data_dir = tempfile.TemporaryDirectory(prefix='orderflow-loadtest-')
+        env = dict(
+            os.environ,
+            PYTHONUNBUFFERED='1',
+            ORDER_FLOW_ARCHIVE='0',
+            ORDER_FLOW_PROFILES='0',
+            ORDER_FLOW_BACKFILL_HOURS=str(args.backfill_hours),
+            ORDER_FLOW_SHARED_DIR=self.data_dir.name,
+        )
+        command = [
+            sys.executable, os.path.abspath(__file__), 'serve', '--port', str(self.port),
+            '--trade-rate', str(trade_rate), '--book-depth', str(args.book_depth), '--latency', str(args.latency),
+        ]
+        if args.gunicorn:
+            command.append('--gunicorn')
+        self.log = open(os.path.join(self.data_dir.name, 'server.log'), 'w')
+        self.process = subprocess.Popen(
+            command, env=env, stdout=self.log, stderr=subprocess.STDOUT,
+            cwd=os.path.dirname(os.path.abspath(__file__)), start_new_session=True
+        )
+
+    def wait_ready(self, timeout=60):
+        """Return the refresh callback's dependency entry once the server answers"""
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            if self.process.poll() is not None:
+                break
+            try:
+                status, body = _request(self.port, 'GET', '/_dash-dependencies')
+                if status == 200:
+                    for dependency in json.loads(body):
+                        if 'candlestick-chart.figure' in dependency['output']:
+                            return dependency
+            except OSError:
+                pass
+            time.sleep(0.5)
+        self.stop()
+        with open(self.log.name) as f:
+            print(f.read()[-2000:], file=sys.stderr)
+        raise SystemExit("❌ Server did not come up")
+
+    def stop(self):
+        if self.process.poll() is None:
+            self.process.terminate()
+            try:
+                self.process.wait(10)
+            except subprocess.TimeoutExpired:
+                self.process.kill()
+        self.log.close()
+        self.data_dir.cleanup()
+
+
+def _free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def _request(port, method, path, body=None, timeout=10):
+    connection = http.client.HTTPConnection('127.0.0.1', port, timeout=timeout)
+    try:
+        headers = {'Content-Type': 'application/json'} if body is not None else {}
+        connection.request(method, path, body, headers)
+        response = connection.getresponse()
+        return response.status, response.read()
+    finally:
+        connection.close()
+
+
+def _process_tree(root_pid):
+    """The root process and all its descendants"""
+    children = {}
+    for name in os.listdir('/proc'):
+        if not name.isdigit():
+            continue
+        try:
+            with open(f'/proc/{name}/stat') as f:
+                # The command name may contain spaces, fields resume after its closing paren
+                ppid = int(f.read().rsplit(')', 1)[1].split()[1])
+        except (OSError, IndexError, ValueError):
+            continue
+        children.setdefault(ppid, []).append(int(name))
+    pids, stack = [], [root_pid]
+    while stack:
+        pid = stack.pop()
+        pids.append(pid)
+        stack.extend(children.get(pid, []))
+    return pids
+
+
+def _resource_usage(root_pid):
+    """(CPU seconds, RSS bytes) of the process tree, or None off Linux"""
+    if not os.path.isdir('/proc'):
+        return None
+    cpu_ticks = rss_pages = 0
+    for pid in _process_tree(root_pid):
+        try:
+            with open(f'/proc/{pid}/stat') as f:
+                fields = f.read().rsplit(')', 1)[1].split()
+            with open(f'/proc/{pid}/statm') as f:
+                rss_pages += int(f.read().split()[1])
+        except (OSError, IndexError, ValueError):
+            continue
+        cpu_ticks += int(fields[11]) + int(fields[12])  # utime + stime
+    return cpu_ticks / os.sysconf('SC_CLK_TCK'), rss_pages * os.sysconf('SC_PAGE_SIZE')
+
+
+class Client(threading.Thread):
+    """One dashboard: refreshes on its own timer with its own settings"""
+
+    def __init__(self, port, dependency, frequency, stop_event, results):
+        super().__init__(daemon=True)
+        self.port = port
+        self.frequency = frequency  # seconds between refreshes
+        self.stop_event = stop_event
+        self.results = results
+        self.time_window = random.choice(TIME_WINDOWS)
+        self.size_mode, self.size_value = random.choice(SIZE_FILTERS)
+        self.composite_sessions = random.choice(COMPOSITE_SESSIONS)
+        self.bar_type = random.choice(BAR_TYPES)
+        self.dependency = dependency
+        self.n_intervals = 0
+
+    def payload(self):
+        # Same body the browser sends on an interval tick
+        values = {
+            'interval-component.n_intervals': self.n_intervals,
+            'update-button.n_clicks': 0,
+            'push-refresh.n_clicks': 0,
+            'vwap-anchors.data': [],
+            'bar-type.value': self.bar_type,
+            'time-window.value': self.time_window,
+            'update-frequency.value': int(self.frequency * 1000),
+            'trade-size-filter.value': self.size_value,
+            'trade-size-mode.value': self.size_mode,
+            'composite-sessions.value': self.composite_sessions,
+        }
+
+        def props(dependencies):
+            return [dict(d, value=values.get(f"{d['id']}.{d['property']}")) for d in dependencies]
+        outputs = [dict(zip(('id', 'property'), output.rsplit('.', 1)))
+                   for output in self.dependency['output'].strip('.').split('...')]
+        return json.dumps({
+            'output': self.dependency['output'],
+            'outputs': outputs,
+            'inputs': props(self.dependency['inputs']),
+            'state': props(self.dependency['state']),
+            'changedPropIds': ['interval-component.n_intervals'],
+        })
+
+    def run(self):
+        # Stagger the first refresh so clients do not all tick together
+        next_at = time.monotonic() + random.uniform(0, self.frequency)
+        connection = None
+        while not self.stop_event.wait(max(0, next_at - time.monotonic())):
+            next_at += self.frequency
+            started = time.perf_counter()
+            try:
+                if connection is None:
+                    connection = http.client.HTTPConnection('127.0.0.1', self.port, timeout=30)
+                connection.request('POST', '/_dash-update-component', self.payload(),
+                                   {'Content-Type': 'application/json'})
+                response = connection.getresponse()
+                response.read()
+                ok = response.status == 200
+            except (OSError, http.client.HTTPException):
+                ok = False
+                connection = None
+            self.results.append((time.perf_counter() - started, ok))
+            self.n_intervals += 1
+            if next_at < time.monotonic():
+                # Fell behind, skip the ticks we missed like the browser would
+                next_at = time.monotonic() + self.frequency
+
+
+def run_step(server, dependency, clients, frequencies, duration):
+    """Drive `clients` clients for `duration` seconds and summarise"""
+    stop_event = threading.Event()
+    results = []
+    threads = [Client(server.port, dependency, random.choice(frequencies), stop_event, results)
+               for _ in range(clients)]
+
+    before = _resource_usage(server.process.pid)
+    started = time.monotonic()
+    for thread in threads:
+        thread.start()
+
+    peak_rss = 0
+    while time.monotonic() - started < duration:
+        time.sleep(1)
+        usage = _resource_usage(server.process.pid)
+        if usage:
+            peak_rss = max(peak_rss, usage[1])
+    stop_event.set()
+    for thread in threads:
+        thread.join(35)
+    elapsed = time.monotonic() - started
+    after = _resource_usage(server.process.pid)
+
+    latencies = np.array([latency for latency, ok in results if ok])
+    summary = {
+        'requests': len(results),
+        'errors': sum(1 for _, ok in results if not ok),
+        'rps': len(results) / elapsed,
+        'cpu': (after[0] - before[0]) / elapsed * 100 if before and after else None,
+        'rss': peak_rss or None,
+    }
+    for q in (50, 95, 99):
+        summary[f'p{q}'] = float(np.percentile(latencies, q)) * 1000 if len(latencies) else None
+    summary['max'] = float(latencies.max()) * 1000 if len(latencies) else None
+    return summary
+
+
+def _format(value, spec, suffix=''):
+    return 'n/a' if value is None else f"{value:{spec}}{suffix}"
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Load-test the dashboard against a fake exchange")
+    parser.add_argument('--clients', default='1,10,50', help="comma-separated client counts (default: 1,10,50)")
+    parser.add_argument('--trade-rates', default='5,50', help="comma-separated trades per second (default: 5,50)")
+    parser.add_argument('--frequencies', default='1,10,30',
+                        help="refresh intervals in seconds to mix across clients, 1 is like Live mode (default: 1,10,30)")
+    parser.add_argument('--duration', type=float, default=30, help="seconds per step (default: 30)")
+    parser.add_argument('--warmup', type=float, default=5, help="seconds to collect data before the first step")
+    parser.add_argument('--book-depth', type=int, default=50)
+    parser.add_argument('--latency', type=float, default=0.05, help="mean exchange latency in seconds")
+    parser.add_argument('--backfill-hours', type=float, default=0,
+                        help="hours of trades the server backfills on start (default: 0, off)")
+    parser.add_argument('--gunicorn', action='store_true', help="serve with gunicorn.conf.py instead of the dev server")
+    parser.add_argument('--json', action='store_true', help="print one JSON object per step")
+    args = parser.parse_args(argv)
+
+    client_counts = [int(count) for count in args.clients.split(',')]
+    trade_rates = [float(rate) for rate in args.trade_rates.split(',')]
+    frequencies = [float(frequency) for frequency in args.frequencies.split(',')]
+
+    if not args.json:
+        print(f"{'trades/s':>8} {'clients':>7} {'req/s':>7} {'p50':>8} {'p95':>8} {'p99':>8} {'max':>8} "
+              f"{'errors':>7} {'cpu':>6} {'rss':>8}")
+    for trade_rate in trade_rates:
+        server = Server(args, trade_rate)
+        try:
+            dependency = server.wait_ready()
+            time.sleep(args.warmup)
+            for clients in client_counts:
+                summary = run_step(server, dependency, clients, frequencies, args.duration)
+                summary.update(trade_rate=trade_rate, clients=clients)
+                if args.json:
+                    print(json.dumps(summary), flush=True)
+                    continue
+                error_rate = summary['errors'] / summary['requests'] * 100 if summary['requests'] else 0
+                print(f"{trade_rate:>8g} {clients:>7} {summary['rps']:>7.1f} "
+                      f"{_format(summary['p50'], '.0f', 'ms'):>8} {_format(summary['p95'], '.0f', 'ms'):>8} "
+                      f"{_format(summary['p99'], '.0f', 'ms'):>8} {_format(summary['max'], '.0f', 'ms'):>8} "
+                      f"{error_rate:>6.1f}% {_format(summary['cpu'], '.0f', '%'):>6} "
+                      f"{_format(summary['rss'] and summary['rss'] / 2**20, '.0f', 'MB'):>8}", flush=True)
+        finally:
+            server.stop()
+
+
+if __name__ == '__main__':
+    if len(sys.argv) > 1 and sys.argv[1] == 'serve':
+        parser = argparse.ArgumentParser()
+        parser.add_argument('command')
+        parser.add_argument('--port', type=int, required=True)
+        parser.add_argument('--trade-rate', type=float, required=True)
+        parser.add_argument('--book-depth', type=int, required=True)
+        parser.add_argument('--latency', type=float, required=True)
+        parser.add_argument('--gunicorn', action='store_true')
+        serve(parser.parse_args())
+    else:
+        main()
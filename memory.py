@@ -0,0 +1,161 @@
+"""
+Memory budget for the in-process data stores.
+
+Every store registers a probe that estimates its size in bytes cheaply
+(object columns are sampled, not walked). After a new data version, at
+most every MEMORY_CHECK_INTERVAL seconds, the manager adds them up
+against MEMORY_BUDGET_MB. Over budget it applies relief actions in
+priority order until usage fits again:
+
+    api_cache        shrink the API response cache
+    profile_hours    drop saved volume profile hours (read back from disk)
+    book_series      keep only the largest window of book microstructure
+    trades_<N>h      keep N hours of trades, for each MEMORY_RETENTION_STEPS
+    throttle         poll the exchange as slowly as allowed, which samples
+                     the tape to one page per TRADE_POLL_MAX_INTERVAL
+
+Once usage is back below MEMORY_LOW_WATER of the budget the last action
+is undone, one per check, so retention grows back after a busy spell.
+"""
+
+import threading
+import time
+from datetime import timedelta
+
+import config
+from metrics import REGISTRY, Gauge
+
+STORE_BYTES = REGISTRY.register(Gauge(
+    'orderflow_store_bytes', 'Estimated bytes held by each data store', ['store']))
+MEMORY_RELIEF_LEVEL = REGISTRY.register(Gauge(
+    'orderflow_memory_relief_level', 'Memory relief actions currently applied'))
+
+
+def frame_bytes(frame, sample_rows=1000):
+    """Estimated deep size of a DataFrame; object columns are sized from a sample of rows"""
+    rows = len(frame)
+    size = int(frame.memory_usage(index=True, deep=False).sum())
+    objects = [column for column in frame.columns if frame[column].dtype == object]
+    if rows == 0 or not objects:
+        return size
+    sample = frame[objects].iloc[::max(1, rows // sample_rows)]
+    extra = sample.memory_usage(index=False, deep=True).sum() - sample.memory_usage(index=False, deep=False).sum()
+    return size + int(extra * rows / len(sample))
+
+
+class MemoryManager:
+    def __init__(self, budget_bytes, low_water=0.7, check_interval=5.0):
+        self.budget = budget_bytes
+        self.low_water = low_water
+        self.check_interval = check_interval
+        self.lock = threading.Lock()
+        self.stores = {}  # name -> probe returning bytes
+        self.actions = []  # (name, apply, undo) in priority order
+        self.level = 0  # how many actions are applied
+        self.usage = {}
+        self.last_check = None
+
+    def add_store(self, name, probe):
+        self.stores[name] = probe
+
+    def add_action(self, name, apply, undo=None):
+        """Relief action, applied after the ones added before it"""
+        self.actions.append((name, apply, undo))
+
+    def measure(self):
+        """{store: bytes}"""
+        usage = {}
+        for name, probe in self.stores.items():
+            try:
+                usage[name] = int(probe())
+            except Exception as e:
+                print(f"❌ Memory probe error for {name}: {e}")
+        self.usage = usage
+        for name, size in usage.items():
+            STORE_BYTES.labels(store=name).set(size)
+        return usage
+
+    def publish(self, snapshot):
+        """Ingest publisher: check after new data arrives"""
+        self.check()
+
+    def check(self, force=False):
+        """Apply or roll back relief actions for the current usage"""
+        now = time.monotonic()
+        if not force and self.last_check is not None and now - self.last_check < self.check_interval:
+            return
+        if not self.lock.acquire(blocking=False):
+            return
+        try:
+            self.last_check = now
+            total = sum(self.measure().values())
+            while total > self.budget and self.level < len(self.actions):
+                name, apply, _ = self.actions[self.level]
+                apply()
+                self.level += 1
+                previous, total = total, sum(self.measure().values())
+                print(f"🧠 Memory {previous / 2**20:.0f}MB over the {self.budget / 2**20:.0f}MB budget: "
+                      f"applied {name}, now {total / 2**20:.0f}MB")
+            if total < self.low_water * self.budget and self.level > 0:
+                self.level -= 1
+                name, _, undo = self.actions[self.level]
+                if undo is not None:
+                    undo()
+                print(f"🧠 Memory {total / 2**20:.0f}MB, rolled back {name}")
+            MEMORY_RELIEF_LEVEL.set(self.level)
+        finally:
+            self.lock.release()
+
+    def status(self):
+        """Usage by store, the budget and the relief actions in force"""
+        return {
+            'stores': dict(self.usage),
+            'total': sum(self.usage.values()),
+            'budget': self.budget,
+            'relief': [name for name, _, _ in self.actions[:self.level]],
+        }
+
+
+def default_memory_manager(data_manager, owns_trades=True, response_cache=None, window_precompute=None,
+                           microstructure=None, profile_store=None):
+    """A manager for the stores of this process.
+
+    Only the process that owns the trade store (the one that ingests) may
+    shorten its retention or throttle ingestion.
+    """
+    manager = MemoryManager(config.MEMORY_BUDGET_MB * 2**20, config.MEMORY_LOW_WATER, config.MEMORY_CHECK_INTERVAL)
+    manager.add_store('trades', lambda: frame_bytes(data_manager.snapshot().trades))
+    manager.add_store('book_history', lambda: data_manager.store_sizes()['orderbook_history'])
+    if window_precompute is not None:
+        manager.add_store('window_rollups', window_precompute.nbytes)
+    if microstructure is not None:
+        manager.add_store('book_series', microstructure.nbytes)
+    if profile_store is not None:
+        manager.add_store('profile_hours', profile_store.nbytes)
+    if response_cache is not None:
+        manager.add_store('api_cache', response_cache.nbytes)
+
+    # Relief, cheapest to lose first
+    if response_cache is not None:
+        capacity = response_cache.max_entries
+        manager.add_action('api_cache', lambda: response_cache.resize(16), lambda: response_cache.resize(capacity))
+    if profile_store is not None:
+        manager.add_action('profile_hours', profile_store.evict)
+    if microstructure is not None:
+        full_age = timedelta(milliseconds=microstructure.max_age_ms)
+        manager.add_action('book_series',
+                           lambda: microstructure.set_max_age(timedelta(minutes=max(config.TIME_WINDOWS))),
+                           lambda: microstructure.set_max_age(full_age))
+    if owns_trades:
+        previous = config.TRADE_RETENTION_HOURS
+        for hours in config.MEMORY_RETENTION_STEPS:
+            manager.add_action(
+                f'trades_{hours:g}h',
+                lambda hours=hours: data_manager.set_retention(timedelta(hours=hours)),
+                lambda previous=previous: data_manager.set_retention(timedelta(hours=previous))
+            )
+            previous = hours
+        manager.add_action('throttle',
+                           lambda: setattr(data_manager.scheduler, 'throttled', True),
+                           lambda: setattr(data_manager.scheduler, 'throttled', False))
+    return manager
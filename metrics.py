@@ -0,0 +1,228 @@
+"""
+Prometheus-style instrumentation.
+
+A small dependency-free registry of counters, gauges and histograms,
+rendered in the text exposition format on the server's /metrics route.
+"""
+
+import bisect
+import functools
+import threading
+import time
+
+from flask import Response
+
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+
+def _format_labels(labelnames, values, extra=None):
+    pairs = list(zip(labelnames, values))
+    if extra:
+        pairs.append(extra)
+    if not pairs:
+        return ''
+    return '{' + ','.join(f'{name}="{_escape(value)}"' for name, value in pairs) + '}'
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_value(value):
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value))
+
+
+class _Metric:
+    kind = None
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.lock = threading.Lock()
+        self.children = {}
+
+    def labels(self, **labels):
+        key = tuple(str(labels.get(name, '')) for name in self.labelnames)
+        with self.lock:
+            child = self.children.get(key)
+            if child is None:
+                child = self.children[key] = self._new_child()
+            return child
+
+    def _default(self):
+        return self.labels()
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.documentation}', f'# TYPE {self.name} {self.kind}']
+        with self.lock:
+            children = list(self.children.items())
+        for key, child in children:
+            lines.extend(self._render_child(key, child))
+        return lines
+
+
+class _CounterChild:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.value = 0.0
+
+    def inc(self, amount=1):
+        with self.lock:
+            self.value += amount
+
+
+class Counter(_Metric):
+    kind = 'counter'
+
+    def _new_child(self):
+        return _CounterChild()
+
+    def inc(self, amount=1):
+        self._default().inc(amount)
+
+    def _render_child(self, key, child):
+        return [f'{self.name}{_format_labels(self.labelnames, key)} {_format_value(child.value)}']
+
+
+class _GaugeChild:
+    def __init__(self):
+        self.value = 0.0
+
+    def set(self, value):
+        self.value = value
+
+
+class Gauge(_Metric):
+    kind = 'gauge'
+
+    def _new_child(self):
+        return _GaugeChild()
+
+    def set(self, value):
+        self._default().set(value)
+
+    def _render_child(self, key, child):
+        return [f'{self.name}{_format_labels(self.labelnames, key)} {_format_value(child.value)}']
+
+
+class _Timer:
+    """Context manager and decorator observing elapsed seconds"""
+
+    def __init__(self, child):
+        self.child = child
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.child.observe(time.perf_counter() - self.started)
+
+    def __call__(self, fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            started = time.perf_counter()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                self.child.observe(time.perf_counter() - started)
+        return wrapper
+
+
+class _HistogramChild:
+    def __init__(self, buckets):
+        self.lock = threading.Lock()
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+
+    def observe(self, value):
+        index = bisect.bisect_left(self.buckets, value)
+        with self.lock:
+            self.counts[index] += 1
+            self.sum += value
+
+    def time(self):
+        return _Timer(self)
+
+
+class Histogram(_Metric):
+    kind = 'histogram'
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def _new_child(self):
+        return _HistogramChild(self.buckets)
+
+    def observe(self, value):
+        self._default().observe(value)
+
+    def time(self, **labels):
+        return _Timer(self.labels(**labels))
+
+    def _render_child(self, key, child):
+        with child.lock:
+            counts = list(child.counts)
+            total = child.sum
+        lines = []
+        cumulative = 0
+        for bound, count in zip(self.buckets + (float('inf'),), counts):
+            cumulative += count
+            labels = _format_labels(self.labelnames, key, ('le', _format_value(bound)))
+            lines.append(f'{self.name}_bucket{labels} {cumulative}')
+        labels = _format_labels(self.labelnames, key)
+        lines.append(f'{self.name}_sum{labels} {_format_value(total)}')
+        lines.append(f'{self.name}_count{labels} {cumulative}')
+        return lines
+
+
+class Registry:
+    def __init__(self):
+        self.metrics = []
+
+    def register(self, metric):
+        if not metric.labelnames:
+            metric.labels()  # unlabelled metrics are exported from the start
+        self.metrics.append(metric)
+        return metric
+
+    def render(self):
+        lines = []
+        for metric in self.metrics:
+            lines.extend(metric.render())
+        return '\n'.join(lines) + '\n'
+
+
+REGISTRY = Registry()
+
+FETCH_SECONDS = REGISTRY.register(Histogram(
+    'orderflow_exchange_fetch_seconds', 'Exchange request latency', ['endpoint']))
+INGEST_SECONDS = REGISTRY.register(Histogram(
+    'orderflow_ingest_seconds', 'Time spent merging fetched trades into the store'))
+CHART_BUILD_SECONDS = REGISTRY.register(Histogram(
+    'orderflow_chart_build_seconds', 'Time spent in each chart builder', ['chart']))
+FIGURE_CONVERT_SECONDS = REGISTRY.register(Histogram(
+    'orderflow_figure_convert_seconds',
+    'Time spent converting figures to plain dicts (Dash JSON-encodes them afterwards)', ['chart']))
+CALLBACK_SECONDS = REGISTRY.register(Histogram(
+    'orderflow_callback_seconds', 'Total dashboard refresh callback time'))
+
+TRADES_INGESTED = REGISTRY.register(Counter(
+    'orderflow_trades_ingested_total', 'Trades added to the store'))
+DUPLICATES_DROPPED = REGISTRY.register(Counter(
+    'orderflow_duplicate_trades_dropped_total', 'Fetched trades discarded as already seen'))
+FETCH_ERRORS = REGISTRY.register(Counter(
+    'orderflow_fetch_errors_total', 'Failed exchange requests', ['endpoint', 'error']))
+
+
+def register_metrics_route(server, registry=REGISTRY):
+    """Expose the registry in text exposition format on /metrics"""
+
+    @server.route('/metrics')
+    def metrics():
+        return Response(registry.render(), mimetype='text/plain; version=0.0.4; charset=utf-8')
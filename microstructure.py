@@ -0,0 +1,139 @@
+"""
+Order book microstructure series.
+
+Every order book snapshot is reduced, as it arrives, to one row of
+measures: top-N bid/ask size imbalance, microprice, mid, spread, and the
+size resting within a band of basis points around the mid on each side.
+The measures are computed over a snapshots × levels array at once, so a
+burst of snapshots costs one vectorized pass, and each snapshot costs
+O(levels) whatever the history length. Rows are kept as long as trades
+and read back averaged down to the chart's resolution, so the book can
+be polled much faster than the trade tape without the chart growing.
+"""
+
+import threading
+from datetime import timedelta
+
+import numpy as np
+import pandas as pd
+
+from shared_store import orderbooks_to_array
+
+MICRO_COLUMNS = ('imbalance', 'microprice', 'mid', 'spread', 'bid_depth', 'ask_depth')
+
+
+def book_measures(records, levels=10, depth_bps=10):
+    """(snapshots, len(MICRO_COLUMNS)) measures for a BOOK_DTYPE record array.
+
+    Levels are expected best first, as the exchange sends them; missing
+    levels are NaN padded and count as empty.
+    """
+    bids = records['bids']
+    asks = records['asks']
+    bid_sizes = np.nan_to_num(bids[:, :, 1])
+    ask_sizes = np.nan_to_num(asks[:, :, 1])
+    best_bid = bids[:, 0, 0]
+    best_ask = asks[:, 0, 0]
+
+    top_bid = bid_sizes[:, :levels].sum(axis=1)
+    top_ask = ask_sizes[:, :levels].sum(axis=1)
+    mid = (best_bid + best_ask) / 2
+    band = mid * depth_bps / 10_000
+    with np.errstate(invalid='ignore', divide='ignore'):
+        imbalance = (top_bid - top_ask) / (top_bid + top_ask)
+        # Weighted toward the side with less size at the touch, where the next trade is likelier to go
+        microprice = (best_bid * ask_sizes[:, 0] + best_ask * bid_sizes[:, 0]) / (bid_sizes[:, 0] + ask_sizes[:, 0])
+        # NaN padded levels compare False and drop out
+        bid_depth = np.where(bids[:, :, 0] >= (mid - band)[:, None], bid_sizes, 0.0).sum(axis=1)
+        ask_depth = np.where(asks[:, :, 0] <= (mid + band)[:, None], ask_sizes, 0.0).sum(axis=1)
+
+    return np.column_stack([imbalance, microprice, mid, best_ask - best_bid, bid_depth, ask_depth])
+
+
+class MicrostructureEngine:
+    def __init__(self, levels=10, depth_bps=10, max_age=timedelta(hours=4), capacity=4096):
+        self.levels = levels
+        self.depth_bps = depth_bps
+        self.max_age_ms = int(max_age.total_seconds() * 1000)
+        self.lock = threading.Lock()
+        self.count = 0
+        self.times = np.empty(capacity, dtype='i8')  # milliseconds
+        self.values = np.empty((capacity, len(MICRO_COLUMNS)))
+
+    def update(self, orderbook):
+        """Book listener"""
+        self.update_many(orderbooks_to_array([orderbook]))
+
+    def update_many(self, records):
+        """Add a batch of BOOK_DTYPE snapshots, oldest first"""
+        if len(records) == 0:
+            return
+        measures = book_measures(records, self.levels, self.depth_bps)
+        times = records['timestamp']
+
+        with self.lock:
+            if self.count:
+                # Snapshots we already have (a re-published history) are skipped
+                newer = times > self.times[self.count - 1]
+                times, measures = times[newer], measures[newer]
+            self._append(times, measures)
+
+    def _append(self, times, measures):
+        needed = self.count + len(times)
+        if needed > len(self.times):
+            self._trim(times[-1])
+            needed = self.count + len(times)
+            if needed > len(self.times):
+                capacity = max(needed, 2 * len(self.times))
+                self.times = np.resize(self.times, capacity)
+                self.values = np.resize(self.values, (capacity, len(MICRO_COLUMNS)))
+        self.times[self.count:needed] = times
+        self.values[self.count:needed] = measures
+        self.count = needed
+
+    def set_max_age(self, max_age):
+        """Keep `max_age` of rows from now on, trimming and shrinking the arrays if it got shorter"""
+        with self.lock:
+            self.max_age_ms = int(max_age.total_seconds() * 1000)
+            if self.count:
+                self._trim(self.times[self.count - 1])
+                capacity = max(4096, self.count)
+                if capacity < len(self.times):
+                    self.times = self.times[:capacity].copy()
+                    self.values = self.values[:capacity].copy()
+
+    def nbytes(self):
+        return self.times.nbytes + self.values.nbytes
+
+    def _trim(self, latest):
+        start = np.searchsorted(self.times[:self.count], latest - self.max_age_ms)
+        if start:
+            kept = self.count - start
+            self.times[:kept] = self.times[start:self.count]
+            self.values[:kept] = self.values[start:self.count]
+            self.count = kept
+
+    def series(self, start, end=None, max_points=1000):
+        """DataFrame of the measures from start to end, averaged into at most max_points buckets"""
+        start_ms = int(np.datetime64(start, 'ms').astype('i8'))
+        with self.lock:
+            first = np.searchsorted(self.times[:self.count], start_ms, side='right')
+            last = self.count
+            if end is not None:
+                last = np.searchsorted(self.times[:self.count], int(np.datetime64(end, 'ms').astype('i8')), side='right')
+            times = self.times[first:last].copy()
+            values = self.values[first:last].copy()
+
+        if len(times) > max_points:
+            # Time buckets, each plotted at its first snapshot
+            width = -(-(int(times[-1]) - start_ms) // max_points)
+            buckets = (times - start_ms) // width
+            bounds = np.flatnonzero(np.r_[True, buckets[1:] != buckets[:-1]])
+            finite = np.isfinite(values)
+            with np.errstate(invalid='ignore', divide='ignore'):
+                values = np.add.reduceat(np.where(finite, values, 0.0), bounds) / np.add.reduceat(finite, bounds)
+            times = times[bounds]
+
+        frame = pd.DataFrame(values, columns=MICRO_COLUMNS)
+        frame.insert(0, 'timestamp', times.astype('datetime64[ms]').astype('datetime64[ns]'))
+        return frame
@@ -0,0 +1,169 @@
+"""
+Parent order reconstruction from the tape and the book.
+
+SweepAggregator groups bursts of same-side prints (consecutive trades no
+more than `max_gap_ms` apart) into parent orders, vectorized per ingested
+batch with the still-open group carried between batches.
+
+IcebergDetector watches the book history for price levels that keep
+getting hit and refilled to their previous displayed size.
+"""
+
+import threading
+from collections import deque
+
+import numpy as np
+import pandas as pd
+
+SWEEP_COLUMNS = ['start', 'end', 'side', 'size', 'trades', 'levels', 'vwap', 'first_price', 'last_price']
+
+
+class SweepAggregator:
+    def __init__(self, max_gap_ms=50, min_trades=2, max_sweeps=5000):
+        self.max_gap_ns = int(max_gap_ms * 1e6)
+        self.min_trades = min_trades
+        self.lock = threading.Lock()
+        self.completed = deque(maxlen=max_sweeps)
+        self.open = None  # dict with the same keys as SWEEP_COLUMNS plus 'notional'
+
+    def update(self, new_trades):
+        """Trade listener: extend the open group and close finished ones"""
+        if len(new_trades) == 0:
+            return
+
+        ts = new_trades['timestamp'].values.astype('datetime64[ns]').astype('i8')
+        side = np.where(new_trades['side'].values == 'buy', 1, -1)
+        price = new_trades['price'].values.astype(float)
+        size = new_trades['size'].values.astype(float)
+
+        with self.lock:
+            prev_ts = np.empty_like(ts)
+            prev_side = np.empty_like(side)
+            prev_price = np.empty_like(price)
+            prev_ts[1:], prev_side[1:], prev_price[1:] = ts[:-1], side[:-1], price[:-1]
+            if self.open is not None:
+                prev_ts[0] = self.open['end']
+                prev_side[0] = self.open['side']
+                prev_price[0] = self.open['last_price']
+
+            breaks = (side != prev_side) | (ts - prev_ts > self.max_gap_ns)
+            if self.open is None:
+                breaks[0] = True
+            level_changes = (price != prev_price) & ~breaks
+
+            bounds = np.flatnonzero(breaks)
+            if len(bounds) == 0 or bounds[0] != 0:
+                bounds = np.r_[0, bounds]
+            ends = np.r_[bounds[1:], len(ts)] - 1
+
+            size_sums = np.add.reduceat(size, bounds)
+            notional = np.add.reduceat(price * size, bounds)
+            changes = np.add.reduceat(level_changes.astype(int), bounds)
+
+            groups = [
+                {
+                    'start': ts[b], 'end': ts[e], 'side': side[b], 'size': size_sums[i],
+                    'trades': e - b + 1, 'levels': changes[i] + 1, 'notional': notional[i],
+                    'first_price': price[b], 'last_price': price[e],
+                }
+                for i, (b, e) in enumerate(zip(bounds, ends))
+            ]
+
+            if not breaks[0]:
+                # The batch starts by continuing the group left open last time
+                first = groups[0]
+                merged = dict(self.open)
+                merged.update({
+                    'end': first['end'], 'last_price': first['last_price'],
+                    'size': merged['size'] + first['size'],
+                    'notional': merged['notional'] + first['notional'],
+                    'trades': merged['trades'] + first['trades'],
+                    # The first row's price change against the open group is already in first['levels']
+                    'levels': merged['levels'] + first['levels'] - 1,
+                })
+                groups[0] = merged
+            elif self.open is not None:
+                self._close(self.open)
+
+            for group in groups[:-1]:
+                self._close(group)
+            self.open = groups[-1]
+
+    def _close(self, group):
+        if group['trades'] >= self.min_trades:
+            self.completed.append(group)
+
+    def sweeps(self, since=None, min_size=0):
+        """Parent orders (including the open one) as a DataFrame"""
+        with self.lock:
+            groups = list(self.completed)
+            if self.open is not None and self.open['trades'] >= self.min_trades:
+                groups.append(self.open)
+
+        since_ns = None if since is None else pd.Timestamp(since).value
+        rows = [
+            (g['start'], g['end'], 'buy' if g['side'] > 0 else 'sell', g['size'], g['trades'], g['levels'],
+             g['notional'] / g['size'] if g['size'] else g['last_price'], g['first_price'], g['last_price'])
+            for g in groups
+            if g['size'] >= min_size and (since_ns is None or g['end'] > since_ns)
+        ]
+        frame = pd.DataFrame(rows, columns=SWEEP_COLUMNS)
+        frame['start'] = pd.to_datetime(frame['start'])
+        frame['end'] = pd.to_datetime(frame['end'])
+        return frame
+
+
+class IcebergDetector:
+    """Flags levels that are repeatedly depleted and refilled.
+
+    A level is depleted when its displayed size falls below `depletion` of
+    the size it had before, and refilled when it climbs back to at least
+    `refill` of that size while the price level is still in the book.
+    """
+
+    def __init__(self, depletion=0.5, refill=0.8, min_refills=3):
+        self.depletion = depletion
+        self.refill = refill
+        self.min_refills = min_refills
+        self.lock = threading.Lock()
+        self.levels = {}  # (side, price) -> state dict
+
+    def update(self, orderbook):
+        """Book listener: compare a new snapshot against the tracked levels"""
+        seen = set()
+        with self.lock:
+            for side, book_levels in (('bid', orderbook['bids']), ('ask', orderbook['asks'])):
+                for price, amount in book_levels:
+                    key = (side, price)
+                    seen.add(key)
+                    state = self.levels.get(key)
+                    if state is None:
+                        self.levels[key] = {'peak': amount, 'depleted': False, 'refills': 0,
+                                            'size': amount, 'last_seen': orderbook['timestamp']}
+                        continue
+
+                    if state['depleted']:
+                        if amount >= state['peak'] * self.refill:
+                            state['depleted'] = False
+                            state['refills'] += 1
+                            state['peak'] = amount
+                    elif amount < state['peak'] * self.depletion:
+                        # Keep the pre-depletion size as the refill reference
+                        state['depleted'] = True
+                    else:
+                        state['peak'] = amount
+                    state['size'] = amount
+                    state['last_seen'] = orderbook['timestamp']
+
+            # Levels that left the book were traded through or pulled
+            for key in [key for key in self.levels if key not in seen]:
+                del self.levels[key]
+
+    def icebergs(self):
+        """Currently displayed levels that look like icebergs"""
+        with self.lock:
+            return [
+                {'side': side, 'price': price, 'refills': state['refills'], 'size': state['size']}
+                for (side, price), state in self.levels.items()
+                if state['refills'] >= self.min_refills
+            ]
@@ -0,0 +1,188 @@
+"""
+Per-version aggregates for every offered time window.
+
+The dashboard's windows (TIME_WINDOWS) are nested suffixes of the trade
+store, so one pass over the newest trades gives everything the charts need
+for all of them: cumulative sums answer each window's metrics and
+cumulative delta, and one-minute bars are shared, with only the partial
+first bar of each window recomputed from its few trades. Ingestion fills
+the cache as soon as a version is published, so a refresh is a lookup
+whatever mix of windows the clients use.
+"""
+
+import threading
+import time
+from datetime import timedelta
+
+import numpy as np
+import pandas as pd
+
+from chart_builder import calculate_volume_profile
+from clock import CLOCK
+from metrics import CHART_BUILD_SECONDS
+
+MINUTE = np.timedelta64(1, 'm')
+
+
+class WindowAggregates:
+    """Everything the charts show for one time window of one snapshot"""
+    __slots__ = ('minutes', 'store_trades', 'trades', 'metrics', 'candles', 'cumulative_delta',
+                 'delta_1min', 'price_trend', 'profile', 'start', 'end')
+
+    def __init__(self, minutes, store_trades, trades, metrics=None, candles=None, cumulative_delta=None,
+                 delta_1min=None, price_trend=None, profile=None, start=None, end=None):
+        self.minutes = minutes
+        self.start = start  # the window was cut as (start, end]
+        self.end = end
+        self.store_trades = store_trades  # trades in the whole store
+        self.trades = trades  # read-only slice of the snapshot's trades
+        self.metrics = metrics or {}
+        self.candles = candles if candles is not None else pd.DataFrame()
+        self.cumulative_delta = cumulative_delta if cumulative_delta is not None else pd.Series(dtype=float)
+        self.delta_1min = delta_1min if delta_1min is not None else pd.Series(dtype=float)
+        self.price_trend = price_trend if price_trend is not None else pd.Series(dtype=float)
+        self.profile = profile if profile is not None else pd.DataFrame()
+
+
+@CHART_BUILD_SECONDS.time(chart='compute_windows')
+def compute_windows(trades, windows, now, price_levels=20):
+    """{minutes: WindowAggregates} for every window, from one pass over the largest"""
+    timestamps = trades['timestamp'].values
+    base = timestamps.searchsorted(np.datetime64(now - timedelta(minutes=max(windows))), side='right')
+    recent = trades.iloc[base:]
+    times = timestamps[base:]
+    prices = recent['price'].values.astype(float)
+    sizes = recent['size'].values.astype(float)
+    signed = np.where(recent['side'].values == 'buy', sizes, -sizes)
+    count = len(times)
+    if count == 0:
+        return {
+            window: WindowAggregates(window, len(trades), recent, start=now - timedelta(minutes=window), end=now)
+            for window in windows
+        }
+
+    # Running totals, so any suffix is a difference of two entries
+    cum_size = np.r_[0.0, np.cumsum(sizes)]
+    cum_buy = np.r_[0.0, np.cumsum(np.where(signed > 0, sizes, 0.0))]
+    cum_delta = np.r_[0.0, np.cumsum(signed)]
+
+    # One-minute bars over the largest window
+    minutes = times.astype('datetime64[m]')
+    starts = np.flatnonzero(np.r_[True, minutes[1:] != minutes[:-1]])
+    ends = np.r_[starts[1:], count]
+    bars = {
+        'time': minutes[starts].astype('datetime64[ns]'),
+        'open': prices[starts],
+        'high': np.maximum.reduceat(prices, starts),
+        'low': np.minimum.reduceat(prices, starts),
+        'close': prices[ends - 1],
+        'volume': cum_size[ends] - cum_size[starts],
+        'delta': cum_delta[ends] - cum_delta[starts],
+        'mean': np.add.reduceat(prices, starts) / (ends - starts),
+    }
+
+    aggregates = {}
+    for window in windows:
+        cutoff = now - timedelta(minutes=window)
+        start = times.searchsorted(np.datetime64(cutoff), side='right')
+        window_trades = recent.iloc[start:]
+        if start == count:
+            aggregates[window] = WindowAggregates(window, len(trades), window_trades, start=cutoff, end=now)
+            continue
+
+        # Bars from the one holding the window's first trade; that one may be partial
+        first = starts.searchsorted(start, side='right') - 1
+        window_bars = {name: values[first:].copy() for name, values in bars.items()}
+        if starts[first] < start:
+            partial = slice(start, ends[first])
+            window_bars['open'][0] = prices[start]
+            window_bars['high'][0] = prices[partial].max()
+            window_bars['low'][0] = prices[partial].min()
+            window_bars['volume'][0] = cum_size[ends[first]] - cum_size[start]
+            window_bars['delta'][0] = cum_delta[ends[first]] - cum_delta[start]
+            window_bars['mean'][0] = prices[partial].mean()
+        index = pd.DatetimeIndex(window_bars['time'], name='timestamp')
+
+        # Empty minutes still get a (zero) delta bar
+        bar_minutes = window_bars['time'].astype('datetime64[m]')
+        delta_1min = np.zeros(int((bar_minutes[-1] - bar_minutes[0]) / MINUTE) + 1)
+        delta_1min[((bar_minutes - bar_minutes[0]) / MINUTE).astype(int)] = window_bars['delta']
+
+        total_volume = cum_size[count] - cum_size[start]
+        buy_volume = cum_buy[count] - cum_buy[start]
+        current_price = prices[-1]
+        start_price = prices[start]
+        aggregates[window] = WindowAggregates(
+            window, len(trades), window_trades,
+            metrics={
+                'current_price': current_price,
+                'price_change_percent': (current_price - start_price) / start_price * 100 if count - start > 1 else 0,
+                'total_volume': total_volume,
+                'buy_volume': buy_volume,
+                'sell_volume': total_volume - buy_volume,
+                'net_delta': cum_delta[count] - cum_delta[start],
+            },
+            candles=pd.DataFrame({name: window_bars[name] for name in ('open', 'high', 'low', 'close', 'volume')},
+                                 index=index),
+            cumulative_delta=pd.Series(cum_delta[start + 1:] - cum_delta[start], index=pd.DatetimeIndex(times[start:])),
+            delta_1min=pd.Series(delta_1min, index=pd.date_range(index[0], periods=len(delta_1min), freq='1min')),
+            price_trend=pd.Series(window_bars['mean'], index=index),
+            profile=calculate_volume_profile(window_trades, price_levels),
+            start=cutoff,
+            end=now,
+        )
+    return aggregates
+
+
+class WindowPrecompute:
+    """Caches the aggregates of every offered window for the latest version.
+
+    Ingestion publishes each snapshot here first, so the work is done once
+    per version in the background; a refresh that arrives before that (or
+    without background ingestion) computes it itself, once. Windows are cut
+    against the clock, so a version held longer than `max_age` seconds is
+    recomputed.
+    """
+
+    def __init__(self, windows, max_age=5.0):
+        self.windows = tuple(sorted(windows))
+        self.max_age = max_age
+        self.lock = threading.Lock()
+        self.current = (None, 0.0, {})  # (version, computed at, aggregates)
+
+    def publish(self, snapshot):
+        self.get(snapshot)
+
+    def _fresh(self, current, snapshot):
+        return current[0] == snapshot.version and time.monotonic() - current[1] < self.max_age
+
+    def get(self, snapshot):
+        """{minutes: WindowAggregates} for this snapshot"""
+        current = self.current
+        if self._fresh(current, snapshot):
+            return current[2]
+        with self.lock:
+            current = self.current
+            if self._fresh(current, snapshot):
+                return current[2]
+            computed_at = time.monotonic()
+            aggregates = compute_windows(snapshot.trades, self.windows, CLOCK.now())
+            if current[0] is None or snapshot.version >= current[0]:
+                # A refresh still holding an older snapshot must not evict the latest
+                self.current = (snapshot.version, computed_at, aggregates)
+            return aggregates
+
+    def nbytes(self):
+        """Bytes held by the cached aggregates, not counting the trade slices they share with the store"""
+        return sum(
+            window.cumulative_delta.memory_usage(index=True) + window.candles.memory_usage(index=True).sum()
+            + window.delta_1min.memory_usage(index=True) + window.price_trend.memory_usage(index=True)
+            for window in self.current[2].values()
+        )
+
+    def window(self, snapshot, minutes):
+        """Aggregates for one window, computed on the spot if it is not an offered one"""
+        aggregates = self.get(snapshot)
+        if minutes in aggregates:
+            return aggregates[minutes]
+        return compute_windows(snapshot.trades, (minutes,), CLOCK.now())[minutes]
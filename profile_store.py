@@ -0,0 +1,252 @@
+"""
+Hourly volume profiles in DATA_DIR.
+
+Every ingested trade is binned at a fixed price tick (PROFILE_TICK) into
+the histogram of its UTC hour, and each hour is saved as a small .npz of
+(first bin, volume per bin). A composite profile over any range of hours,
+one session (UTC day) or many, is then a handful of array adds of stored
+histograms rather than a rescan of raw trades. Value area levels (POC,
+VAH, VAL) come from the composite.
+
+Histograms can be rebuilt from the tick archive, e.g. after turning the
+store on:
+
+    python run.py profiles --days 30
+"""
+
+import argparse
+import os
+import threading
+import time
+from datetime import datetime, timedelta
+
+import numpy as np
+
+import config
+from clock import CLOCK
+
+HOUR_MS = 3_600_000
+
+
+def _hour(value):
+    """UTC hour number of a naive UTC datetime"""
+    return int(np.datetime64(value, 'ms').astype('i8')) // HOUR_MS
+
+
+def value_area(prices, volume, share=0.7):
+    """POC, VAH and VAL of a profile, or None if it is empty.
+
+    Starts at the point of control and keeps adding the larger neighbouring
+    bin until `share` of the volume is covered.
+    """
+    total = volume.sum()
+    if len(volume) == 0 or total <= 0:
+        return None
+    poc = int(np.argmax(volume))
+    low = high = poc
+    covered = volume[poc]
+    target = share * total
+    while covered < target and (low > 0 or high < len(volume) - 1):
+        below = volume[low - 1] if low > 0 else -1.0
+        above = volume[high + 1] if high < len(volume) - 1 else -1.0
+        if above >= below:
+            high += 1
+            covered += above
+        else:
+            low -= 1
+            covered += below
+    return {'poc': float(prices[poc]), 'vah': float(prices[high]), 'val': float(prices[low])}
+
+
+class ProfileStore:
+    def __init__(self, directory, tick=10.0, flush_interval=60, retention_days=90):
+        self.directory = directory
+        self.tick = tick
+        self.flush_interval = flush_interval
+        self.retention_days = retention_days
+        self.lock = threading.Lock()
+        self.hours = {}  # hour -> (first bin, volumes) or None when there is no file
+        self.mtimes = {}  # hour -> mtime of the file it was read from
+        self.dirty = set()
+        self.writer = False  # fed trades here, so memory is ahead of disk
+        self.last_flush = time.monotonic()
+        self.last_pruned = None
+        self.levels_cache = {}
+        self.levels_minute = None
+
+    def _path(self, hour):
+        return os.path.join(self.directory, f"{datetime.utcfromtimestamp(hour * 3600):%Y%m%d%H}.npz")
+
+    def update(self, new_trades):
+        """Trade listener"""
+        if len(new_trades) == 0:
+            return
+        times = new_trades['timestamp'].values.astype('datetime64[ms]').astype('i8')
+        self.add(times, new_trades['price'].values.astype(float), new_trades['size'].values.astype(float))
+        if time.monotonic() - self.last_flush >= self.flush_interval:
+            self.flush()
+
+    def add(self, times, prices, sizes):
+        """Add trades (ms timestamps, time ordered) to their hours' histograms"""
+        hours = times // HOUR_MS
+        bins = np.floor(prices / self.tick).astype('i8')
+        bounds = np.flatnonzero(np.r_[True, hours[1:] != hours[:-1]])
+        with self.lock:
+            self.writer = True
+            for start, end in zip(bounds, np.r_[bounds[1:], len(hours)]):
+                hour = int(hours[start])
+                self._merge(hour, bins[start:end], sizes[start:end])
+
+    def _merge(self, hour, bins, sizes):
+        if hour not in self.hours:
+            # Pick up what an earlier run already saved for this hour
+            self.hours[hour] = self._read(hour)
+        first = int(bins.min())
+        volume = np.bincount(bins - first, weights=sizes)
+        current = self.hours[hour]
+        if current is not None:
+            low = min(first, current[0])
+            merged = np.zeros(max(first + len(volume), current[0] + len(current[1])) - low)
+            merged[current[0] - low:current[0] - low + len(current[1])] += current[1]
+            merged[first - low:first - low + len(volume)] += volume
+            first, volume = low, merged
+        self.hours[hour] = (first, volume)
+        self.dirty.add(hour)
+
+    def flush(self):
+        """Save every hour changed since the last flush"""
+        with self.lock:
+            dirty = [(hour, self.hours[hour]) for hour in sorted(self.dirty)]
+            self.dirty.clear()
+            self.last_flush = time.monotonic()
+        os.makedirs(self.directory, exist_ok=True)
+        for hour, (first, volume) in dirty:
+            path = self._path(hour)
+            tmp_path = path + '.tmp.npz'
+            np.savez(tmp_path, first=first, volume=volume)
+            os.replace(tmp_path, path)
+        self._prune()
+
+    def nbytes(self):
+        with self.lock:
+            return sum(histogram[1].nbytes for histogram in self.hours.values() if histogram is not None)
+
+    def evict(self):
+        """Drop the hours already saved from memory; they are read back from disk when needed"""
+        with self.lock:
+            current_hour = _hour(CLOCK.now())
+            for hour in [hour for hour in self.hours if hour not in self.dirty and hour < current_hour]:
+                del self.hours[hour]
+                self.mtimes.pop(hour, None)
+
+    def _prune(self):
+        today = CLOCK.now().date()
+        if self.last_pruned == today or not os.path.isdir(self.directory):
+            return
+        self.last_pruned = today
+        cutoff = f"{today - timedelta(days=self.retention_days):%Y%m%d}"
+        for name in os.listdir(self.directory):
+            if name.endswith('.npz') and name[:8] < cutoff:
+                os.remove(os.path.join(self.directory, name))
+
+    def _read(self, hour):
+        path = self._path(hour)
+        try:
+            with np.load(path) as saved:
+                histogram = (int(saved['first']), saved['volume'])
+            self.mtimes[hour] = os.path.getmtime(path)
+            return histogram
+        except (OSError, KeyError, ValueError):
+            return None
+
+    def _histogram(self, hour, current_hour):
+        """One hour's histogram, reading it from disk if needed"""
+        with self.lock:
+            if hour in self.hours and (self.writer or hour < current_hour - 1):
+                return self.hours[hour]
+            if hour in self.hours and hour in self.mtimes:
+                # Readers re-read the hours the writer may still be flushing
+                try:
+                    if os.path.getmtime(self._path(hour)) == self.mtimes[hour]:
+                        return self.hours[hour]
+                except OSError:
+                    return self.hours[hour]
+            histogram = self._read(hour)
+            if histogram is not None or hour < current_hour - 1:
+                self.hours[hour] = histogram
+            return histogram
+
+    def histogram(self, start, end):
+        """Composite (prices, volume) of the hours overlapping [start, end)"""
+        current_hour = _hour(CLOCK.now())
+        hours = range(_hour(start), _hour(end - timedelta(milliseconds=1)) + 1)
+        parts = [part for part in (self._histogram(hour, current_hour) for hour in hours) if part is not None]
+        if not parts:
+            return np.empty(0), np.empty(0)
+        low = min(first for first, _ in parts)
+        volume = np.zeros(max(first + len(counts) for first, counts in parts) - low)
+        for first, counts in parts:
+            volume[first - low:first - low + len(counts)] += counts
+        return (low + np.arange(len(volume)) + 0.5) * self.tick, volume
+
+    def sessions(self, start, end):
+        """[(session date, prices, volume)] for each UTC day overlapping [start, end)"""
+        day = datetime.combine(start.date(), datetime.min.time())
+        profiles = []
+        while day < end:
+            prices, volume = self.histogram(max(day, start), min(day + timedelta(days=1), end))
+            if len(volume):
+                profiles.append((day.date(), prices, volume))
+            day += timedelta(days=1)
+        return profiles
+
+    def composite_levels(self, sessions, share=0.7, today=None):
+        """Value area of the last `sessions` completed UTC days, cached for a minute"""
+        now = CLOCK.now()
+        today = today or now.date()
+        minute = now.replace(second=0, microsecond=0)
+        if minute != self.levels_minute:
+            self.levels_cache, self.levels_minute = {}, minute
+        key = (sessions, share, today)
+        if key not in self.levels_cache:
+            end = datetime.combine(today, datetime.min.time())
+            self.levels_cache[key] = value_area(*self.histogram(end - timedelta(days=sessions), end), share=share)
+        return self.levels_cache[key]
+
+    def backfill(self, archive, start, end, chunk_rows=50000):
+        """Rebuild from the tick archive every hour in [start, end) that it has trades for"""
+        rebuilt = ProfileStore(self.directory, self.tick, retention_days=self.retention_days)
+        # Start from empty hours rather than what is saved
+        rebuilt.hours = dict.fromkeys(range(_hour(start), _hour(end - timedelta(milliseconds=1)) + 1))
+        for records in archive.records('trades', start, end, chunk_rows):
+            rebuilt.add(records['timestamp'], records['price'], records['size'])
+        rebuilt.flush()
+        with self.lock:
+            for hour, histogram in rebuilt.hours.items():
+                if histogram is not None:
+                    self.hours[hour] = histogram
+                    self.dirty.discard(hour)
+            self.levels_cache = {}
+
+
+def default_profile_store():
+    if not config.PROFILES_ENABLED:
+        return None
+    return ProfileStore(
+        config.PROFILE_DIR, config.PROFILE_TICK, config.PROFILE_FLUSH_INTERVAL, config.PROFILE_RETENTION_DAYS
+    )
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='run.py profiles', description="Rebuild hourly volume profiles from the tick archive")
+    parser.add_argument('--days', type=int, default=7, help="days back from now to rebuild (default: 7)")
+    args = parser.parse_args(argv)
+
+    from archive import TickArchive
+    # Up to the current hour, which the running ingestion is still writing
+    now = CLOCK.now()
+    end = now.replace(minute=0, second=0, microsecond=0)
+    start = datetime.combine((now - timedelta(days=args.days)).date(), datetime.min.time())
+    store = ProfileStore(config.PROFILE_DIR, config.PROFILE_TICK, retention_days=config.PROFILE_RETENTION_DAYS)
+    store.backfill(TickArchive(config.ARCHIVE_DIR), start, end, config.EXPORT_CHUNK_ROWS)
+    print(f"📊 Rebuilt volume profiles from {start:%Y-%m-%d} to {end:%Y-%m-%d %H:%M} in {config.PROFILE_DIR}")
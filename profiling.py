@@ -0,0 +1,226 @@
+"""
+On-demand profiling of the refresh callback and the ingest loop.
+
+Arm a target for the next N invocations, either with ORDER_FLOW_PROFILE=N
+at startup or through POST /admin/profile. Each armed invocation runs under
+cProfile and a stack sampler; once all N are done the session writes, into
+DATA_DIR/profiles:
+
+    <target>-<time>.pstats          deterministic profile (pstats/snakeviz)
+    <target>-<time>.collapsed       sampled stacks (flamegraph.pl/speedscope)
+    <target>-<time>.tracemalloc     raw tracemalloc snapshot
+    <target>-<time>.memory.txt      allocation growth since arming + store sizes
+"""
+
+import cProfile
+import functools
+import os
+import pstats
+import sys
+import threading
+import tracemalloc
+from collections import Counter
+from datetime import datetime
+
+from flask import jsonify, request
+
+import config
+
+TARGETS = ('callback', 'ingest')
+
+# Keep the profiler's own allocations out of the memory report
+_IGNORED_ALLOCATIONS = [
+    tracemalloc.Filter(False, tracemalloc.__file__),
+    tracemalloc.Filter(False, cProfile.__file__),
+    tracemalloc.Filter(False, pstats.__file__),
+    tracemalloc.Filter(False, '<frozen importlib._bootstrap*>'),
+]
+
+
+class _StackSampler:
+    """Samples one thread's Python stack at a fixed interval"""
+
+    def __init__(self, thread_id, interval):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stacks = Counter()
+        self.stop_event = threading.Event()
+        self.thread = threading.Thread(target=self._run, name='profile-sampler', daemon=True)
+
+    def start(self):
+        self.thread.start()
+
+    def stop(self):
+        self.stop_event.set()
+        self.thread.join()
+
+    def _run(self):
+        while not self.stop_event.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+                frame = frame.f_back
+            if stack:
+                self.stacks[';'.join(reversed(stack))] += 1
+
+
+class _ProfileRun:
+    """Profiles accumulated for one armed target"""
+
+    def __init__(self, target, count):
+        self.target = target
+        self.remaining = count
+        self.in_flight = 0
+        self.stats = None
+        self.stacks = Counter()
+        self.armed_at = datetime.now()
+        self.baseline = tracemalloc.take_snapshot() if tracemalloc.is_tracing() else None
+
+
+class ProfileSession:
+    def __init__(self, output_dir, sample_interval=0.005):
+        self.output_dir = output_dir
+        self.sample_interval = sample_interval
+        self.lock = threading.Lock()
+        # cProfile can only hook one invocation at a time, others run unprofiled
+        self.active = threading.Lock()
+        self.runs = {}
+        self.written = []
+        self.store_probe = None  # callable returning {store: bytes}
+        self._started_tracemalloc = False
+
+    def arm(self, target, count):
+        """Profile the next `count` invocations of `target`"""
+        if target not in TARGETS:
+            raise ValueError(f"Unknown profile target: {target}")
+        if count < 1:
+            # A run that never finishes would leave tracemalloc tracing for good
+            raise ValueError(f"Profile count must be at least 1, got {count}")
+        with self.lock:
+            if not tracemalloc.is_tracing():
+                tracemalloc.start(10)
+                self._started_tracemalloc = True
+            self.runs[target] = _ProfileRun(target, count)
+
+    def status(self):
+        with self.lock:
+            armed = {target: run.remaining for target, run in self.runs.items()}
+        return {'armed': armed, 'written': list(self.written)}
+
+    def profiled(self, target):
+        """Decorator that profiles invocations while `target` is armed"""
+        def decorator(fn):
+            @functools.wraps(fn)
+            def wrapper(*args, **kwargs):
+                run = self._claim(target)
+                if run is None:
+                    return fn(*args, **kwargs)
+
+                profile = cProfile.Profile()
+                sampler = _StackSampler(threading.get_ident(), self.sample_interval)
+                sampler.start()
+                profile.enable()
+                try:
+                    return fn(*args, **kwargs)
+                finally:
+                    profile.disable()
+                    sampler.stop()
+                    self.active.release()
+                    self._record(run, profile, sampler.stacks)
+            return wrapper
+        return decorator
+
+    def _claim(self, target):
+        with self.lock:
+            run = self.runs.get(target)
+            if run is None or run.remaining <= 0:
+                return None
+            if not self.active.acquire(blocking=False):
+                return None
+            run.remaining -= 1
+            run.in_flight += 1
+            return run
+
+    def _record(self, run, profile, stacks):
+        with self.lock:
+            if run.stats is None:
+                run.stats = pstats.Stats(profile)
+            else:
+                run.stats.add(profile)
+            run.stacks.update(stacks)
+            run.in_flight -= 1
+            finished = run.remaining <= 0 and run.in_flight == 0
+            # The target may have been re-armed meanwhile; that run is not ours to end
+            if finished and self.runs.get(run.target) is run:
+                del self.runs[run.target]
+        if finished:
+            self._write(run)
+
+    def _write(self, run):
+        os.makedirs(self.output_dir, exist_ok=True)
+        base = os.path.join(self.output_dir, f"{run.target}-{datetime.now().strftime('%Y%m%d-%H%M%S')}")
+
+        run.stats.dump_stats(base + '.pstats')
+        with open(base + '.collapsed', 'w') as f:
+            for stack, count in run.stacks.most_common():
+                f.write(f"{stack} {count}\n")
+
+        files = [base + '.pstats', base + '.collapsed']
+        if tracemalloc.is_tracing():
+            snapshot = tracemalloc.take_snapshot()
+            snapshot.dump(base + '.tracemalloc')
+            with open(base + '.memory.txt', 'w') as f:
+                f.write(f"Armed at {run.armed_at:%Y-%m-%d %H:%M:%S}\n\n")
+                if self.store_probe is not None:
+                    f.write("Store sizes (bytes):\n")
+                    for store, size in self.store_probe().items():
+                        f.write(f"  {store}: {size:,}\n")
+                    f.write("\n")
+                if run.baseline is not None:
+                    f.write("Top allocation growth since arming:\n")
+                    growth = snapshot.filter_traces(_IGNORED_ALLOCATIONS).compare_to(
+                        run.baseline.filter_traces(_IGNORED_ALLOCATIONS), 'lineno'
+                    )
+                    for stat in growth[:30]:
+                        f.write(f"  {stat}\n")
+            files += [base + '.tracemalloc', base + '.memory.txt']
+            self._maybe_stop_tracemalloc()
+
+        with self.lock:
+            self.written.extend(files)
+        print(f"🔬 Wrote {run.target} profile to {base}.*")
+
+    def _maybe_stop_tracemalloc(self):
+        with self.lock:
+            if self._started_tracemalloc and not self.runs:
+                tracemalloc.stop()
+                self._started_tracemalloc = False
+
+
+PROFILER = ProfileSession(os.path.join(config.DATA_DIR, 'profiles'), config.PROFILE_SAMPLE_INTERVAL)
+
+if config.PROFILE_INVOCATIONS > 0:
+    for _target in TARGETS:
+        PROFILER.arm(_target, config.PROFILE_INVOCATIONS)
+
+
+def register_profile_routes(server, session=PROFILER):
+    """Admin endpoint to arm the profiler, enabled by ORDER_FLOW_ADMIN_TOKEN"""
+
+    @server.route('/admin/profile', methods=['GET', 'POST'])
+    def admin_profile():
+        if not config.ADMIN_TOKEN or request.headers.get('X-Admin-Token') != config.ADMIN_TOKEN:
+            return jsonify({'error': 'forbidden'}), 403
+
+        if request.method == 'POST':
+            count = request.args.get('count', 5, type=int)
+            targets = request.args.getlist('target') or list(TARGETS)
+            try:
+                for target in targets:
+                    session.arm(target, count)
+            except ValueError as e:
+                return jsonify({'error': str(e)}), 400
+
+        return jsonify(session.status())
@@ -0,0 +1,189 @@
+"""
+Server-sent event push channel for live dashboard updates.
+
+Ingestion publishes new-trade and new-bar deltas to a PushHub; every
+connected dashboard gets its own bounded, coalescing channel so a slow
+client never holds back ingestion or grows memory without bound.
+"""
+
+import json
+import threading
+import time
+
+import numpy as np
+from flask import Response, stream_with_context
+
+MAX_PENDING_TRADES = 200  # newest trades kept per client between deliveries
+HEARTBEAT_SECONDS = 15
+
+
+class ClientChannel:
+    """Per-client mailbox that coalesces events while the client is busy"""
+
+    def __init__(self, max_pending_trades=MAX_PENDING_TRADES):
+        self.max_pending_trades = max_pending_trades
+        self.condition = threading.Condition()
+        self.pending_trades = []
+        self.pending_bar = None
+        self.pending_backfill = None
+        self.dropped = 0
+        self.version = None
+        self.closed = False
+
+    def offer(self, version, trades, bar):
+        with self.condition:
+            self.version = version
+            if trades:
+                self.pending_trades.extend(trades)
+                overflow = len(self.pending_trades) - self.max_pending_trades
+                if overflow > 0:
+                    # Backpressure: keep the newest trades, count what we skipped
+                    del self.pending_trades[:overflow]
+                    self.dropped += overflow
+            if bar is not None:
+                # Bars are snapshots of the forming candle, only the latest matters
+                self.pending_bar = bar
+            self.condition.notify()
+
+    def offer_backfill(self, progress):
+        with self.condition:
+            # Only the latest progress matters
+            self.pending_backfill = progress
+            self.condition.notify()
+
+    def take(self, timeout):
+        """Wait for pending events and drain them as one coalesced message"""
+        with self.condition:
+            if not self._has_pending() and not self.closed:
+                self.condition.wait(timeout)
+            if not self._has_pending():
+                return None
+
+            message = {
+                'version': self.version,
+                'trades': self.pending_trades,
+                'bar': self.pending_bar,
+                'dropped': self.dropped,
+                'backfill': self.pending_backfill,
+            }
+            self.pending_trades = []
+            self.pending_bar = None
+            self.pending_backfill = None
+            self.dropped = 0
+            return message
+
+    def close(self):
+        with self.condition:
+            self.closed = True
+            self.condition.notify()
+
+    def _has_pending(self):
+        return bool(self.pending_trades) or self.pending_bar is not None or self.pending_backfill is not None
+
+
+class PushHub:
+    """Fans ingestion deltas out to the connected dashboards"""
+
+    def __init__(self, max_clients=100):
+        self.max_clients = max_clients
+        self.lock = threading.Lock()
+        self.clients = set()
+        self.version = 0
+        self.ingested_total = None  # of the last snapshot published
+
+    def subscribe(self):
+        with self.lock:
+            if len(self.clients) >= self.max_clients:
+                return None
+            channel = ClientChannel()
+            self.clients.add(channel)
+            return channel
+
+    def unsubscribe(self, channel):
+        channel.close()
+        with self.lock:
+            self.clients.discard(channel)
+
+    def publish(self, snapshot):
+        """Push the trades added by the last ingest cycle to every client"""
+        trades = snapshot.trades
+        # Diff the running total, so trades of a version we never saw are not lost
+        previous, self.ingested_total = self.ingested_total, snapshot.ingested_total
+        new_trades_count = snapshot.new_trades_count if previous is None else snapshot.ingested_total - previous
+        new_trades_count = min(new_trades_count, len(trades))
+        if new_trades_count <= 0:
+            return
+
+        self.version += 1
+        new_trades = trades.iloc[-new_trades_count:]
+        trade_delta = _trades_payload(new_trades.iloc[-MAX_PENDING_TRADES:])
+        bar = _current_bar(trades)
+
+        with self.lock:
+            clients = list(self.clients)
+        for channel in clients:
+            channel.offer(self.version, trade_delta, bar)
+
+    def publish_backfill(self, progress):
+        """Backfill listener: stream its progress to every client"""
+        with self.lock:
+            clients = list(self.clients)
+        for channel in clients:
+            channel.offer_backfill(progress)
+
+    def stream(self, channel):
+        """Yield SSE frames for one client until it disconnects"""
+        try:
+            yield 'retry: 3000\n\n'
+            last_sent = time.monotonic()
+            while True:
+                message = channel.take(timeout=1.0)
+                if message is not None:
+                    yield f"event: update\ndata: {json.dumps(message)}\n\n"
+                    last_sent = time.monotonic()
+                elif time.monotonic() - last_sent > HEARTBEAT_SECONDS:
+                    yield ': keep-alive\n\n'
+                    last_sent = time.monotonic()
+        finally:
+            self.unsubscribe(channel)
+
+
+def _trades_payload(trades):
+    """Compact [timestamp_ms, price, size, side] rows for the wire"""
+    timestamps = trades['timestamp'].values.astype('datetime64[ms]').astype('i8')
+    sides = np.where(trades['side'].values == 'buy', 1, -1)
+    return [
+        [int(ts), float(price), float(size), int(side)]
+        for ts, price, size, side in zip(timestamps, trades['price'].values, trades['size'].values, sides)
+    ]
+
+
+def _current_bar(trades):
+    """OHLCV of the 1-minute bar the newest trade belongs to"""
+    last_minute = trades['timestamp'].iloc[-1].floor('1min')
+    bar_trades = trades.iloc[trades['timestamp'].searchsorted(last_minute):]
+    return {
+        'time': int(np.datetime64(last_minute, 'ms').astype('i8')),
+        'open': float(bar_trades['price'].iloc[0]),
+        'high': float(bar_trades['price'].max()),
+        'low': float(bar_trades['price'].min()),
+        'close': float(bar_trades['price'].iloc[-1]),
+        'volume': float(bar_trades['size'].sum()),
+    }
+
+
+def register_stream_route(server, hub):
+    """Expose the hub as an SSE endpoint on the Flask server"""
+
+    @server.route('/stream')
+    def stream():
+        channel = hub.subscribe()
+        if channel is None:
+            # Too many open streams on this worker, clients fall back to polling
+            return Response('push capacity reached', status=503)
+
+        return Response(
+            stream_with_context(hub.stream(channel)),
+            mimetype='text/event-stream',
+            headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+        )
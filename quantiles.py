@@ -0,0 +1,162 @@
+"""
+Streaming trade size statistics for adaptive large-trade thresholds.
+
+Quantiles use the P² algorithm (Jain & Chlamtac, 1985): five markers per
+quantile, O(1) work and memory per observation, no sorting. Z-scores use
+an exponentially weighted mean and variance of log trade size, since
+trade sizes are roughly log-normal.
+"""
+
+import math
+import threading
+
+import numpy as np
+
+# Tracked quantiles; percentile thresholds in between are interpolated
+TRACKED_QUANTILES = (0.9, 0.95, 0.96, 0.97, 0.98, 0.99, 0.995, 0.998, 0.999)
+
+
+class P2Quantile:
+    """Single-quantile P² estimator"""
+
+    def __init__(self, p):
+        self.p = p
+        self.count = 0
+        self.heights = []
+        self.positions = [0, 1, 2, 3, 4]
+        self.desired = [0, 2 * p, 4 * p, 2 + 2 * p, 4]
+        self.increments = [0, p / 2, p, (1 + p) / 2, 1]
+
+    def add(self, x):
+        self.count += 1
+        q = self.heights
+        if self.count <= 5:
+            q.append(x)
+            if self.count == 5:
+                q.sort()
+            return
+
+        n = self.positions
+        if x < q[0]:
+            q[0] = x
+            k = 0
+        elif x >= q[4]:
+            q[4] = x
+            k = 3
+        else:
+            k = 0
+            while x >= q[k + 1]:
+                k += 1
+
+        for i in range(k + 1, 5):
+            n[i] += 1
+        for i in range(5):
+            self.desired[i] += self.increments[i]
+
+        # Nudge the three middle markers towards their desired positions
+        for i in (1, 2, 3):
+            d = self.desired[i] - n[i]
+            if (d >= 1 and n[i + 1] - n[i] > 1) or (d <= -1 and n[i - 1] - n[i] < -1):
+                d = 1 if d > 0 else -1
+                height = self._parabolic(i, d)
+                if not q[i - 1] < height < q[i + 1]:
+                    height = q[i] + d * (q[i + d] - q[i]) / (n[i + d] - n[i])
+                q[i] = height
+                n[i] += d
+
+    def _parabolic(self, i, d):
+        q, n = self.heights, self.positions
+        return q[i] + d / (n[i + 1] - n[i - 1]) * (
+            (n[i] - n[i - 1] + d) * (q[i + 1] - q[i]) / (n[i + 1] - n[i]) +
+            (n[i + 1] - n[i] - d) * (q[i] - q[i - 1]) / (n[i] - n[i - 1])
+        )
+
+    def value(self):
+        if self.count == 0:
+            return None
+        if self.count < 5:
+            return float(np.percentile(self.heights, self.p * 100))
+        return self.heights[2]
+
+
+class RollingQuantiles:
+    """P² estimators over roughly the last `window` observations.
+
+    P² cannot forget, so estimators are rotated: a fresh generation starts
+    every `window` observations and answers once it has seen a quarter of
+    a window, until then the previous generation answers.
+    """
+
+    def __init__(self, quantiles=TRACKED_QUANTILES, window=50000):
+        self.quantiles = quantiles
+        self.window = window
+        self.current = self._generation()
+        self.previous = None
+        self.seen = 0
+
+    def _generation(self):
+        return [P2Quantile(p) for p in self.quantiles]
+
+    def add(self, x):
+        if self.seen >= self.window:
+            self.previous, self.current = self.current, self._generation()
+            self.seen = 0
+        self.seen += 1
+        for estimator in self.current:
+            estimator.add(x)
+
+    def values(self):
+        generation = self.current
+        if self.previous is not None and self.seen < self.window // 4:
+            generation = self.previous
+        return [estimator.value() for estimator in generation]
+
+
+class TradeSizeStats:
+    """Per-trade size sketch maintained on ingest"""
+
+    def __init__(self, window=50000, halflife=5000):
+        self.lock = threading.Lock()
+        self.quantiles = RollingQuantiles(window=window)
+        self.alpha = 1 - 0.5 ** (1 / halflife)
+        self.mean = None
+        self.var = 0.0
+        self.count = 0
+
+    def update(self, new_trades):
+        """Trade listener: fold a batch of new trades into the sketch"""
+        with self.lock:
+            for size in new_trades['size'].values:
+                if size <= 0:
+                    continue
+                self.count += 1
+                self.quantiles.add(size)
+                self._update_moments(math.log(size))
+
+    def _update_moments(self, x):
+        if self.mean is None:
+            self.mean = x
+            return
+        # Plain running moments until there is enough history to decay
+        alpha = max(self.alpha, 1 / self.count)
+        diff = x - self.mean
+        increment = alpha * diff
+        self.mean += increment
+        self.var = (1 - alpha) * (self.var + diff * increment)
+
+    def size_at_top_percent(self, top_percent):
+        """Trade size above which the largest `top_percent`% of trades lie"""
+        with self.lock:
+            values = self.quantiles.values()
+        points = [(p, v) for p, v in zip(self.quantiles.quantiles, values) if v is not None]
+        if not points:
+            return None
+        p = min(max(1 - top_percent / 100, points[0][0]), points[-1][0])
+        return float(np.interp(p, [q for q, _ in points], [v for _, v in points]))
+
+    def size_at_zscore(self, z):
+        """Trade size whose log-size z-score is `z`"""
+        with self.lock:
+            if self.mean is None:
+                return None
+            return math.exp(self.mean + z * math.sqrt(self.var))
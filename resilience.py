@@ -0,0 +1,143 @@
+"""
+Bounded exchange calls.
+
+Every exchange request runs on a worker thread and the caller waits at
+most its deadline, so a hung socket never holds up ingestion or a
+refresh. Failing endpoints back off exponentially with full jitter and
+trip a circuit breaker, during which the last-known data is served and
+flagged as stale. Optionally, a request that outlives the endpoint's p95
+latency is hedged with the same request to a backup host, and whichever
+answers first wins.
+"""
+
+import random
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+import numpy as np
+
+from metrics import REGISTRY, Counter, Gauge
+
+BREAKER_STATE = REGISTRY.register(Gauge(
+    'orderflow_circuit_breaker_open', 'Whether the circuit breaker for an endpoint is open', ['endpoint']))
+HEDGED_REQUESTS = REGISTRY.register(Counter(
+    'orderflow_hedged_requests_total', 'Backup requests sent, by which request won', ['endpoint', 'winner']))
+
+# Hung calls keep a worker until the HTTP timeout frees it, so leave headroom
+_executor = ThreadPoolExecutor(max_workers=16, thread_name_prefix='exchange-call')
+
+
+class FetchTimeout(Exception):
+    """The exchange did not answer within the call's deadline"""
+
+
+def backoff_delay(failures, base, cap):
+    """Exponential backoff with full jitter"""
+    return random.uniform(0, min(cap, base * 2 ** (failures - 1)))
+
+
+def time_left(deadline):
+    """Seconds until a time.monotonic() deadline, raising FetchTimeout once it has passed"""
+    left = deadline - time.monotonic()
+    if left <= 0:
+        raise FetchTimeout("deadline passed before the request was sent")
+    return left
+
+
+def call_with_deadline(fn, timeout):
+    """Run fn on a worker thread, giving up on it after `timeout` seconds"""
+    future = _executor.submit(fn)
+    done, _ = wait([future], timeout)
+    if not done:
+        raise FetchTimeout(f"no response within {timeout:g}s")
+    return future.result()
+
+
+def hedged_call(endpoint, primary, backup, hedge_after, timeout):
+    """Call primary; if it has not answered after `hedge_after`, race backup against it"""
+    deadline = time.monotonic() + timeout
+    first = _executor.submit(primary)
+    done, _ = wait([first], hedge_after)
+    if done:
+        # Answered (or failed outright) in time, no hedge
+        return first.result()
+
+    second = _executor.submit(backup)
+    pending = {first, second}
+    error = None
+    while pending:
+        done, pending = wait(pending, max(0, deadline - time.monotonic()), return_when=FIRST_COMPLETED)
+        if not done:
+            raise FetchTimeout(f"no response within {timeout:g}s (hedged)")
+        for future in done:
+            if future.exception() is None:
+                HEDGED_REQUESTS.labels(endpoint=endpoint, winner='backup' if future is second else 'primary').inc()
+                return future.result()
+            error = future.exception()
+    raise error
+
+
+class LatencyTracker:
+    """Recent successful call latencies for one endpoint"""
+
+    def __init__(self, max_samples=200, min_samples=20):
+        self.samples = deque(maxlen=max_samples)
+        self.min_samples = min_samples
+
+    def observe(self, seconds):
+        self.samples.append(seconds)
+
+    def p95(self):
+        if len(self.samples) < self.min_samples:
+            return None
+        return float(np.percentile(np.fromiter(self.samples, dtype=float), 95))
+
+
+class CircuitBreaker:
+    """Per-endpoint backoff and circuit breaker.
+
+    Every failure pushes the next attempt back by a jittered exponential
+    delay. After `failure_threshold` consecutive failures the breaker is
+    open; once the delay has passed one trial call is let through
+    (half-open) and its outcome closes or re-opens the breaker.
+    """
+
+    def __init__(self, endpoint, failure_threshold=3, base_delay=1.0, max_delay=60.0):
+        self.endpoint = endpoint
+        self.failure_threshold = failure_threshold
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.lock = threading.Lock()
+        self.failures = 0
+        self.retry_at = 0
+        self.last_success = None  # monotonic time
+        BREAKER_STATE.labels(endpoint=endpoint).set(0)
+
+    @property
+    def is_open(self):
+        return self.failures >= self.failure_threshold
+
+    def retry_in(self):
+        """Seconds until the next call is allowed"""
+        return max(0, self.retry_at - time.monotonic())
+
+    def allow(self):
+        return self.retry_in() <= 0
+
+    def record_success(self):
+        with self.lock:
+            self.failures = 0
+            self.retry_at = 0
+            self.last_success = time.monotonic()
+        BREAKER_STATE.labels(endpoint=self.endpoint).set(0)
+
+    def record_failure(self):
+        with self.lock:
+            self.failures += 1
+            self.retry_at = time.monotonic() + backoff_delay(self.failures, self.base_delay, self.max_delay)
+            opened = self.failures == self.failure_threshold
+        if opened:
+            BREAKER_STATE.labels(endpoint=self.endpoint).set(1)
+            print(f"🔌 Circuit open for {self.endpoint}, serving last-known data")
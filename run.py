@@ -3,13 +3,33 @@
 BTC Order Flow Analyzer - Production Version for Render.com
 """
 
-from app import app
 import warnings
 import os
+import sys
 
 warnings.filterwarnings('ignore')
 
 def main():
+    if len(sys.argv) > 1 and sys.argv[1] == 'ingest':
+        # Standalone ingestion process for the shared data plane
+        import ingest
+        ingest.main()
+        return
+
+    if len(sys.argv) > 1 and sys.argv[1] == 'export':
+        # Export archived trades or order books to a file
+        import export
+        export.main(sys.argv[2:])
+        return
+
+    if len(sys.argv) > 1 and sys.argv[1] == 'profiles':
+        # Rebuild hourly volume profiles from the tick archive
+        import profile_store
+        profile_store.main(sys.argv[2:])
+        return
+
+    from app import app
+
     print("🚀 Starting BTC Order Flow Analyzer...")
     print("📊 Initializing application...")
     
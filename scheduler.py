@@ -0,0 +1,224 @@
+"""
+Rate-limit aware fetch scheduling.
+
+Decides when each exchange endpoint is due, adapts the trade poll interval
+to the observed arrival rate, coalesces concurrent calls to the same
+endpoint and keeps every process inside the exchange's request-weight
+budget.
+"""
+
+import threading
+import time
+from collections import deque
+
+import config
+
+
+class BudgetTimeout(Exception):
+    """The weight budget did not free up within the call's deadline"""
+
+
+class WeightBudget:
+    """Sliding one-minute request-weight budget for one exchange"""
+
+    def __init__(self, limit_per_minute, safety=0.8):
+        self.limit = limit_per_minute * safety
+        self.lock = threading.Lock()
+        self.spent = deque()  # (monotonic time, weight)
+        self.spent_total = 0
+        self.blocked_until = 0
+
+    def _expire(self, now):
+        while self.spent and now - self.spent[0][0] >= 60:
+            self.spent_total -= self.spent.popleft()[1]
+
+    def delay(self, weight, share=1.0):
+        """Seconds to wait before `weight` can be spent (0 if available now).
+
+        With share < 1 the caller only uses that part of the budget and
+        leaves the rest to others, e.g. a backfill to the live polls.
+        """
+        limit = self.limit * share
+        with self.lock:
+            now = time.monotonic()
+            self._expire(now)
+            if now < self.blocked_until:
+                return self.blocked_until - now
+            if self.spent_total + weight <= limit or not self.spent:
+                return 0
+
+            # Wait until enough of the window has rolled off
+            needed = self.spent_total + weight - limit
+            for spent_at, spent_weight in self.spent:
+                needed -= spent_weight
+                if needed <= 0:
+                    return max(0, spent_at + 60 - now)
+            return 60
+
+    def spend(self, weight):
+        with self.lock:
+            self.spent.append((time.monotonic(), weight))
+            self.spent_total += weight
+
+    def acquire(self, weight, timeout=None, share=1.0):
+        """Block until `weight` fits in the budget; False if timeout elapsed"""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            wait = self.delay(weight, share)
+            if wait <= 0:
+                self.spend(weight)
+                return True
+            if deadline is not None and time.monotonic() + wait > deadline:
+                return False
+            time.sleep(min(wait, 1.0))
+
+    def sync(self, used_weight):
+        """Adopt the exchange's own count of weight used this minute if higher"""
+        with self.lock:
+            now = time.monotonic()
+            self._expire(now)
+            missing = used_weight - self.spent_total
+            if missing > 0:
+                self.spent.append((now, missing))
+                self.spent_total += missing
+
+    def penalize(self, seconds=60):
+        """Stop spending entirely, e.g. after an HTTP 429 from the exchange"""
+        with self.lock:
+            self.blocked_until = max(self.blocked_until, time.monotonic() + seconds)
+
+    def usage(self):
+        with self.lock:
+            self._expire(time.monotonic())
+            return self.spent_total / self.limit if self.limit else 0
+
+
+_budgets = {}
+_budgets_lock = threading.Lock()
+
+
+def get_budget(exchange_id):
+    """Process-wide budget shared by everything talking to `exchange_id`"""
+    with _budgets_lock:
+        if exchange_id not in _budgets:
+            limit = config.EXCHANGE_WEIGHT_LIMITS.get(exchange_id, config.DEFAULT_WEIGHT_LIMIT)
+            _budgets[exchange_id] = WeightBudget(limit)
+        return _budgets[exchange_id]
+
+
+class SingleFlight:
+    """Collapses concurrent calls with the same key into one"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.calls = {}
+
+    def do(self, key, fn):
+        """Return (result, leader); followers get the leader's result"""
+        with self.lock:
+            call = self.calls.get(key)
+            leader = call is None
+            if leader:
+                call = {'done': threading.Event(), 'result': None, 'error': None}
+                self.calls[key] = call
+
+        if not leader:
+            call['done'].wait()
+            if call['error'] is not None:
+                raise call['error']
+            return call['result'], False
+
+        try:
+            call['result'] = fn()
+        except Exception as e:
+            call['error'] = e
+            raise
+        finally:
+            with self.lock:
+                del self.calls[key]
+            call['done'].set()
+        return call['result'], True
+
+
+class AdaptivePoller:
+    """Poll interval that tracks the trade arrival rate.
+
+    The target is a page that comes back about half full: full pages mean
+    trades may have been missed between polls, near-empty pages mean we are
+    spending weight for nothing.
+    """
+
+    def __init__(self, page_size, initial_interval, min_interval, max_interval, target_fill=0.5):
+        self.page_size = page_size
+        self.interval = initial_interval
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.target_fill = target_fill
+        self.rate = None  # trades per second (EWMA)
+        self.last_poll = None
+
+    def record(self, page_count, new_count):
+        now = time.monotonic()
+        if self.last_poll is not None:
+            elapsed = max(now - self.last_poll, 1e-3)
+            sample = new_count / elapsed
+            self.rate = sample if self.rate is None else 0.7 * self.rate + 0.3 * sample
+        self.last_poll = now
+
+        if page_count >= self.page_size:
+            # Page came back full, we are probably behind
+            self.interval = max(self.min_interval, self.interval / 2)
+        elif self.rate:
+            self.interval = self.target_fill * self.page_size / self.rate
+        else:
+            self.interval = self.interval * 1.5
+        self.interval = min(self.max_interval, max(self.min_interval, self.interval))
+
+    def due_in(self):
+        if self.last_poll is None:
+            return 0
+        return max(0, self.last_poll + self.interval - time.monotonic())
+
+
+class FetchScheduler:
+    """Cadence, coalescing and weight accounting for one exchange connection"""
+
+    def __init__(self, exchange_id, trade_page_size):
+        self.exchange_id = exchange_id
+        self.budget = get_budget(exchange_id)
+        self.weights = config.REQUEST_WEIGHTS.get(exchange_id, {})
+        self.flights = SingleFlight()
+        self.trades = AdaptivePoller(
+            trade_page_size,
+            initial_interval=config.UPDATE_INTERVAL,
+            min_interval=config.TRADE_POLL_MIN_INTERVAL,
+            max_interval=config.TRADE_POLL_MAX_INTERVAL
+        )
+        self.book_interval = config.BOOK_POLL_INTERVAL
+        self.last_book_poll = None
+        self.throttled = False  # set under memory pressure: poll as slowly as allowed
+
+    def trades_due_in(self):
+        if self.throttled and self.trades.last_poll is not None:
+            return max(0, self.trades.last_poll + self.trades.max_interval - time.monotonic())
+        return self.trades.due_in()
+
+    def book_due_in(self):
+        if self.last_book_poll is None:
+            return 0
+        interval = max(self.book_interval, self.trades.max_interval) if self.throttled else self.book_interval
+        return max(0, self.last_book_poll + interval - time.monotonic())
+
+    def next_due_in(self):
+        return min(self.trades_due_in(), self.book_due_in())
+
+    def record_book_poll(self):
+        self.last_book_poll = time.monotonic()
+
+    def call(self, endpoint, fn, timeout=None):
+        """Run fn under the weight budget, sharing the result with concurrent callers"""
+        def budgeted():
+            if not self.budget.acquire(self.weights.get(endpoint, 1), timeout):
+                raise BudgetTimeout(f"{endpoint}: request weight budget exhausted")
+            return fn()
+        return self.flights.do(endpoint, budgeted)
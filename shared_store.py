@@ -0,0 +1,382 @@
+import os
+import json
+import numpy as np
+import pandas as pd
+from datetime import datetime
+
+import config
+from clock import CLOCK
+from data_fetcher import EMPTY_TRADES, OrderFlowData
+
+BOOK_LEVELS = 20
+TRADE_RING_CAPACITY = 1 << 20  # rows; a ring that fills up is reallocated twice as large
+BOOK_RING_CAPACITY = 256
+
+TRADE_DTYPE = np.dtype([
+    ('timestamp', 'i8'),  # milliseconds
+    ('price', 'f8'),
+    ('size', 'f8'),
+    ('side', 'i1'),  # 1 = buy, -1 = sell
+    ('received_at', 'i8'),  # milliseconds
+])
+
+BOOK_DTYPE = np.dtype([
+    ('timestamp', 'i8'),  # milliseconds
+    ('bids', 'f8', (BOOK_LEVELS, 2)),
+    ('asks', 'f8', (BOOK_LEVELS, 2)),
+])
+
+MANIFEST = 'manifest.json'
+
+
+def trades_to_array(trades):
+    """Pack a trades DataFrame into a TRADE_DTYPE record array"""
+    records = np.empty(len(trades), dtype=TRADE_DTYPE)
+    if len(trades) == 0:
+        return records
+
+    records['timestamp'] = trades['timestamp'].values.astype('datetime64[ms]').astype('i8')
+    records['price'] = trades['price'].values
+    records['size'] = trades['size'].values
+    records['side'] = np.where(trades['side'].values == 'buy', 1, -1)
+    records['received_at'] = trades['received_at'].values.astype('datetime64[ms]').astype('i8')
+    return records
+
+
+def array_to_trades(records):
+    """Build a trades DataFrame on top of a TRADE_DTYPE record array"""
+    return pd.DataFrame({
+        'timestamp': records['timestamp'].astype('datetime64[ms]').astype('datetime64[ns]'),
+        'price': records['price'],
+        'size': records['size'],
+        'side': np.where(records['side'] > 0, 'buy', 'sell'),
+        'received_at': records['received_at'].astype('datetime64[ms]').astype('datetime64[ns]'),
+    })
+
+
+def orderbooks_to_array(orderbooks):
+    """Pack order book snapshots into a BOOK_DTYPE record array (NaN padded)"""
+    records = np.empty(len(orderbooks), dtype=BOOK_DTYPE)
+    records['bids'] = np.nan
+    records['asks'] = np.nan
+    for i, orderbook in enumerate(orderbooks):
+        records['timestamp'][i] = np.datetime64(orderbook['timestamp'], 'ms').astype('i8')
+        bids = orderbook['bids'][:BOOK_LEVELS]
+        asks = orderbook['asks'][:BOOK_LEVELS]
+        if bids:
+            records['bids'][i, :len(bids)] = bids
+        if asks:
+            records['asks'][i, :len(asks)] = asks
+    return records
+
+
+def array_to_orderbooks(records):
+    """Unpack a BOOK_DTYPE record array into the order book history format"""
+    orderbooks = []
+    for record in records:
+        bids = record['bids'][~np.isnan(record['bids'][:, 0])]
+        asks = record['asks'][~np.isnan(record['asks'][:, 0])]
+        orderbooks.append({
+            'timestamp': np.datetime64(int(record['timestamp']), 'ms').astype(datetime),
+            'bids': [(float(price), float(amount)) for price, amount in bids],
+            'asks': [(float(price), float(amount)) for price, amount in asks],
+        })
+    return orderbooks
+
+
+class SharedRing:
+    """Fixed-capacity ring of records in a memory-mapped file.
+
+    Rows are addressed by their absolute index since the file was created,
+    row i living in slot i % capacity, so a writer only ever touches the
+    slots of the rows it appends.
+    """
+
+    def __init__(self, path, dtype, capacity, writable=False):
+        self.path = path
+        self.capacity = capacity
+        self.records = np.memmap(path, dtype=dtype, mode='w+' if writable else 'r', shape=(capacity,))
+
+    def write(self, head, records):
+        """Store `records` as rows head, head + 1, ..."""
+        position = head % self.capacity
+        first = min(len(records), self.capacity - position)
+        self.records[position:position + first] = records[:first]
+        self.records[:len(records) - first] = records[first:]
+
+    def read(self, start, end):
+        """Copy of rows [start, end)"""
+        count = max(0, end - start)
+        position = start % self.capacity
+        first = min(count, self.capacity - position)
+        if first == count:
+            return np.array(self.records[position:position + count])
+        return np.concatenate([self.records[position:], self.records[:count - first]])
+
+
+class _RingWriter:
+    """Publisher side of one ring: appends, or starts a new file when it can't"""
+
+    def __init__(self, directory, name, dtype, capacity):
+        self.directory = directory
+        self.name = name
+        self.dtype = dtype
+        self.min_capacity = capacity
+        self.generation = 0
+        self.ring = None
+        self.start = 0  # published rows are [start, head)
+        self.head = 0
+        self.last = None  # key of the newest row written
+
+    def publish(self, rows, kept, last, appendable, full):
+        """Append `rows`, leaving the last `kept` rows published.
+
+        When `appendable` is false, or the append would overwrite rows that
+        are still published, `full()` is written to a new file instead.
+        """
+        if (appendable and self.ring is not None
+                and self.head + len(rows) - self.ring.capacity <= self.start):
+            self.ring.write(self.head, rows)
+            self.head += len(rows)
+        else:
+            records = full()
+            self._new_generation(max(self.min_capacity, 2 * len(records)))
+            self.ring.write(0, records)
+            self.head = len(records)
+        self.start = self.head - kept
+        self.last = last
+
+    def _new_generation(self, capacity):
+        self.generation += 1
+        path = os.path.join(self.directory, f'{self.name}-{self.generation}.ring')
+        if os.path.exists(path):
+            # Left by an earlier run: unlink rather than truncate what a reader may still map
+            os.remove(path)
+        self.ring = SharedRing(path, self.dtype, capacity, writable=True)
+        # Readers of the previous manifest may still be opening the last generation
+        for generation in range(self.generation - 2, 0, -1):
+            try:
+                os.remove(os.path.join(self.directory, f'{self.name}-{generation}.ring'))
+            except OSError:
+                break
+
+    def manifest(self):
+        return {
+            'file': os.path.basename(self.ring.path),
+            'capacity': self.ring.capacity,
+            'start': self.start,
+            'head': self.head,
+        }
+
+
+def _trade_key(trades, i):
+    return (trades['timestamp'].values[i], trades['price'].values[i], trades['size'].values[i])
+
+
+class SharedStorePublisher:
+    """Publishes the trade and order book stores as append-only rings.
+
+    Each publish appends only the rows the snapshot added to the mapped
+    ring files and then atomically swaps the manifest, which holds every
+    ring's published [start, head) row range. A snapshot that is not an
+    append (a backfill merge inserting older trades) or that would wrap
+    onto published rows is written in full to a new, larger ring file.
+    """
+
+    def __init__(self, directory, trade_capacity=TRADE_RING_CAPACITY, book_capacity=BOOK_RING_CAPACITY):
+        self.directory = directory
+        self.version = 0
+        self.ingested_total = 0
+        self.merges = 0
+        os.makedirs(directory, exist_ok=True)
+        self.trades = _RingWriter(directory, 'trades', TRADE_DTYPE, trade_capacity)
+        self.book = _RingWriter(directory, 'book', BOOK_DTYPE, book_capacity)
+        self.last_book = None  # the ingest process reuses book dicts across snapshots
+
+    def publish(self, snapshot):
+        """Append what the snapshot added and swap the manifest"""
+        self.version += 1
+        new_trades_count = snapshot.ingested_total - self.ingested_total
+        self.ingested_total = snapshot.ingested_total
+        self._publish_trades(snapshot.trades, new_trades_count, snapshot.merges == self.merges)
+        self.merges = snapshot.merges
+        self._publish_book(snapshot.orderbooks)
+        last_update = snapshot.last_update
+
+        manifest = {
+            'version': self.version,
+            'trades': self.trades.manifest(),
+            'book': self.book.manifest(),
+            'ingested_total': self.ingested_total,
+            'last_update': last_update.isoformat() if last_update else None,
+            'clock_offset': CLOCK.offset,
+        }
+        self._write_atomic(MANIFEST, json.dumps(manifest).encode())
+
+    def _publish_trades(self, trades, new_trades_count, unmerged):
+        count = len(trades)
+        new_trades_count = min(max(new_trades_count, 0), count)
+        old = count - new_trades_count
+        # An append only if no history was merged in, the old trades are (a suffix of)
+        # the ones published and the trade before the new ones is the last one we wrote
+        appendable = unmerged and old <= self.trades.head - self.trades.start and (
+            old == 0 or self.trades.last == _trade_key(trades, old - 1))
+        self.trades.publish(
+            trades_to_array(trades.iloc[old:]), count, _trade_key(trades, count - 1) if count else None,
+            appendable, lambda: trades_to_array(trades)
+        )
+
+    def _publish_book(self, orderbooks):
+        new = 0
+        while new < len(orderbooks) and orderbooks[-1 - new] is not self.last_book:
+            new += 1
+        self.book.publish(
+            orderbooks_to_array(orderbooks[len(orderbooks) - new:]), len(orderbooks), None,
+            True, lambda: orderbooks_to_array(orderbooks)
+        )
+        if orderbooks:
+            self.last_book = orderbooks[-1]
+
+    def _write_atomic(self, name, payload):
+        tmp_path = os.path.join(self.directory, f'.{name}.tmp')
+        with open(tmp_path, 'wb') as f:
+            f.write(payload)
+        os.replace(tmp_path, os.path.join(self.directory, name))
+
+
+class SharedStoreReader:
+    """Maps the published rings read-only"""
+
+    def __init__(self, directory):
+        self.directory = directory
+        self.rings = {}  # name -> SharedRing of the current generation
+
+    def read_manifest(self):
+        try:
+            with open(os.path.join(self.directory, MANIFEST), 'rb') as f:
+                return json.loads(f.read())
+        except (OSError, ValueError):
+            return None
+
+    def ring(self, name, section, dtype):
+        """(ring, remapped) for a manifest section; remapped when it is a new generation"""
+        path = os.path.join(self.directory, section['file'])
+        ring = self.rings.get(name)
+        if ring is not None and ring.path == path:
+            return ring, False
+        ring = SharedRing(path, dtype, section['capacity'])
+        self.rings[name] = ring
+        return ring, True
+
+
+class SharedOrderFlowData(OrderFlowData):
+    """Read-only data manager for web workers in the shared data plane.
+
+    Instead of polling the exchange, `fetch_new_data` picks up whatever the
+    ingestion process published last, decoding only the ring rows added
+    since the previous version.
+    """
+
+    def __init__(self, directory):
+        super().__init__()
+        self.reader = SharedStoreReader(directory)
+        self.manifest_version = None
+        self.ingested_total = None
+        self.last_book_time = None
+        # Ring rows [first, head) behind the current snapshot's trades and books
+        self.trade_rows = (0, None)
+        self.book_rows = (0, None)
+
+    def next_fetch_delay(self):
+        # Checking the manifest is cheap, pick up new versions quickly
+        return 1.0
+
+    def warm_up(self):
+        # The ingestion process talks to the exchange, web workers never do
+        pass
+
+    def staleness(self):
+        # The ingestion process only publishes when it gets data through
+        last_update = self._snapshot.last_update
+        if last_update is None:
+            return None
+        age = (CLOCK.now() - last_update).total_seconds()
+        return age if age > config.STALE_AFTER else None
+
+    def fetch_new_data(self, force=False):
+        """Refresh from the shared store, returning the number of new trades"""
+        if not self._write_lock.acquire(blocking=False):
+            return 0
+
+        try:
+            manifest = self.reader.read_manifest()
+            if not manifest or manifest['version'] == self.manifest_version:
+                return 0
+            try:
+                trade_ring, trades_remapped = self.reader.ring('trades', manifest['trades'], TRADE_DTYPE)
+                book_ring, book_remapped = self.reader.ring('book', manifest['book'], BOOK_DTYPE)
+            except (OSError, ValueError):
+                # Generation was superseded while we were opening it, pick it up next time
+                return 0
+
+            # Copy only the rows added since our last read
+            trade_first, trade_records = self._read_rows(trade_ring, manifest['trades'], self.trade_rows, trades_remapped)
+            book_first, book_records = self._read_rows(book_ring, manifest['book'], self.book_rows, book_remapped)
+            # The writer only overwrites rows older than its latest start, so anything
+            # we copied from before that may be torn; it is out of the window anyway
+            latest = self.reader.read_manifest() or manifest
+            trade_start = self._settled_start(manifest, latest, 'trades')
+            book_start = self._settled_start(manifest, latest, 'book')
+
+            current = self._snapshot
+            new_rows = array_to_trades(trade_records[max(0, trade_start - trade_first):])
+            kept = EMPTY_TRADES if trades_remapped else current.trades.iloc[trade_start - self.trade_rows[0]:]
+            trades = pd.concat([kept, new_rows], ignore_index=True) if len(kept) else new_rows
+            self.trade_rows = (trade_start, manifest['trades']['head'])
+
+            new_books = array_to_orderbooks(book_records[max(0, book_start - book_first):])
+            orderbooks = (() if book_remapped else current.orderbooks) + tuple(new_books)
+            orderbooks = orderbooks[max(0, len(orderbooks) - (manifest['book']['head'] - book_start)):]
+            self.book_rows = (book_start, manifest['book']['head'])
+
+            self.manifest_version = manifest['version']
+            last_update = None
+            if manifest['last_update']:
+                last_update = datetime.fromisoformat(manifest['last_update'])
+            CLOCK.adopt(manifest.get('clock_offset', 0.0))
+
+            # Listeners start at the tape as first published: what the rings
+            # already hold is history to them, only later rows are news
+            previous_total = self.ingested_total
+            self.ingested_total = manifest['ingested_total']
+            new_trades_count = 0 if previous_total is None else max(0, self.ingested_total - previous_total)
+
+            if new_trades_count:
+                self._notify_trade_listeners(trades.iloc[-new_trades_count:])
+            if previous_total is not None:
+                for orderbook in new_books:
+                    if self.last_book_time is None or orderbook['timestamp'] > self.last_book_time:
+                        self._notify_book_listeners(orderbook)
+            if orderbooks:
+                self.last_book_time = orderbooks[-1]['timestamp']
+            self.publish(trades, orderbooks, last_update, new_trades_count, ingested_total=self.ingested_total)
+            return new_trades_count
+        finally:
+            self._write_lock.release()
+
+    @staticmethod
+    def _read_rows(ring, section, rows, remapped):
+        """(first row, records) of the rows in `section` we have not read yet"""
+        first, head = rows
+        if remapped or head is None:
+            first = section['start']
+        else:
+            first = max(head, section['start'])
+        return first, ring.read(first, section['head'])
+
+    @staticmethod
+    def _settled_start(manifest, latest, name):
+        start = manifest[name]['start']
+        if latest[name]['file'] == manifest[name]['file']:
+            start = max(start, latest[name]['start'])
+        return start
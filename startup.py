@@ -0,0 +1,27 @@
+"""
+Boot timing.
+
+Import this first: phases are measured from the moment it is imported,
+printed once, and exported on /metrics as orderflow_boot_seconds{phase}.
+"""
+
+import time
+
+STARTED = time.perf_counter()
+
+from metrics import REGISTRY, Gauge
+
+BOOT_SECONDS = REGISTRY.register(Gauge(
+    'orderflow_boot_seconds', 'Seconds from process start to each boot phase', ['phase']))
+
+PHASES = {}
+
+
+def mark(phase):
+    """Record the first time `phase` is reached"""
+    if phase in PHASES:
+        return
+    seconds = time.perf_counter() - STARTED
+    PHASES[phase] = seconds
+    BOOT_SECONDS.labels(phase=phase).set(seconds)
+    print(f"⏱️ Boot: {phase} after {seconds:.2f}s")
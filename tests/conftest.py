@@ -0,0 +1,42 @@
+"""Shared pytest setup: the modules live flat at the repository root, and
+the tests draw their trades from one synthetic tape"""
+
+import os
+import sys
+from datetime import timedelta
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from clock import CLOCK  # noqa: E402
+
+
+def trade_tape(count, seed=0, start=None, span=timedelta(hours=1), buy_share=0.5, block_share=0.0):
+    """Trade store rows: `count` trades at sorted millisecond times over `span`
+    from `start` (by default ending now), a random-walk price around 60000,
+    lognormal sizes with `block_share` of them 200x blocks, and `buy_share`
+    of them buys"""
+    rng = np.random.default_rng(seed)
+    first = np.datetime64(CLOCK.now() - span if start is None else start, 'ms')
+    times = first + np.sort(rng.integers(0, int(span.total_seconds() * 1000), count)).astype('timedelta64[ms]')
+    return pd.DataFrame({
+        'timestamp': times.astype('datetime64[ns]'),
+        'price': 60000 + np.cumsum(rng.normal(0, 1, count)),
+        'size': rng.lognormal(-2.5, 1.2, count) * np.where(rng.random(count) < block_share, 200, 1),
+        'side': np.where(rng.random(count) < buy_share, 'buy', 'sell').astype(object),
+        'received_at': np.datetime64(CLOCK.now(), 'ms').astype('datetime64[ns]'),
+    })
+
+
+def trade_rows(times, sizes=1.0, prices=100.0, sides='buy'):
+    """Trade store rows at the given times, with the given (or the same) sizes, prices and sides"""
+    times = pd.to_datetime(list(times))
+    return pd.DataFrame({
+        'timestamp': times,
+        'price': prices,
+        'size': sizes,
+        'side': sides,
+        'received_at': np.datetime64(CLOCK.now(), 'ms').astype('datetime64[ns]'),
+    })
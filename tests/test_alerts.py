@@ -0,0 +1,110 @@
+"""Alert rules: compilation into shared checks, and what those checks fire"""
+
+from datetime import datetime, timedelta
+
+import numpy as np
+import pytest
+
+from alerts import AlertEngine, DeltaCheck, LargeTradeCheck, LiquidityZoneCheck, SpreadCheck, VPINCheck
+from conftest import trade_rows, trade_tape
+
+START = datetime(2026, 10, 19, 12)
+
+
+class Emitted:
+    """Engine stand-in recording what the checks emit"""
+
+    def __init__(self):
+        self.alerts = []
+
+    def emit(self, rule, kind, value, event_time, message):
+        self.alerts.append((rule, value))
+
+
+def test_compile_shares_one_check_per_kind():
+    rules = [
+        {'type': 'large_trade', 'size': 5},
+        {'type': 'large_trade', 'size': 2},
+        {'type': 'delta', 'seconds': 60, 'threshold': 30},
+        {'type': 'delta', 'seconds': 60, 'threshold': 10},
+        {'type': 'delta', 'seconds': 10, 'threshold': 5},
+        {'type': 'spread', 'max_spread': 2.0},
+        {'type': 'vpin', 'threshold': 0.6},
+        {'type': 'liquidity_zone', 'min_size': 40},
+        {'type': 'liquidity_zone', 'width': 2.0},
+        {'type': 'liquidity_zone', 'min_size': 20, 'width': 5.0, 'name': 'walls'},
+    ]
+    engine = AlertEngine(rules, [], liquidity_threshold=15.0)
+    kinds = [type(check) for check in engine.trade_checks]
+    assert kinds == [LargeTradeCheck, DeltaCheck, DeltaCheck, VPINCheck, LiquidityZoneCheck]
+    assert [type(check) for check in engine.book_checks] == [SpreadCheck, LiquidityZoneCheck]
+    assert engine.trade_checks[-1] is engine.book_checks[-1]
+
+    assert engine.trade_checks[0].thresholds == [2, 5]
+    deltas = {check.seconds: check.levels.thresholds for check in engine.trade_checks[1:3]}
+    assert deltas == {60: [10, 30], 10: [5]}
+    zones = engine.book_checks[-1]
+    assert zones.min_sizes == [15.0, 20, 40]
+    assert zones.widths == [2.0, 5.0, 10.0]
+    assert zones.names[1] == 'walls'
+
+
+def test_compile_rejects_unknown_rule_types():
+    with pytest.raises(ValueError, match='squeeze'):
+        AlertEngine([{'type': 'squeeze'}], [])
+
+
+def brute_force_delta(trades, seconds):
+    """Net delta over (t - seconds, t] at every trade"""
+    times = trades['timestamp'].values
+    signed = np.where(trades['side'] == 'buy', 1.0, -1.0) * trades['size'].values
+    return np.array([signed[(times > time - np.timedelta64(seconds, 's')) & (times <= time)].sum() for time in times])
+
+
+@pytest.mark.parametrize('chunk', [1, 13, 4000])
+def test_delta_window_matches_brute_force(chunk):
+    trades = trade_tape(4000, seed=5, start=START, span=timedelta(minutes=10), buy_share=0.6)
+    expected = brute_force_delta(trades, 30)
+    peak = expected[np.abs(expected).argmax()]
+
+    check = DeltaCheck(30, [{'type': 'delta', 'seconds': 30, 'threshold': abs(peak) - 1e-9}])
+    emitted = Emitted()
+    for first in range(0, len(trades), chunk):
+        check.on_trades(emitted, trades.iloc[first:first + chunk])
+    assert check.delta == pytest.approx(expected[-1])
+    assert [value for _, value in emitted.alerts] == [pytest.approx(peak)]
+
+
+def test_delta_rule_rearms_after_falling_back():
+    check = DeltaCheck(10, [{'type': 'delta', 'seconds': 10, 'threshold': 5, 'name': 'flow'}])
+    emitted = Emitted()
+    for second, size in [(0, 6), (1, 1), (20, 1), (40, 7)]:
+        check.on_trades(emitted, trade_rows([START + timedelta(seconds=second)], sizes=[size]))
+    # Still above at the second trade, back under at the third, crossed again at the fourth
+    assert emitted.alerts == [('flow', 6), ('flow', 7)]
+
+
+def test_zone_rules_share_one_book_scan():
+    rules = [{'type': 'liquidity_zone', 'min_size': 10, 'width': 1.0, 'name': 'near'},
+             {'type': 'liquidity_zone', 'min_size': 10, 'width': 5.0, 'name': 'wide'},
+             {'type': 'liquidity_zone', 'min_size': 50, 'width': 5.0, 'name': 'walls'}]
+    check = LiquidityZoneCheck(rules, 15.0)
+    emitted = Emitted()
+    check.on_book(emitted, {'bids': [(90.0, 60.0), (95.0, 3.0)], 'asks': [(105.0, 12.0)], 'timestamp': START})
+    assert check.zones.tolist() == [90.0, 105.0]
+
+    def trade(second, price):
+        check.on_trades(emitted, trade_rows([START + timedelta(seconds=second)], prices=[price]))
+
+    trade(0, 100.0)
+    assert emitted.alerts == [('wide', 105.0)]
+    trade(1, 104.5)
+    assert emitted.alerts[-1] == ('near', 105.0)
+    trade(2, 93.0)
+    assert emitted.alerts[-2:] == [('wide', 90.0), ('walls', 90.0)]
+    trade(3, 94.0)  # still in the same zones
+    assert len(emitted.alerts) == 4
+
+    check.on_book(emitted, {'bids': [], 'asks': [], 'timestamp': START})
+    trade(4, 90.0)
+    assert len(emitted.alerts) == 4 and check.current == [None, None, None]
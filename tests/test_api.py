@@ -0,0 +1,109 @@
+"""JSON API: ETag revalidation, the response cache and the candle cursor"""
+
+from datetime import timedelta
+from types import SimpleNamespace
+
+import pytest
+from flask import Flask
+
+import api
+from api import ResponseCache, register_api_routes
+from conftest import trade_tape
+
+
+class Data:
+    """Data manager stand-in serving fixed snapshots"""
+
+    def __init__(self, trades):
+        self.current = SimpleNamespace(version=1, trades=trades, orderbooks=())
+
+    def snapshot(self):
+        return self.current
+
+    def fetch_new_data(self):
+        return 0
+
+    def advance(self):
+        self.current = SimpleNamespace(version=self.current.version + 1, trades=self.current.trades, orderbooks=())
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1_800_000_000.0
+
+    def time(self):
+        return self.now
+
+
+@pytest.fixture
+def served(monkeypatch):
+    clock = Clock()
+    # ETags roll over with the minute; keep it still unless a test moves it
+    monkeypatch.setattr(api, 'time', clock)
+    data = Data(trade_tape(20_000, seed=6, span=timedelta(minutes=90)))
+    cache = ResponseCache()
+    server = Flask(__name__)
+    register_api_routes(server, data, cache)
+    return server.test_client(), data, cache, clock
+
+
+def test_matching_etag_gets_304(served):
+    client, data, cache, _ = served
+    first = client.get('/api/candles?tf=5m&window=120')
+    assert first.status_code == 200
+    etag = first.headers['ETag'].strip('"')
+
+    again = client.get('/api/candles?tf=5m&window=120', headers={'If-None-Match': f'"{etag}"'})
+    assert again.status_code == 304
+    assert again.data == b''
+    assert again.headers['ETag'].strip('"') == etag
+
+
+def test_responses_are_cached_until_the_data_changes(served):
+    client, data, cache, clock = served
+    first = client.get('/api/candles?window=120')
+    assert client.get('/api/candles?window=120').data == first.data
+    assert len(cache.entries) == 1
+
+    # Other parameters, a new version or the next minute each get their own validator
+    etags = {first.headers['ETag']}
+    etags.add(client.get('/api/candles?window=60').headers['ETag'])
+    data.advance()
+    etags.add(client.get('/api/candles?window=120').headers['ETag'])
+    clock.now += 60
+    etags.add(client.get('/api/candles?window=120').headers['ETag'])
+    assert len(etags) == 4
+    assert client.get('/api/candles?window=120', headers={'If-None-Match': first.headers['ETag']}).status_code == 200
+
+
+def test_bad_arguments_get_400(served):
+    client = served[0]
+    assert client.get('/api/candles?tf=2m').status_code == 400
+    assert client.get('/api/candles?window=0').status_code == 400
+    assert client.get('/api/candles?window=1000000').status_code == 400
+    assert client.get('/api/profile?levels=0').status_code == 400
+
+
+def test_since_cursor_resends_the_forming_bar_only(served):
+    client = served[0]
+    full = client.get('/api/candles?tf=5m&window=120').get_json()
+    assert len(full['candles']) > 10
+    assert full['cursor'] == full['candles'][-1][0]
+
+    later = client.get(f"/api/candles?tf=5m&window=120&since={full['cursor']}").get_json()
+    assert later['candles'] == full['candles'][-1:]
+    assert later['cursor'] == full['cursor']
+
+    # A cursor inside a bar resends that bar whole
+    middle = full['candles'][5][0] + 90_000
+    part = client.get(f'/api/candles?tf=5m&window=120&since={middle}').get_json()
+    assert part['candles'] == full['candles'][5:]
+
+
+def test_cache_evicts_least_recently_used():
+    cache = ResponseCache(max_entries=2)
+    cache.put('a', '1')
+    cache.put('b', '2')
+    cache.get('a')
+    cache.put('c', '3')
+    assert list(cache.entries) == ['a', 'c']
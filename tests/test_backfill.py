@@ -0,0 +1,90 @@
+"""Cold start backfill: merging older trades into the live store"""
+
+from datetime import timedelta
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import data_fetcher
+from backfill import Backfill
+from clock import CLOCK
+from conftest import trade_rows
+from data_fetcher import OrderFlowData
+from loadtest import FakeExchange
+from push import PushHub
+
+
+def trades(seconds_ago):
+    """Trades the given seconds ago, sized 1 + seconds ago so each one can be told apart"""
+    now = CLOCK.now()
+    return trade_rows([now - timedelta(seconds=s) for s in seconds_ago], sizes=[1.0 + s for s in seconds_ago])
+
+
+def test_merge_sorts_and_drops_duplicates():
+    data = OrderFlowData()
+    live = trades([30, 20])
+    data.publish(live, (), CLOCK.now(), 2)
+    added = data.merge_history(pd.concat([trades([100, 90]), live.iloc[:1]], ignore_index=True))
+
+    merged = data.snapshot().trades
+    assert added == 2
+    assert merged['timestamp'].is_monotonic_increasing
+    assert merged['size'].tolist() == [101.0, 91.0, 31.0, 21.0]
+
+
+def test_merge_keeps_live_trades_counted():
+    data = OrderFlowData()
+    hub = PushHub()
+    channel = hub.subscribe()
+    data.publish(trades([30, 20]), (), CLOCK.now(), 2)
+    hub.publish(data.snapshot())
+    channel.take(0)
+
+    # Live trades, then a merge before the push publisher saw them
+    data.publish(pd.concat([data.snapshot().trades, trades([10, 5])], ignore_index=True), (), CLOCK.now(), 2)
+    data.merge_history(trades([100, 90]))
+    snapshot = data.snapshot()
+    assert snapshot.new_trades_count == 0
+    assert snapshot.ingested_total == 4
+    assert snapshot.merges == 1
+
+    hub.publish(snapshot)
+    assert [row[2] for row in channel.take(0)['trades']] == [11.0, 6.0]
+
+
+def test_merge_drops_trades_past_retention():
+    data = OrderFlowData()
+    data.publish(trades([10]), (), CLOCK.now(), 1)
+    data.merge_history(trades([data.retention.total_seconds() + 60, 60]))
+    assert data.snapshot().trades['size'].tolist() == [61.0, 11.0]
+
+
+@pytest.fixture
+def fake_exchange(monkeypatch):
+    exchange = FakeExchange(None, 50.0, latency=0.0, page_size=500)
+    monkeypatch.setattr(data_fetcher, 'load_exchange_class', lambda exchange_id: lambda settings=None: exchange)
+    return exchange
+
+
+def test_backfill_fills_the_store_in_order(fake_exchange):
+    data = OrderFlowData()
+    data.fetch_new_data(force=True)
+    live = len(data.snapshot().trades)
+    heard = []
+    backfill = Backfill(data, hours=0.25, slices=4, workers=2, page_size=500, budget_share=1.0)
+    backfill.add_listener(heard.append)
+    backfill.run()
+
+    store = data.snapshot().trades
+    times = store['timestamp'].values
+    assert np.all(times[1:] >= times[:-1])
+    assert not store.duplicated(subset=['timestamp', 'price', 'size']).any()
+    # About 50 trades a second over the quarter hour
+    assert len(store) - live > 0.8 * 50 * 900
+    assert times[0] < np.datetime64(CLOCK.now() - pd.Timedelta(minutes=14))
+
+    progress = backfill.progress()
+    assert progress['fraction'] == 1.0 and progress['failed_slices'] == 0
+    assert heard[-1]['fraction'] == 1.0
+    assert data.snapshot().ingested_total == live
@@ -0,0 +1,104 @@
+"""Activity bars: close criteria, chunking and the time slices the chart reads"""
+
+from datetime import timedelta
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from bars import BAR_KINDS, BarEngine, create_bar_engines
+from conftest import trade_rows, trade_tape
+
+THRESHOLDS = {'volume': 10.0, 'tick': 500, 'range': 20.0, 'delta': 5.0}
+START = np.datetime64('2026-10-19T08:00:00', 'ms')
+
+
+@pytest.fixture(scope='module')
+def tape():
+    return trade_tape(50_000, seed=3, start=START)
+
+
+def build(kind, trades, chunks=1):
+    engine = BarEngine(kind, THRESHOLDS[kind], capacity=16)
+    for rows in np.array_split(np.arange(len(trades)), chunks):
+        engine.update(trades.iloc[rows])
+    return engine
+
+
+@pytest.mark.parametrize('kind', BAR_KINDS)
+def test_bars_close_at_their_threshold(kind, tape):
+    bars = build(kind, tape).frame(START)
+    closed, forming = bars.iloc[:-1], bars.iloc[-1]
+    reached = {
+        'volume': closed['volume'] >= THRESHOLDS['volume'],
+        'tick': closed['trades'] >= THRESHOLDS['tick'],
+        'range': closed['high'] - closed['low'] >= THRESHOLDS['range'],
+        'delta': closed['delta'].abs() >= THRESHOLDS['delta'],
+    }[kind]
+    assert reached.all()
+    assert len(closed) > 10
+    # Trades are never split or lost
+    assert bars['trades'].sum() == len(tape)
+    assert bars['volume'].sum() == pytest.approx(tape['size'].sum())
+    assert (bars['start'].values[1:] >= bars['end'].values[:-1]).all()
+    assert forming['close'] == tape['price'].iloc[-1]
+
+
+@pytest.mark.parametrize('kind', BAR_KINDS)
+def test_chunking_does_not_change_bars(kind, tape):
+    assert build(kind, tape, chunks=397).frame(START).equals(build(kind, tape).frame(START))
+
+
+def test_tick_bars_reset_after_closing():
+    trades = trade_rows(START + np.arange(7).astype('timedelta64[s]'), prices=[1.0, 3.0, 2.0, 5.0, 4.0, 6.0, 7.0],
+                        sides=['buy', 'sell', 'buy', 'buy', 'sell', 'buy', 'buy'])
+    engine = BarEngine('tick', 3)
+    engine.update(trades)
+    bars = engine.frame(START)
+    assert bars[['open', 'high', 'low', 'close', 'delta', 'trades']].values.tolist() == [
+        [1.0, 3.0, 1.0, 2.0, 1.0, 3],
+        [5.0, 6.0, 4.0, 6.0, 1.0, 3],
+        [7.0, 7.0, 7.0, 7.0, 1.0, 1],
+    ]
+
+
+def test_frame_slices_by_time(tape):
+    engine = build('volume', tape)
+    everything = engine.frame(START)
+    start = START + np.timedelta64(20, 'm')
+    end = START + np.timedelta64(40, 'm')
+    window = engine.frame(start, end)
+    assert (window['end'] > start).all() and (window['start'] <= end).all()
+    inside = everything[(everything['end'] > start) & (everything['start'] <= end)]
+    assert window.reset_index(drop=True).equals(inside.reset_index(drop=True))
+
+
+def test_frame_survives_later_trims(tape):
+    # 40 bars fill the buffer with none forming, so the next update trims in place
+    engine = BarEngine('tick', 50, max_age=timedelta(minutes=1), capacity=40)
+    engine.update(tape.iloc[:2000])
+    assert engine.forming is None
+    bars = engine.frame(START)
+    before = bars.copy()
+    engine.update(tape.iloc[2000:4000])
+    assert bars.equals(before)
+
+
+def test_old_bars_are_trimmed(tape):
+    engine = BarEngine('tick', 50, max_age=timedelta(minutes=10), capacity=8)
+    for rows in np.array_split(np.arange(len(tape)), 500):
+        engine.update(tape.iloc[rows])
+    bars = engine.frame(START)
+    everything = BarEngine('tick', 50)
+    everything.update(tape)
+    everything = everything.frame(START)
+    # Trimmed lazily when the buffer fills, so some older bars may remain; never the last 10 minutes
+    assert len(bars) < len(everything) // 2
+    assert bars['end'].iloc[0] <= bars['end'].iloc[-1] - pd.Timedelta(minutes=10)
+    assert bars.reset_index(drop=True).equals(everything.iloc[-len(bars):].reset_index(drop=True))
+
+
+def test_unknown_kind_and_missing_thresholds():
+    with pytest.raises(ValueError):
+        BarEngine('dollar', 1.0)
+    assert sorted(create_bar_engines({'tick': 10, 'range': 5.0})) == ['range', 'tick']
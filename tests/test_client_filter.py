@@ -0,0 +1,159 @@
+"""Client-side filtering payload: thresholds, the shipped size floor and appends"""
+
+import base64
+import json
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+
+import numpy as np
+import pandas as pd
+
+import config
+from conftest import trade_tape
+from client_filter import _ms, large_trades_dataset, shipped_min_size, size_thresholds, slider_steps
+
+
+class Stats:
+    """Exact quantiles of a size array, standing in for the streaming sketch"""
+
+    def __init__(self, sizes):
+        self.sizes = sizes
+
+    def size_at_top_percent(self, percent):
+        return float(np.quantile(self.sizes, 1 - percent / 100))
+
+    def size_at_zscore(self, z):
+        return float(self.sizes.mean() + z * self.sizes.std())
+
+
+class NotReady:
+    def size_at_top_percent(self, percent):
+        return None
+
+    def size_at_zscore(self, z):
+        return None
+
+
+def decode(columns):
+    return {name: np.frombuffer(base64.b64decode(column['data']), '<' + column['dtype'])
+            for name, column in columns.items()}
+
+
+START = datetime(2026, 1, 1)
+
+
+def tape(seed, first_ms, count):
+    # About one trade per millisecond, so keys share milliseconds
+    return trade_tape(count, seed=seed, start=START + timedelta(milliseconds=first_ms),
+                      span=timedelta(milliseconds=count))
+
+
+def payload(store, version, cursor=None, minutes=5, mode='percentile'):
+    end = store['timestamp'].iloc[-1]
+    start = end - pd.Timedelta(minutes=minutes)
+    trades = store[store['timestamp'] > start]
+    window = SimpleNamespace(start=start, end=end, trades=trades, store_trades=len(store),
+                             price_trend=pd.Series([1.0, 2.0], index=trades['timestamp'].values[[0, -1]]))
+    snapshot = SimpleNamespace(version=version, trades=store)
+    # The cursor comes back from the browser as JSON
+    cursor = json.loads(json.dumps(cursor))
+    return large_trades_dataset(snapshot, window, None, Stats(store['size'].values), mode, cursor), trades
+
+
+def test_thresholds_wait_for_the_sketch():
+    thresholds = size_thresholds(NotReady(), slider_steps())
+    assert thresholds == {'percentile': None, 'zscore': None}
+    # Until then the slider is read as BTC in every mode
+    for mode in ('btc', 'percentile', 'zscore'):
+        assert shipped_min_size(thresholds, NotReady(), mode) == config.TRADE_SIZE_MIN
+
+
+def test_shipped_size_is_floored_at_the_top_percent():
+    sizes = np.random.default_rng(0).exponential(0.5, 10_000)
+    stats = Stats(sizes)
+    thresholds = size_thresholds(stats, slider_steps())
+    # The loosest z-score step reaches well into the small trades
+    assert min(thresholds['zscore']) < stats.size_at_top_percent(config.CLIENT_FILTER_TOP_PERCENT)
+
+    min_size = shipped_min_size(thresholds, stats, 'percentile')
+    floor = stats.size_at_top_percent(config.CLIENT_FILTER_TOP_PERCENT)
+    # Snapped down to a quarter power of two
+    assert floor / 2 ** 0.25 < min_size <= floor
+    assert np.isclose(np.log2(min_size) * 4, round(np.log2(min_size) * 4))
+    # Small drift in the sketch does not move it
+    assert shipped_min_size(thresholds, Stats(sizes * 1.01), 'percentile') == min_size
+    # The z-score mode is not floored: its loosest step is reachable
+    assert shipped_min_size(thresholds, stats, 'zscore') <= min(thresholds['zscore'])
+
+
+def test_btc_mode_ships_every_trade_the_slider_reaches():
+    store = tape(5, 0, 5000)
+    floor = payload(store, 1)[0]['min_size']
+    assert floor > 0.2
+    data, window_trades = payload(store, 1, mode='btc')
+    assert data['mode'] == 'btc' and data['min_size'] == config.TRADE_SIZE_MIN
+    # A slider value below the top % floor still finds the trades between the two
+    sizes = decode(data['trades'])['size']
+    expected = window_trades['size'].values
+    assert np.array_equal(sizes[sizes >= 0.2], expected[expected >= 0.2])
+    assert ((sizes >= 0.2) & (sizes < floor)).any()
+
+
+def test_sizes_compare_exactly_with_thresholds():
+    store = tape(1, 0, 2000)
+    min_size = payload(store, 1, mode='btc')[0]['min_size']
+    # The slider minimum has no exact 32-bit float
+    assert np.float32(min_size) != min_size
+    # Trades exactly at the floor are shipped
+    store.loc[store.index[-5:], 'size'] = min_size
+    data, window_trades = payload(store, 2, mode='btc')
+    assert data['min_size'] == min_size
+    sizes = decode(data['trades'])['size']
+    assert sizes.dtype == np.float64
+    assert (sizes[-5:] >= data['min_size']).all()
+    expected = window_trades['size'].values
+    assert np.array_equal(sizes, expected[expected >= data['min_size']])
+
+
+def test_appends_rebuild_the_full_window():
+    rng = np.random.default_rng(2)
+    store = tape(2, 0, 20_000)
+    cursor = held = None
+    appended = 0
+    for version in range(40):
+        store = pd.concat([store, tape(100 + version, 20_000 + version * 500, int(rng.integers(0, 500)))], ignore_index=True)
+        store = store.sort_values('timestamp', kind='stable', ignore_index=True)
+        if version == 20:
+            # A history merge behind the cursor changes what the browser should hold
+            history = tape(3, 19_000, 50)
+            history['size'] = 9.0
+            store = pd.concat([history, store]).sort_values('timestamp', kind='stable', ignore_index=True)
+
+        data, window_trades = payload(store, version, cursor)
+        columns = decode(data['trades'])
+        if data['append']:
+            appended += 1
+            # As assets/client_filter.js does: keep up to the cursor, then the new rows
+            keys = list(zip(held['t'], held['price'], held['size']))
+            position = len(keys) - keys[::-1].index(tuple(data['after']))
+            columns = {name: np.concatenate([held[name][:position], columns[name]]) for name in columns}
+        else:
+            assert version in (0, 20)
+        keep = columns['t'] > data['start']
+        held = {name: values[keep] for name, values in columns.items()}
+
+        expected = window_trades[window_trades['size'] >= data['min_size']]
+        assert np.array_equal(held['t'], _ms(expected['timestamp'].values))
+        assert np.array_equal(held['price'], expected['price'].values)
+        assert np.array_equal(held['size'], expected['size'].values)
+
+        last = len(held['t']) - 1
+        cursor = {'min_size': data['min_size'], 'first': float(held['t'][0]), 'count': last + 1,
+                  'last': [float(held['t'][last]), float(held['price'][last]), float(held['size'][last])]}
+    assert appended == 38
+
+
+def test_stale_cursor_reloads():
+    store = tape(4, 0, 5000)
+    data, _ = payload(store, 1, {'min_size': 123.0, 'first': 0.0, 'last': [0.0, 1.0, 1.0], 'count': 1})
+    assert not data['append']
@@ -0,0 +1,65 @@
+"""Exports: time arguments and the command line writer"""
+
+import io
+import sys
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+
+import pandas as pd
+import pytest
+
+import config
+import export
+from archive import TickArchive
+from conftest import trade_tape
+from export import parse_range, parse_time
+
+START = datetime(2026, 10, 19, 12)
+
+
+@pytest.mark.parametrize('text, expected', [
+    ('2026-10-19T12:00', START),
+    ('2026-10-19T12:00:00Z', START),
+    ('2026-10-19T12:00:00+00:00', START),
+    ('2026-10-19T14:30:00+02:30', START),
+    ('2026-10-19T07:00:00-05:00', START),
+])
+def test_parse_time_returns_naive_utc(text, expected):
+    parsed = parse_time(text)
+    assert parsed == expected and parsed.tzinfo is None
+
+
+def test_parse_range_defaults_and_order():
+    assert parse_range('2026-10-19T11:00', '2026-10-19T14:00+02:00') == (START - timedelta(hours=1), START)
+    assert parse_range(None, '2026-10-19T12:00') == (START - timedelta(hours=1), START)
+    with pytest.raises(ValueError):
+        parse_range('2026-10-19T13:00+00:00', '2026-10-19T12:00')
+
+
+class Stdout(io.BytesIO):
+    def close(self):
+        raise AssertionError("export closed stdout")
+
+
+@pytest.fixture
+def archived(tmp_path, monkeypatch):
+    trades = trade_tape(500, seed=7, start=START, span=timedelta(minutes=10))
+    TickArchive(str(tmp_path)).append_trades(trades)
+    monkeypatch.setattr(config, 'ARCHIVE_DIR', str(tmp_path))
+    return trades
+
+
+def test_main_writes_to_stdout_and_leaves_it_open(archived, monkeypatch):
+    stdout = Stdout()
+    monkeypatch.setattr(sys, 'stdout', SimpleNamespace(buffer=stdout))
+    export.main(['trades', '--start', '2026-10-19T12:00', '--end', '2026-10-19T13:00+00:30'])
+    assert not stdout.closed
+    written = pd.read_csv(io.BytesIO(stdout.getvalue()))
+    assert len(written) == len(archived)
+
+
+def test_main_closes_the_file_it_opens(archived, tmp_path):
+    path = tmp_path / 'trades.csv'
+    export.main(['trades', '--start', '2026-10-19T12:00', '--end', '2026-10-19T12:05', '-o', str(path)])
+    written = pd.read_csv(path)
+    assert len(written) == int((archived['timestamp'] < START + timedelta(minutes=5)).sum())
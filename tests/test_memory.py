@@ -0,0 +1,105 @@
+"""Memory budget: relief actions are applied cheapest first and rolled back in reverse"""
+
+from datetime import timedelta
+
+import pandas as pd
+
+import config
+from api import ResponseCache
+from clock import CLOCK
+from data_fetcher import OrderFlowData
+from memory import MemoryManager, default_memory_manager, frame_bytes
+from microstructure import MicrostructureEngine
+
+
+class Store:
+    """A probe whose size each relief action halves"""
+
+    def __init__(self, size):
+        self.size = size
+        self.log = []
+
+    def action(self, name):
+        def apply():
+            self.size //= 2
+            self.log.append(('apply', name))
+
+        def undo():
+            self.size *= 2
+            self.log.append(('undo', name))
+        return name, apply, undo
+
+
+def manager(store, budget):
+    memory = MemoryManager(budget, low_water=0.7, check_interval=0)
+    memory.add_store('store', lambda: store.size)
+    for name in ('first', 'second', 'third'):
+        memory.add_action(*store.action(name))
+    return memory
+
+
+def test_applies_actions_in_order_until_under_budget():
+    store = Store(1000)
+    memory = manager(store, 300)
+    memory.check(force=True)
+    assert store.log == [('apply', 'first'), ('apply', 'second')]
+    assert memory.status()['relief'] == ['first', 'second']
+    assert store.size == 250
+
+    # Within the budget and above low water: nothing changes
+    memory.check(force=True)
+    assert memory.level == 2
+
+
+def test_rolls_back_one_action_per_check_below_low_water():
+    store = Store(1000)
+    memory = manager(store, 300)
+    memory.check(force=True)
+    store.size = 50
+    memory.check(force=True)
+    assert store.log[-1] == ('undo', 'second')
+    assert memory.level == 1
+    memory.check(force=True)
+    assert store.log[-1] == ('undo', 'first')
+    assert memory.level == 0
+
+
+def test_stops_when_relief_runs_out():
+    store = Store(10_000)
+    memory = manager(store, 10)
+    memory.check(force=True)
+    assert memory.level == 3
+    assert memory.status()['relief'] == ['first', 'second', 'third']
+
+
+def test_default_relief_order(monkeypatch):
+    monkeypatch.setattr(config, 'MEMORY_BUDGET_MB', 0)
+    data = OrderFlowData()
+    now = CLOCK.now()
+    data.publish(pd.DataFrame({
+        'timestamp': [now - timedelta(hours=hours) for hours in (3.5, 2.5, 1.5, 0.5)],
+        'price': 100.0, 'size': 1.0, 'side': 'buy', 'received_at': now,
+    }), (), now, 4)
+    cache = ResponseCache(max_entries=64)
+    micro = MicrostructureEngine()
+
+    memory = default_memory_manager(data, True, cache, None, micro, None)
+    assert [name for name, _, _ in memory.actions] == (
+        ['api_cache', 'book_series'] + [f'trades_{hours:g}h' for hours in config.MEMORY_RETENTION_STEPS] + ['throttle']
+    )
+    memory.check(force=True)
+    assert cache.max_entries == 16
+    assert micro.max_age_ms == max(config.TIME_WINDOWS) * 60_000
+    assert data.retention == timedelta(hours=config.MEMORY_RETENTION_STEPS[-1])
+    assert len(data.snapshot().trades) == 2
+    assert data.scheduler.throttled
+
+    # Trades only ever shrink under the process that ingests them
+    reader = default_memory_manager(data, False, cache, None, micro, None)
+    assert 'throttle' not in [name for name, _, _ in reader.actions]
+
+
+def test_frame_bytes_estimates_object_columns():
+    frame = pd.DataFrame({'side': ['buy', 'sell'] * 5000, 'size': 1.0})
+    actual = frame.memory_usage(index=False, deep=True).sum()
+    assert abs(frame_bytes(frame) - actual) < 0.05 * actual
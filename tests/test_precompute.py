@@ -0,0 +1,70 @@
+"""Window aggregates: one pass over the store matches computing each window on its own"""
+
+from datetime import datetime, timedelta
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from conftest import trade_tape
+from precompute import compute_windows
+
+NOW = datetime(2026, 10, 19, 12, 0, 0, 500000)
+WINDOWS = (15, 30, 60, 120)
+
+
+@pytest.fixture(scope='module')
+def trades():
+    # Two sessions with a quiet stretch between them, so some minutes have no trades
+    before = trade_tape(30_000, seed=8, start=NOW - timedelta(minutes=150), span=timedelta(minutes=100))
+    after = trade_tape(12_000, seed=9, start=NOW - timedelta(minutes=43, seconds=20), span=timedelta(minutes=43))
+    return pd.concat([before, after], ignore_index=True)
+
+
+def per_window(trades, minutes):
+    """The per-window computation the precompute replaced"""
+    window = trades[trades['timestamp'] > NOW - timedelta(minutes=minutes)].set_index('timestamp')
+    delta = pd.Series(np.where(window['side'] == 'buy', window['size'], -window['size']), index=window.index)
+    candles = pd.concat([window['price'].resample('1T').ohlc(), window['size'].resample('1T').sum()], axis=1)
+    candles.columns = ['open', 'high', 'low', 'close', 'volume']
+    buy_volume = window.loc[window['side'] == 'buy', 'size'].sum()
+    return {
+        'candles': candles.dropna(),
+        'delta_1min': delta.resample('1min').sum(),
+        'cumulative_delta': delta.cumsum(),
+        'price_trend': window['price'].resample('1min').mean().dropna(),
+        'metrics': {
+            'current_price': window['price'].iloc[-1],
+            'price_change_percent': (window['price'].iloc[-1] - window['price'].iloc[0]) / window['price'].iloc[0] * 100,
+            'total_volume': window['size'].sum(),
+            'buy_volume': buy_volume,
+            'sell_volume': window['size'].sum() - buy_volume,
+            'net_delta': delta.sum(),
+        },
+    }
+
+
+def test_every_window_matches_its_own_computation(trades):
+    aggregates = compute_windows(trades, WINDOWS, NOW)
+    for minutes in WINDOWS:
+        window, expected = aggregates[minutes], per_window(trades, minutes)
+        pd.testing.assert_frame_equal(window.candles, expected['candles'], check_freq=False, check_names=False)
+        for name in ('delta_1min', 'cumulative_delta', 'price_trend'):
+            pd.testing.assert_series_equal(getattr(window, name), expected[name], check_freq=False,
+                                           check_names=False, check_index_type=False)
+        assert window.metrics == pytest.approx(expected['metrics'])
+        assert len(window.trades) == int((trades['timestamp'] > NOW - timedelta(minutes=minutes)).sum())
+
+
+def test_gap_minutes_get_zero_delta_bars(trades):
+    window = compute_windows(trades, WINDOWS, NOW)[120]
+    quiet = window.delta_1min[NOW - timedelta(minutes=48):NOW - timedelta(minutes=45)]
+    assert len(quiet) == 3 and (quiet == 0).all()
+    assert not window.candles.index.isin(quiet.index).any()
+
+
+def test_windows_without_trades_are_empty(trades):
+    aggregates = compute_windows(trades, (15,), NOW + timedelta(hours=1))
+    assert aggregates[15].metrics == {} and aggregates[15].candles.empty
+    empty = compute_windows(trades.iloc[:0], WINDOWS, NOW)
+    assert all(window.store_trades == 0 and window.delta_1min.empty for window in empty.values())
@@ -0,0 +1,70 @@
+"""Hourly volume profiles: value areas, and hours kept on the exchange clock"""
+
+from datetime import datetime, timedelta, timezone
+
+import numpy as np
+import pytest
+
+from clock import CLOCK
+from conftest import trade_tape
+from profile_store import ProfileStore, value_area
+
+NOW = datetime(2026, 10, 19, 12, 30)
+
+
+def test_value_area_of_empty_profiles_is_none():
+    assert value_area(np.empty(0), np.empty(0)) is None
+    assert value_area(np.arange(3.0), np.zeros(3)) is None
+
+
+def test_value_area_grows_towards_the_larger_neighbour():
+    prices = np.arange(100.0, 110.0)
+    volume = np.array([1, 1, 2, 8, 20, 6, 6, 1, 1, 1], dtype=float)
+    # 20 at the POC, then 8 below, then 6 above: 34 of 47 covers 70%
+    assert value_area(prices, volume) == {'poc': 104.0, 'vah': 105.0, 'val': 103.0}
+    assert value_area(prices, volume, share=1.0) == {'poc': 104.0, 'vah': 109.0, 'val': 100.0}
+    assert value_area(prices, volume, share=0.1) == {'poc': 104.0, 'vah': 104.0, 'val': 104.0}
+    # Equal neighbours: above goes first
+    assert value_area(prices[:3], np.array([2.0, 5.0, 2.0])) == {'poc': 101.0, 'vah': 102.0, 'val': 101.0}
+
+
+@pytest.mark.parametrize('seed', range(5))
+def test_value_area_is_the_smallest_greedy_cover(seed):
+    volume = np.random.default_rng(seed).gamma(2.0, size=40)
+    levels = value_area(np.arange(40.0), volume)
+    low, high = int(levels['val']), int(levels['vah'])
+    assert low <= int(np.argmax(volume)) <= high
+    assert volume[low:high + 1].sum() >= 0.7 * volume.sum()
+    # One bin fewer on either side would not have covered it
+    assert max(volume[low + 1:high + 1].sum(), volume[low:high].sum()) < 0.7 * volume.sum()
+
+
+@pytest.fixture
+def exchange_now(monkeypatch):
+    # Put the exchange clock at NOW, whatever the local clock says
+    local = datetime.now(timezone.utc).replace(tzinfo=None)
+    monkeypatch.setattr(CLOCK, 'offset', (NOW - local).total_seconds())
+
+
+def add(store, trades):
+    store.add(trades['timestamp'].values.astype('datetime64[ms]').astype('i8'),
+              trades['price'].values, trades['size'].values)
+
+
+def test_sessions_and_eviction_follow_the_exchange_clock(tmp_path, exchange_now):
+    store = ProfileStore(str(tmp_path), tick=5.0)
+    yesterday = trade_tape(3000, seed=1, start=NOW - timedelta(days=1, hours=12), span=timedelta(hours=20))
+    today = trade_tape(1000, seed=2, start=NOW - timedelta(hours=2), span=timedelta(hours=2))
+    add(store, yesterday)
+    add(store, today)
+    store.flush()
+
+    # The last completed session is the exchange's yesterday
+    prices, volume = store.histogram(NOW - timedelta(days=1, hours=12, minutes=30), NOW - timedelta(hours=12, minutes=30))
+    assert volume.sum() == pytest.approx(yesterday['size'].sum())
+    assert store.composite_levels(1) == value_area(prices, volume)
+
+    # Saved hours leave memory, the exchange's current hour stays
+    store.evict()
+    assert list(store.hours) == [int((NOW - datetime(1970, 1, 1)).total_seconds()) // 3600]
+    assert store.histogram(NOW - timedelta(hours=2), NOW)[1].sum() == pytest.approx(today['size'].sum())
@@ -0,0 +1,52 @@
+"""Profiler arming: runs must end, so tracemalloc is stopped again"""
+
+import tracemalloc
+
+import pytest
+from flask import Flask
+
+import config
+from profiling import ProfileSession, register_profile_routes
+
+
+@pytest.fixture
+def session(tmp_path):
+    session = ProfileSession(str(tmp_path), sample_interval=0.001)
+    yield session
+    if session._started_tracemalloc:
+        tracemalloc.stop()
+
+
+@pytest.mark.parametrize('count', [0, -3])
+def test_arm_rejects_runs_that_never_end(session, count):
+    with pytest.raises(ValueError):
+        session.arm('callback', count)
+    assert session.status()['armed'] == {}
+    assert not tracemalloc.is_tracing()
+
+
+def test_armed_run_writes_and_stops_tracing(session):
+    session.arm('callback', 2)
+    work = session.profiled('callback')(lambda: sum(range(1000)))
+    work()
+    assert session.status()['armed'] == {'callback': 1}
+    work()
+    work()
+    assert session.status()['armed'] == {}
+    assert any(path.endswith('.pstats') for path in session.written)
+    assert not tracemalloc.is_tracing()
+
+
+def test_admin_route_returns_400_for_bad_counts(session, monkeypatch):
+    monkeypatch.setattr(config, 'ADMIN_TOKEN', 'secret')
+    server = Flask(__name__)
+    register_profile_routes(server, session)
+    client = server.test_client()
+    headers = {'X-Admin-Token': 'secret'}
+
+    assert client.post('/admin/profile?count=0', headers=headers).status_code == 400
+    assert client.post('/admin/profile?count=1&target=nope', headers=headers).status_code == 400
+    assert client.post('/admin/profile?count=1').status_code == 403
+    assert session.status()['armed'] == {}
+    armed = client.post('/admin/profile?count=3&target=ingest', headers=headers)
+    assert armed.status_code == 200 and armed.get_json()['armed'] == {'ingest': 3}
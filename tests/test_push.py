@@ -0,0 +1,94 @@
+"""Push updates: stream capacity and per-client coalescing"""
+
+import os
+import runpy
+from datetime import timedelta
+
+import pandas as pd
+from flask import Flask
+
+from clock import CLOCK
+from conftest import trade_tape
+from data_fetcher import OrderFlowData
+from push import MAX_PENDING_TRADES, ClientChannel, PushHub, register_stream_route
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def trades(count, seconds=0):
+    return trade_tape(count, seed=seconds, start=CLOCK.now() + timedelta(seconds=seconds), span=timedelta(seconds=1))
+
+
+def test_subscribe_refuses_past_capacity():
+    hub = PushHub(max_clients=2)
+    first, second = hub.subscribe(), hub.subscribe()
+    assert first is not None and second is not None
+    assert hub.subscribe() is None
+    hub.unsubscribe(first)
+    assert hub.subscribe() is not None
+
+
+def test_stream_route_answers_503_at_capacity():
+    server = Flask(__name__)
+    hub = PushHub(max_clients=1)
+    register_stream_route(server, hub)
+    client = server.test_client()
+
+    response = client.get('/stream', buffered=False)
+    assert response.status_code == 200
+    assert next(response.response).startswith(b'retry:')
+    assert client.get('/stream').status_code == 503
+
+    # Closing the stream frees its slot
+    response.close()
+    assert not hub.clients
+    assert client.get('/stream', buffered=False).status_code == 200
+
+
+def test_gunicorn_leaves_threads_for_callbacks(monkeypatch):
+    for name in ('ORDER_FLOW_PUSH_MAX_CLIENTS', 'ORDER_FLOW_DATA_PLANE'):
+        monkeypatch.delenv(name, raising=False)
+    monkeypatch.setenv('WEB_THREADS', '16')
+    monkeypatch.setenv('WEB_CALLBACK_THREADS', '8')
+    settings = runpy.run_path(os.path.join(ROOT, 'gunicorn.conf.py'))
+    assert settings['threads'] == 16
+    assert os.environ['ORDER_FLOW_PUSH_MAX_CLIENTS'] == '8'
+
+    # An explicit limit still cannot take the callback threads
+    monkeypatch.setenv('ORDER_FLOW_PUSH_MAX_CLIENTS', '100')
+    runpy.run_path(os.path.join(ROOT, 'gunicorn.conf.py'))
+    assert os.environ['ORDER_FLOW_PUSH_MAX_CLIENTS'] == '8'
+
+
+def test_channel_keeps_newest_trades_and_latest_bar():
+    channel = ClientChannel(max_pending_trades=3)
+    channel.offer(1, [[1], [2]], {'close': 1})
+    channel.offer(2, [[3], [4], [5]], {'close': 2})
+    message = channel.take(0)
+    assert message['version'] == 2
+    assert message['trades'] == [[3], [4], [5]]
+    assert message['dropped'] == 2
+    assert message['bar'] == {'close': 2}
+    assert channel.take(0) is None
+
+
+def test_publish_sends_only_new_trades():
+    data = OrderFlowData()
+    hub = PushHub()
+    channel = hub.subscribe()
+
+    data.publish(trades(3), (), CLOCK.now(), 3)
+    hub.publish(data.snapshot())
+    assert len(channel.take(0)['trades']) == 3
+
+    # A republish without new trades (a trim, say) pushes nothing
+    data.publish(data.snapshot().trades.iloc[1:], (), CLOCK.now(), 0)
+    hub.publish(data.snapshot())
+    assert channel.take(0) is None
+
+    data.publish(pd.concat([data.snapshot().trades, trades(MAX_PENDING_TRADES + 5, 2)], ignore_index=True),
+                 (), CLOCK.now(), MAX_PENDING_TRADES + 5)
+    hub.publish(data.snapshot())
+    message = channel.take(0)
+    assert len(message['trades']) == MAX_PENDING_TRADES
+    assert message['trades'][-1][1] == data.snapshot().trades['price'].iloc[-1]
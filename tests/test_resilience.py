@@ -0,0 +1,135 @@
+"""Bounded exchange calls: deadlines, hedging and the circuit breaker"""
+
+import threading
+import time
+
+import pytest
+
+import config
+import resilience
+from data_fetcher import OrderFlowData
+from resilience import CircuitBreaker, FetchTimeout, call_with_deadline, hedged_call, time_left
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 500.0
+
+    def monotonic(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    fake = FakeClock()
+    monkeypatch.setattr(resilience, 'time', fake)
+    # Full jitter at its ceiling, so the delays are exact
+    monkeypatch.setattr(resilience.random, 'uniform', lambda low, high: high)
+    return fake
+
+
+def test_breaker_opens_half_opens_and_closes(clock):
+    breaker = CircuitBreaker('trades', failure_threshold=3, base_delay=1.0, max_delay=5.0)
+    for delay in (1, 2):
+        breaker.record_failure()
+        assert not breaker.is_open and breaker.retry_in() == delay
+    breaker.record_failure()
+    assert breaker.is_open and not breaker.allow()
+    assert breaker.retry_in() == 4
+
+    # Half-open: once the delay is over one trial call goes through
+    clock.now += 4
+    assert breaker.allow() and breaker.is_open
+    breaker.record_failure()  # the trial failed: open again, for longer
+    assert breaker.retry_in() == 5 and not breaker.allow()
+
+    clock.now += 5
+    assert breaker.allow()
+    breaker.record_success()
+    assert not breaker.is_open and breaker.allow()
+    assert breaker.last_success == clock.now
+
+
+def test_time_left_counts_down_to_the_deadline(clock):
+    assert time_left(clock.now + 2.5) == 2.5
+    with pytest.raises(FetchTimeout):
+        time_left(clock.now)
+
+
+def test_call_with_deadline_gives_up_on_a_hung_call():
+    release = threading.Event()
+    started = time.monotonic()
+    with pytest.raises(FetchTimeout):
+        call_with_deadline(release.wait, 0.05)
+    assert time.monotonic() - started < 1
+    release.set()
+    assert call_with_deadline(lambda: 'ok', 1) == 'ok'
+
+
+def test_hedge_returns_the_first_answer_and_ignores_the_loser():
+    release = threading.Event()
+    finished = []
+
+    def slow():
+        release.wait(5)
+        finished.append('primary')
+        return 'primary'
+
+    assert hedged_call('trades', slow, lambda: 'backup', hedge_after=0.02, timeout=2) == 'backup'
+    # The primary is still running; whatever it returns later is dropped
+    assert finished == []
+    release.set()
+
+
+def test_hedge_skips_the_backup_when_the_primary_answers_in_time():
+    backups = []
+    assert hedged_call('trades', lambda: 'primary', lambda: backups.append(1), hedge_after=1, timeout=2) == 'primary'
+    assert backups == []
+
+
+def test_hedge_raises_when_both_fail_or_time_out():
+    def fail():
+        raise ValueError('down')
+
+    def fail_slowly():
+        time.sleep(0.05)
+        raise ValueError('down')
+
+    with pytest.raises(ValueError):
+        hedged_call('trades', fail_slowly, fail, hedge_after=0.01, timeout=1)
+    release = threading.Event()
+    with pytest.raises(FetchTimeout):
+        hedged_call('trades', lambda: release.wait(5), lambda: release.wait(5), hedge_after=0.01, timeout=0.05)
+    release.set()
+
+
+class SlowBudget:
+    """Weight budget that makes every request wait before it may be sent"""
+
+    def __init__(self, wait):
+        self.wait = wait
+        self.timeouts = []
+
+    def acquire(self, weight=1, timeout=None, share=1.0):
+        self.timeouts.append(timeout)
+        time.sleep(self.wait)
+        return True
+
+
+class HungExchange:
+    def fetch_trades(self, symbol, limit=None):
+        time.sleep(1)
+
+
+def test_budget_wait_and_request_share_one_deadline(monkeypatch):
+    monkeypatch.setattr(config, 'FETCH_TIMEOUT', 0.3)
+    monkeypatch.setattr(config, 'HEDGE_REQUESTS', False)
+    data = OrderFlowData()
+    data._exchange = HungExchange()
+    data.scheduler.budget = SlowBudget(0.2)
+
+    started = time.monotonic()
+    assert data._fetch_trades(data.snapshot().trades) is None
+    # Without a shared deadline this took the budget wait plus a full FETCH_TIMEOUT
+    assert time.monotonic() - started < 0.45
+    assert data.scheduler.budget.timeouts[0] <= 0.3
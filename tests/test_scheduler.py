@@ -0,0 +1,145 @@
+"""Fetch scheduling: the weight budget and single-flight coalescing, on a fake clock"""
+
+import threading
+import time
+
+import pytest
+
+import scheduler
+from scheduler import BudgetTimeout, FetchScheduler, SingleFlight, WeightBudget
+
+
+class FakeClock:
+    """Stands in for the time module: sleeping just moves the clock on"""
+
+    def __init__(self):
+        self.now = 1000.0
+
+    def monotonic(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.now += seconds
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    fake = FakeClock()
+    monkeypatch.setattr(scheduler, 'time', fake)
+    return fake
+
+
+def test_budget_refills_as_the_minute_rolls_off(clock):
+    budget = WeightBudget(100, safety=1.0)
+    budget.spend(60)
+    clock.sleep(20)
+    budget.spend(40)
+    assert budget.usage() == pytest.approx(1.0)
+    assert budget.delay(10) == pytest.approx(40)  # until the first 60 expire
+    clock.sleep(40)
+    assert budget.delay(10) == 0
+    assert budget.usage() == pytest.approx(0.4)
+
+
+def test_acquire_blocks_until_weight_fits(clock):
+    budget = WeightBudget(100, safety=1.0)
+    budget.spend(100)
+    started = clock.now
+    assert budget.acquire(5)
+    assert clock.now - started == pytest.approx(60)
+    assert budget.usage() == pytest.approx(0.05)
+
+
+def test_acquire_gives_up_past_its_timeout(clock):
+    budget = WeightBudget(100, safety=1.0)
+    budget.spend(100)
+    assert not budget.acquire(5, timeout=10)
+    # Nothing spent, and no sleeping past what the timeout allowed
+    assert budget.usage() == pytest.approx(1.0)
+    assert clock.now - 1000.0 <= 10
+
+
+def test_penalty_and_exchange_count_block_spending(clock):
+    budget = WeightBudget(100, safety=1.0)
+    budget.penalize(30)
+    assert budget.delay(1) == pytest.approx(30)
+    clock.sleep(30)
+    assert budget.delay(1) == 0
+
+    # The exchange counted more than we did: adopt its figure
+    budget.sync(95)
+    assert budget.delay(10) == pytest.approx(60)
+    budget.sync(10)
+    assert budget.usage() == pytest.approx(0.95)
+
+
+def wait_for_followers(call, count):
+    # Followers block on the leader's event; wait until all of them do
+    deadline = time.monotonic() + 5
+    while len(call['done']._cond._waiters) < count:
+        assert time.monotonic() < deadline, "followers never joined"
+        time.sleep(0.001)
+
+
+def run_concurrently(flight, key, fn, followers):
+    entered, release = threading.Event(), threading.Event()
+    results = []
+
+    def leader_fn():
+        entered.set()
+        release.wait(5)
+        return fn()
+
+    def caller(target):
+        try:
+            results.append(('ok', flight.do(key, target)))
+        except Exception as e:
+            results.append(('error', e))
+
+    threads = [threading.Thread(target=caller, args=(leader_fn,))]
+    threads[0].start()
+    entered.wait(5)
+    follower_calls = []
+    for _ in range(followers):
+        thread = threading.Thread(target=caller, args=(lambda: follower_calls.append(1),))
+        thread.start()
+        threads.append(thread)
+    wait_for_followers(flight.calls[key], followers)
+    release.set()
+    for thread in threads:
+        thread.join(5)
+    assert not follower_calls
+    return results
+
+
+def test_single_flight_shares_the_leaders_result():
+    flight = SingleFlight()
+    results = run_concurrently(flight, 'trades', lambda: 'page', followers=3)
+    assert sorted(result for _, result in results) == [('page', False)] * 3 + [('page', True)]
+    assert flight.calls == {}
+    # The next call runs again
+    assert flight.do('trades', lambda: 'next') == ('next', True)
+
+
+def test_single_flight_raises_the_leaders_error_everywhere():
+    flight = SingleFlight()
+
+    def fail():
+        raise ValueError("exchange down")
+
+    results = run_concurrently(flight, 'trades', fail, followers=2)
+    assert [kind for kind, _ in results] == ['error'] * 3
+    assert all(str(error) == "exchange down" for _, error in results)
+    assert flight.calls == {}
+
+
+def test_call_raises_budget_timeout_without_calling(clock):
+    fetch = FetchScheduler('binance', 1000)
+    fetch.budget = WeightBudget(100, safety=1.0)
+    fetch.budget.spend(100)
+    calls = []
+    with pytest.raises(BudgetTimeout):
+        fetch.call('trades', lambda: calls.append(1), timeout=5)
+    assert calls == [] and clock.now - 1000.0 <= 5
+    clock.sleep(60)
+    assert fetch.call('trades', lambda: 'page', timeout=5) == ('page', True)
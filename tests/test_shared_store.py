@@ -0,0 +1,129 @@
+"""Shared data plane: what a web worker reads back equals what ingestion published"""
+
+from datetime import timedelta
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from clock import CLOCK
+from conftest import trade_tape
+from data_fetcher import OrderFlowData
+from shared_store import SharedOrderFlowData, SharedStorePublisher
+
+NOW = CLOCK.now().replace(microsecond=0)
+
+
+def batch(step, count, history=False):
+    """Trades of one ingest step; history lands a minute before the live tape"""
+    start = NOW + timedelta(seconds=step) - (timedelta(minutes=1) if history else timedelta(0))
+    return trade_tape(count, seed=step, start=start, span=timedelta(seconds=1))
+
+
+def book(step, rng):
+    return {'timestamp': NOW + timedelta(seconds=step), 'bids': [(99.0, float(rng.random()))], 'asks': [(101.0, 1.0)]}
+
+
+def assert_same(source, reader):
+    expected, got = source.snapshot(), reader.snapshot()
+    pd.testing.assert_frame_equal(expected.trades.reset_index(drop=True), got.trades.reset_index(drop=True),
+                                  check_dtype=False)
+    assert [book['bids'] for book in got.orderbooks] == [book['bids'] for book in expected.orderbooks]
+
+
+@pytest.fixture
+def plane(tmp_path):
+    # Small rings, so a few hundred steps wrap them and roll generations
+    source = OrderFlowData()
+    publisher = SharedStorePublisher(str(tmp_path), trade_capacity=64, book_capacity=8)
+    reader = SharedOrderFlowData(str(tmp_path))
+    return source, publisher, reader
+
+
+def test_round_trip_through_appends_merges_and_trims(plane):
+    source, publisher, reader = plane
+    rng = np.random.default_rng(0)
+    heard = []
+    reader.add_trade_listener(lambda trades: heard.append(len(trades)))
+    publisher.publish(source.snapshot())
+    reader.fetch_new_data()
+    ingested = 0
+
+    for step in range(300):
+        current = source.snapshot()
+        action = rng.random()
+        if action < 0.7:
+            count = int(rng.integers(0, 12))
+            trades = pd.concat([current.trades, batch(step, count)], ignore_index=True)
+            books = current.orderbooks
+            if rng.random() < 0.5:
+                books = (books + (book(step, rng),))[-5:]
+            source.publish(trades.iloc[-40:].reset_index(drop=True), books, NOW, count)
+            ingested += count
+        elif action < 0.8:
+            history = batch(step, 3, history=True)
+            merged = pd.concat([history, current.trades], ignore_index=True)
+            source.publish(merged.sort_values('timestamp', kind='stable', ignore_index=True),
+                           current.orderbooks, NOW, 0, merged=True)
+        else:
+            source.publish(current.trades.iloc[3:].reset_index(drop=True), current.orderbooks, NOW, 0)
+        publisher.publish(source.snapshot())
+
+        if rng.random() < 0.6:
+            reader.fetch_new_data()
+            assert_same(source, reader)
+
+    reader.fetch_new_data()
+    assert_same(source, reader)
+    assert publisher.trades.generation > 0
+    # Listeners follow the live tape only: merges and trims are not new trades
+    assert sum(heard) == ingested
+
+
+def test_fresh_reader_matches_incremental_reader(plane, tmp_path):
+    source, publisher, reader = plane
+    rng = np.random.default_rng(1)
+    for step in range(50):
+        count = int(rng.integers(1, 8))
+        trades = pd.concat([source.snapshot().trades, batch(step, count)], ignore_index=True)
+        source.publish(trades, (book(step, rng),), NOW, count)
+        publisher.publish(source.snapshot())
+        reader.fetch_new_data()
+
+    late = SharedOrderFlowData(str(tmp_path))
+    late.fetch_new_data()
+    assert_same(source, late)
+    assert_same(source, reader)
+    assert reader.snapshot().ingested_total == late.snapshot().ingested_total == source.snapshot().ingested_total
+
+
+def test_first_read_notifies_only_later_rows(plane):
+    source, publisher, reader = plane
+    rng = np.random.default_rng(2)
+    source.publish(batch(0, 30), (book(0, rng),), NOW, 30)
+    publisher.publish(source.snapshot())
+    heard, books = [], []
+    reader.add_trade_listener(lambda trades: heard.append(trades))
+    reader.add_book_listener(books.append)
+
+    # The rings' contents are history to a worker that just started
+    assert reader.fetch_new_data() == 0
+    assert heard == [] and books == []
+    assert len(reader.snapshot().trades) == 30
+    assert reader.snapshot().new_trades_count == 0
+    assert reader.snapshot().ingested_total == 30
+
+    source.publish(pd.concat([source.snapshot().trades, batch(1, 4)], ignore_index=True),
+                   source.snapshot().orderbooks + (book(1, rng),), NOW, 4)
+    publisher.publish(source.snapshot())
+    assert reader.fetch_new_data() == 4
+    assert len(heard) == 1
+    pd.testing.assert_frame_equal(heard[0].reset_index(drop=True), source.snapshot().trades.iloc[-4:].reset_index(drop=True),
+                                  check_dtype=False)
+    assert [book['timestamp'] for book in books] == [NOW + timedelta(seconds=1)]
+
+
+def test_unpublished_store_reads_empty(tmp_path):
+    reader = SharedOrderFlowData(str(tmp_path))
+    reader.fetch_new_data()
+    assert len(reader.snapshot().trades) == 0
@@ -0,0 +1,34 @@
+"""Startup: the page is served before the exchange client is even imported"""
+
+import json
+import os
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+PROBE = """
+import json, sys
+import data_fetcher
+# Keep the warm-up thread from racing the check below; the probe creates the exchange itself
+data_fetcher.OrderFlowData.start_warm_up = lambda self: None
+import app
+import startup
+ccxt_on_import = 'ccxt' in sys.modules
+app.data_manager.exchange
+print(json.dumps({'ccxt_on_import': ccxt_on_import, 'ccxt_after': 'ccxt' in sys.modules, 'phases': startup.PHASES}))
+"""
+
+
+def test_app_import_defers_ccxt_until_after_the_layout(tmp_path):
+    env = dict(os.environ, PYTHONPATH=ROOT, ORDER_FLOW_PUSH='0', ORDER_FLOW_BACKFILL_HOURS='0')
+    result = subprocess.run([sys.executable, '-c', PROBE], capture_output=True, text=True, env=env,
+                            cwd=str(tmp_path), timeout=120)
+    assert result.returncode == 0, result.stderr
+    # Boot marks and background threads print too, the probe's JSON is its own line
+    probe = json.loads([line for line in result.stdout.splitlines() if line.startswith('{')][-1])
+
+    assert not probe['ccxt_on_import']
+    assert probe['ccxt_after']
+    phases = probe['phases']
+    assert phases['imports'] < phases['layout'] < phases['exchange_ready']
@@ -0,0 +1,83 @@
+"""Sweep and iceberg detection: parent orders against a trade-by-trade grouping"""
+
+from datetime import timedelta
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from conftest import trade_tape
+from order_detection import SWEEP_COLUMNS, IcebergDetector, SweepAggregator
+
+GAP_MS = 50
+
+
+@pytest.fixture(scope='module')
+def tape():
+    # About 12ms between prints and long runs of buys, on a half-dollar grid so levels repeat
+    trades = trade_tape(5000, seed=4, span=timedelta(minutes=1), buy_share=0.8)
+    trades['price'] = (trades['price'] * 2).round() / 2
+    return trades
+
+
+def brute_force(trades, min_trades=2):
+    """Group consecutive same-side prints no more than GAP_MS apart, one trade at a time"""
+    groups = []
+    times = trades['timestamp'].values.astype('i8')
+    for time_ns, side, price, size in zip(times, trades['side'], trades['price'], trades['size']):
+        group = groups[-1] if groups else None
+        if group is not None and group['side'] == side and time_ns - group['end'] <= GAP_MS * 1_000_000:
+            group['levels'] += price != group['last_price']
+            group.update(end=time_ns, last_price=price, size=group['size'] + size,
+                         notional=group['notional'] + price * size, trades=group['trades'] + 1)
+        else:
+            groups.append({'start': time_ns, 'end': time_ns, 'side': side, 'size': size, 'trades': 1, 'levels': 1,
+                           'notional': price * size, 'first_price': price, 'last_price': price})
+    rows = [(g['start'], g['end'], g['side'], g['size'], g['trades'], g['levels'], g['notional'] / g['size'],
+             g['first_price'], g['last_price']) for g in groups if g['trades'] >= min_trades]
+    frame = pd.DataFrame(rows, columns=SWEEP_COLUMNS)
+    frame['start'] = pd.to_datetime(frame['start'])
+    frame['end'] = pd.to_datetime(frame['end'])
+    return frame
+
+
+def aggregate(trades, chunks):
+    aggregator = SweepAggregator(max_gap_ms=GAP_MS)
+    for rows in np.array_split(np.arange(len(trades)), chunks):
+        aggregator.update(trades.iloc[rows])
+    return aggregator
+
+
+@pytest.mark.parametrize('chunks', [1, 7, 997, 5000])
+def test_matches_brute_force_however_the_tape_is_chunked(tape, chunks):
+    expected = brute_force(tape)
+    got = aggregate(tape, chunks).sweeps()
+    assert len(expected) > 100
+    pd.testing.assert_frame_equal(got, expected, check_dtype=False)
+
+
+def test_sweeps_filter_by_size_and_end(tape):
+    aggregator = aggregate(tape, 13)
+    everything = aggregator.sweeps()
+    since = everything['end'].iloc[len(everything) // 2]
+    later = aggregator.sweeps(since=since, min_size=0.5)
+    expected = everything[(everything['end'] > since) & (everything['size'] >= 0.5)]
+    pd.testing.assert_frame_equal(later.reset_index(drop=True), expected.reset_index(drop=True))
+
+
+def book(bid_size, other=1.0):
+    return {'timestamp': pd.Timestamp('2026-10-19'), 'bids': [(100.0, bid_size), (99.5, other)], 'asks': [(100.5, 1.0)]}
+
+
+def test_iceberg_needs_repeated_refills():
+    detector = IcebergDetector(depletion=0.5, refill=0.8, min_refills=3)
+    for size in (10.0, 2.0, 9.0, 1.0, 10.0, 3.0):
+        detector.update(book(size))
+    assert detector.icebergs() == []
+    detector.update(book(8.5))
+    assert detector.icebergs() == [{'side': 'bid', 'price': 100.0, 'refills': 3, 'size': 8.5}]
+
+    # A level that leaves the book starts over
+    detector.update({'timestamp': pd.Timestamp('2026-10-19'), 'bids': [(99.5, 1.0)], 'asks': [(100.5, 1.0)]})
+    detector.update(book(10.0))
+    assert detector.icebergs() == []
@@ -0,0 +1,105 @@
+"""VPIN: equal-volume bucketing against a brute-force reference"""
+
+from datetime import datetime, timedelta
+
+import numpy as np
+import pytest
+
+from alerts import AlertEngine, ToastSink
+from conftest import trade_tape
+from vpin import VPINEngine
+
+BUCKET, WINDOW = 10.0, 50
+START = datetime(2026, 10, 19)
+
+
+def tape(count=20_000, buy_share=0.55, seed=1, block_share=0.002):
+    # A few block trades span several buckets
+    return trade_tape(count, seed=seed, start=START, span=timedelta(minutes=count // 1000),
+                      buy_share=buy_share, block_share=block_share)
+
+
+def reference(trades):
+    """Signed volume per bucket from each trade's overlap with [k V, (k + 1) V), and VPIN over the window"""
+    signs = np.where(trades['side'] == 'buy', 1.0, -1.0)
+    cumulative = np.r_[0, np.cumsum(trades['size'].values)]
+    imbalances = []
+    for bucket in range(int(cumulative[-1] // BUCKET)):
+        low, high = bucket * BUCKET, (bucket + 1) * BUCKET
+        overlap = np.clip(np.minimum(cumulative[1:], high) - np.maximum(cumulative[:-1], low), 0, None)
+        imbalances.append((overlap * signs).sum())
+    imbalances = np.array(imbalances)
+    vpin = np.array([np.abs(imbalances[max(0, i - WINDOW + 1):i + 1]).mean() / BUCKET
+                     for i in range(len(imbalances))])
+    return imbalances / BUCKET, vpin
+
+
+def run(trades, chunks):
+    engine = VPINEngine(BUCKET, WINDOW, capacity=16)
+    closed = [engine.update(trades.iloc[rows])[1] for rows in np.array_split(np.arange(len(trades)), chunks)]
+    return engine, np.concatenate(closed)
+
+
+@pytest.fixture(scope='module')
+def trades():
+    return tape()
+
+
+def test_matches_brute_force(trades):
+    imbalances, expected = reference(trades)
+    engine, vpin = run(trades, 1)
+    # A bucket the last trade exactly fills may close in one and not the other
+    assert abs(len(vpin) - len(expected)) <= 1
+    count = min(len(vpin), len(expected))
+    assert count > WINDOW
+    np.testing.assert_allclose(vpin[:count], expected[:count], atol=1e-9)
+
+    series = engine.series(trades['timestamp'].iloc[0])
+    np.testing.assert_allclose(series['vpin'].values[:count], expected[:count], atol=1e-9)
+    np.testing.assert_allclose(series['imbalance'].values[:count], imbalances[:count], atol=1e-9)
+    latest = engine.latest()
+    assert latest['vpin'] == pytest.approx(vpin[-1])
+    assert latest['buckets'] == WINDOW
+    assert 0 <= latest['forming'] < 1
+
+
+def test_chunking_does_not_change_buckets(trades):
+    _, whole = run(trades, 1)
+    _, chunked = run(trades, 997)
+    np.testing.assert_allclose(chunked, whole, atol=1e-9)
+
+
+def test_one_sided_flow_is_fully_toxic():
+    _, vpin = run(tape(2000, buy_share=1.0), 7)
+    np.testing.assert_allclose(vpin, 1.0)
+
+
+def test_series_slices_by_bucket_close(trades):
+    engine, vpin = run(trades, 1)
+    everything = engine.series(trades['timestamp'].iloc[0])
+    middle = everything['timestamp'].iloc[len(everything) // 2]
+    later = engine.series(middle)
+    assert (later['timestamp'] > middle).all()
+    assert len(later) == (everything['timestamp'] > middle).sum()
+
+
+def test_invalid_settings():
+    with pytest.raises(ValueError):
+        VPINEngine(0, WINDOW)
+    with pytest.raises(ValueError):
+        VPINEngine(BUCKET, 0)
+
+
+def test_alert_fires_once_per_crossing():
+    toasts = ToastSink()
+    engine = AlertEngine([{'type': 'vpin', 'threshold': 0.6}], [toasts], cooldown=0,
+                         vpin_bucket_volume=BUCKET, vpin_window_buckets=WINDOW)
+    engine.on_trades(tape(5000, buy_share=0.5, seed=2, block_share=0))
+    assert toasts.recent(60) == []
+
+    one_sided = tape(5000, buy_share=1.0, seed=3)
+    for rows in np.array_split(np.arange(len(one_sided)), 20):
+        engine.on_trades(one_sided.iloc[rows])
+    alerts = toasts.recent(60)
+    assert [alert['kind'] for alert in alerts] == ['vpin']
+    assert alerts[0]['value'] >= 0.6
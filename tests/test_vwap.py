@@ -0,0 +1,75 @@
+"""Session and anchored VWAP: running totals against a direct computation"""
+
+from datetime import datetime, timedelta
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from conftest import trade_tape
+from indicators import VWAPEngine
+
+START = datetime(2026, 10, 19, 8)
+
+
+@pytest.fixture(scope='module')
+def tape():
+    return trade_tape(20_000, seed=5, start=START, span=timedelta(hours=2))
+
+
+def direct(trades, anchor, times):
+    """VWAP and volume-weighted σ of the trades from the anchor's second to the end of each time's second"""
+    seconds = trades['timestamp'].values.astype('datetime64[s]')
+    anchor_s = np.datetime64(anchor, 's')
+    vwaps, stds = [], []
+    for time in pd.DatetimeIndex(times).values.astype('datetime64[s]'):
+        chosen = (seconds >= anchor_s) & (seconds <= time)
+        if not chosen.any():
+            vwaps.append(np.nan)
+            stds.append(np.nan)
+            continue
+        price, size = trades['price'].values[chosen], trades['size'].values[chosen]
+        vwap = (price * size).sum() / size.sum()
+        vwaps.append(vwap)
+        stds.append(np.sqrt((size * (price - vwap) ** 2).sum() / size.sum()))
+    return np.array(vwaps), np.array(stds)
+
+
+def build(trades, chunks):
+    engine = VWAPEngine(capacity=16)
+    for rows in np.array_split(np.arange(len(trades)), chunks):
+        engine.update(trades.iloc[rows])
+    return engine
+
+
+@pytest.mark.parametrize('chunks', [1, 331])
+def test_anchored_vwap_matches_direct(tape, chunks):
+    engine = build(tape, chunks)
+    times = pd.date_range(START, START + timedelta(hours=2), freq='7min')
+    for anchor in (START - timedelta(minutes=5), START + timedelta(minutes=41, seconds=30)):
+        vwap, std = engine.vwap(anchor, times)
+        expected_vwap, expected_std = direct(tape, anchor, times)
+        np.testing.assert_array_equal(np.isnan(vwap), np.isnan(expected_vwap))
+        np.testing.assert_allclose(vwap, expected_vwap, rtol=0, atol=1e-6)
+        np.testing.assert_allclose(std, expected_std, rtol=1e-6, atol=1e-6)
+
+
+def test_session_lines_carry_bands_and_anchors(tape):
+    engine = build(tape, 17)
+    times = pd.date_range(START + timedelta(minutes=30), START + timedelta(hours=2), freq='1min')
+    anchor = START + timedelta(hours=1)
+    lines = {line['name']: line for line in engine.vwap_lines(times, anchors=[anchor], bands=(1, 2))}
+
+    session, std = direct(tape, START.replace(hour=0), times)
+    np.testing.assert_allclose(lines['Session VWAP']['y'], session, atol=1e-6)
+    for k in (1, 2):
+        np.testing.assert_allclose(lines[f'+{k}σ']['y'], session + k * std, atol=1e-6)
+        np.testing.assert_allclose(lines[f'-{k}σ']['y'], session - k * std, atol=1e-6)
+    anchored = lines['AVWAP 09:00']
+    assert (anchored['x'] >= anchor).all()
+    np.testing.assert_allclose(anchored['y'], direct(tape, anchor, anchored['x'])[0], atol=1e-6)
+
+
+def test_empty_engine_returns_nan():
+    vwap, std = VWAPEngine().vwap(START, [START])
+    assert np.isnan(vwap).all() and np.isnan(std).all()
@@ -0,0 +1,139 @@
+"""
+Order flow toxicity: VPIN over equal-volume buckets.
+
+Trades fill buckets of `bucket_volume` BTC in tape order, a trade that
+overflows a bucket being split across it and the next ones. Every closed
+bucket records its buy - sell aggressor imbalance, and VPIN is the mean
+of |buy - sell| / bucket_volume over the last `window_buckets` buckets
+(over the buckets so far until the window fills):
+
+    0   balanced two-way flow
+    1   every bucket one-sided
+
+The side is the exchange's aggressor flag rather than a bulk volume
+classification. The window is a ring of bucket imbalances with a running
+sum, so each trade costs a few comparisons and each bucket one
+subtraction and one addition, whatever the window length. A VPIN point
+is kept per closed bucket, as long as the trade store, for the chart.
+"""
+
+import threading
+from datetime import timedelta
+
+import numpy as np
+import pandas as pd
+
+VPIN_COLUMNS = ('vpin', 'imbalance')
+VPIN, IMBALANCE = range(len(VPIN_COLUMNS))
+
+
+class VPINEngine:
+    def __init__(self, bucket_volume=10.0, window_buckets=50, max_age=timedelta(hours=4), capacity=1024):
+        if bucket_volume <= 0 or window_buckets < 1:
+            raise ValueError("VPIN needs a positive bucket volume and at least one bucket")
+        self.bucket_volume = bucket_volume
+        self.window_buckets = window_buckets
+        self.max_age_ms = int(max_age.total_seconds() * 1000)
+        self.lock = threading.Lock()
+        # Forming bucket
+        self.filled = 0.0
+        self.net = 0.0  # buy - sell
+        # Ring of |buy - sell| of the last window_buckets closed buckets
+        self.ring = [0.0] * window_buckets
+        self.position = 0
+        self.buckets = 0  # closed since start
+        self.total = 0.0  # sum of the ring
+        # Closed buckets, times in ms
+        self.count = 0
+        self.times = np.empty(capacity, dtype='i8')
+        self.values = np.empty((capacity, len(VPIN_COLUMNS)))
+
+    def update(self, new_trades):
+        """Trade listener; returns the end times (ms) and VPIN of the buckets it closed"""
+        if len(new_trades) == 0:
+            return np.empty(0, dtype='i8'), np.empty(0)
+        times = new_trades['timestamp'].values.astype('datetime64[ms]').astype('i8').tolist()
+        sizes = new_trades['size'].values.astype(float).tolist()
+        signs = np.where(new_trades['side'].values == 'buy', 1.0, -1.0).tolist()
+        bucket_volume = self.bucket_volume
+        window = self.window_buckets
+
+        with self.lock:
+            ring = self.ring
+            filled, net, position, buckets, total = self.filled, self.net, self.position, self.buckets, self.total
+            closed = []
+            for time_ms, size, sign in zip(times, sizes, signs):
+                while filled + size >= bucket_volume:
+                    # This trade completes the bucket; the rest carries over
+                    part = bucket_volume - filled
+                    size -= part
+                    net += sign * part
+                    imbalance = abs(net)
+                    total += imbalance - ring[position]
+                    ring[position] = imbalance
+                    position += 1
+                    buckets += 1
+                    if position == window:
+                        # Once per lap, so rounding can't build up in the running sum
+                        position = 0
+                        total = sum(ring)
+                    closed.append((time_ms, total / (min(buckets, window) * bucket_volume), net / bucket_volume))
+                    filled = net = 0.0
+                filled += size
+                net += sign * size
+            self.filled, self.net, self.position, self.buckets, self.total = filled, net, position, buckets, total
+            if closed:
+                rows = np.array(closed, dtype=float)
+                self._append(rows[:, 0].astype('i8'), rows[:, 1:])
+                return rows[:, 0].astype('i8'), rows[:, 1 + VPIN]
+        return np.empty(0, dtype='i8'), np.empty(0)
+
+    def _append(self, times, values):
+        needed = self.count + len(times)
+        if needed > len(self.times):
+            self._trim(times[-1])
+            needed = self.count + len(times)
+            if needed > len(self.times):
+                capacity = max(needed, 2 * len(self.times))
+                self.times = np.resize(self.times, capacity)
+                self.values = np.resize(self.values, (capacity, len(VPIN_COLUMNS)))
+        self.times[self.count:needed] = times
+        self.values[self.count:needed] = values
+        self.count = needed
+
+    def _trim(self, latest):
+        start = np.searchsorted(self.times[:self.count], latest - self.max_age_ms)
+        if start:
+            kept = self.count - start
+            self.times[:kept] = self.times[start:self.count]
+            self.values[:kept] = self.values[start:self.count]
+            self.count = kept
+
+    def nbytes(self):
+        return self.times.nbytes + self.values.nbytes
+
+    def latest(self):
+        """VPIN at the last closed bucket, how many buckets it covers and how full the next one is"""
+        with self.lock:
+            if not self.buckets:
+                return None
+            return {
+                'vpin': self.total / (min(self.buckets, self.window_buckets) * self.bucket_volume),
+                'buckets': min(self.buckets, self.window_buckets),
+                'forming': self.filled / self.bucket_volume,
+            }
+
+    def series(self, start, end=None):
+        """DataFrame of VPIN and the signed bucket imbalance at each bucket closed from start to end"""
+        start_ms = int(np.datetime64(start, 'ms').astype('i8'))
+        with self.lock:
+            first = np.searchsorted(self.times[:self.count], start_ms, side='right')
+            last = self.count
+            if end is not None:
+                last = np.searchsorted(self.times[:self.count], int(np.datetime64(end, 'ms').astype('i8')), side='right')
+            times = self.times[first:last].copy()
+            values = self.values[first:last].copy()
+
+        frame = pd.DataFrame(values, columns=VPIN_COLUMNS)
+        frame.insert(0, 'timestamp', times.astype('datetime64[ms]').astype('datetime64[ns]'))
+        return frame